@@ -0,0 +1,408 @@
+"""
+Aggregated data behind every chart, and the web app's insight figures.
+
+Each chart of generate_charts.py draws one data series computed here from
+the StationCube (station_cube.py); the series are plain lists and dicts, so
+the same numbers can be exported as JSON. write_analytics() puts all of
+them in one compact file:
+
+    {"version": 1,
+     "stations": 554,
+     "charts":   {"01_market_share": {...}, ...},   one entry per chart
+     "insights": {"marketShare": [...], "cityStats": [...],
+                  "sgpInsights": {...}, "coverageGaps": [...],
+                  "tbilisiStats": {...}}}
+
+"insights" has the shapes of web/src/lib/types.ts (BrandStats, CityStats,
+SGPInsights, CoverageGap), so the web app can show its panels without
+downloading and scanning every station. Floats are rounded to 2 decimals
+in the file only.
+
+Usage:
+    python scripts/generate_charts.py      # also writes ANALYTICS_PATH
+"""
+
+import json
+import os
+
+ANALYTICS_PATH = os.path.join("web", "public", "data", "analytics.json")
+FORMAT_VERSION = 1
+
+# Brand colors — SGP highlighted in SOCAR blue
+BRAND_COLORS = {
+    "SGP":       "#0072CE",  # SOCAR blue (hero)
+    "Gulf":      "#EE3124",
+    "Rompetrol": "#F5A623",
+    "Wissol":    "#4CAF50",
+    "Lukoil":    "#D32F2F",
+}
+BRAND_ORDER = ["Gulf", "Wissol", "SGP", "Rompetrol", "Lukoil"]
+# Brand order of web/src/lib/constants.ts BRANDS (ties in marketShare)
+# and of the byBrand records in stats.ts
+WEB_BRAND_ORDER = ["SGP", "Gulf", "Wissol", "Rompetrol", "Lukoil"]
+WEB_RECORD_ORDER = ["SGP", "Gulf", "Rompetrol", "Wissol", "Lukoil"]
+
+# Service groups of chart 6: a station offers one if its services or fuel
+# types list any of the tokens (data/vocabulary.json)
+SERVICE_GROUPS = {
+    "Store/Market":   ["Way-Mart", "Market", "Supermarket", "Shop"],
+    "Food/Cafe":      ["Coffee", "Hot Dog", "Sandwich", "Hot-Dog Campaign", "Food"],
+    "Service Center": ["Service Center", "Service Block"],
+    "Car Wash":       ["Car Wash"],
+    "EV Charging":    ["Charger", "Power Charger", "Fast Charger"],
+    "Restroom (WC)":  ["WC"],
+    "ATM/Payment":    ["ATM", "POS Terminal", "Smart Pay", "Fill&Go"],
+    "CNG Fuel":       ["CNG"],
+}
+
+# Token-to-category mapping for the aggregation cube's feature flags, as
+# (columns, tokens): a station has the flag if it lists one of the tokens
+# in those columns (any token at all if tokens is None). See
+# feature_matrix.py and station_cube.py.
+CUBE_FLAGS = {
+    "cng":                 (["fuel_types"], ["CNG"]),
+    "lpg":                 (["fuel_types"], ["LPG"]),
+    "has_fuel":            (["fuel_types"], None),
+    **{f"service:{name}": (["services", "fuel_types"], keywords)
+       for name, keywords in SERVICE_GROUPS.items()},
+    # SGP vs Gulf head-to-head (chart 11), each brand in its own terms
+    "sgp_store":           (["services"], ["Way-Mart", "Market"]),
+    "sgp_service_center":  (["services"], ["Service Center", "Service Block"]),
+    "sgp_food":            (["services"], ["McDonald's"]),
+    "gulf_store":          (["services"], ["Shop", "Market"]),
+    "gulf_service_center": (["services"], ["Service Center"]),
+    "gulf_food":           (["services"], ["Coffee", "Hot Dog", "Sandwich"]),
+    # Web insight panel (stats.ts)
+    "waymart":             (["services"], ["Way-Mart"]),
+    "wc":                  (["services"], ["WC"]),
+    "service_center":      (["services"], ["Service Center"]),
+}
+
+# Measures summed per cube cell: distinct tokens listed in a column
+CUBE_MEASURES = {"fuel_type_count": "fuel_types"}
+
+REGION_ORDER = ["Tbilisi", "Imereti", "Adjara", "Kvemo Kartli", "Samegrelo",
+                "Kakheti", "Shida Kartli", "Samtskhe-Javakheti", "Guria"]
+SHARE_REGIONS = ["Tbilisi", "Kvemo Kartli", "Imereti", "Adjara", "Samegrelo",
+                 "Kakheti", "Shida Kartli", "Samtskhe-Javakheti", "Guria"]
+HEAD_TO_HEAD_METRICS = ["Total Stations", "Tbilisi", "CNG Stations", "LPG Stations",
+                        "With Store", "With Service Center", "With Food"]
+
+
+def _ints(values):
+    return [int(v) for v in values]
+
+
+# ── Chart series ─────────────────────────────────────────────────────────────
+
+def market_share(cube):
+    counts = cube.count("brand").reindex(BRAND_ORDER, fill_value=0)
+    total = int(counts.sum())
+    return {
+        "brands": BRAND_ORDER,
+        "stations": _ints(counts),
+        "percent": [c / total * 100 if total else 0 for c in counts],
+    }
+
+
+def tbilisi(cube):
+    counts = cube.count("brand", city="Tbilisi").reindex(BRAND_ORDER, fill_value=0)
+    return {"brands": BRAND_ORDER, "stations": _ints(counts)}
+
+
+def top_cities(cube, n=12):
+    """Top `n` cities by stations (largest first), stations per brand in each."""
+    cells = cube.cells[cube.cells["city"] != ""]
+    city_counts = cells.groupby("city")["n"].sum()
+    top = city_counts.nlargest(n).index.tolist()
+
+    pivot = cells[cells["city"].isin(top)].groupby(["city", "brand"])["n"].sum().unstack(fill_value=0)
+    pivot = pivot.reindex(columns=BRAND_ORDER, fill_value=0)
+    # The chart's bottom-to-top order, reversed
+    pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=True).index][::-1]
+    return {
+        "cities": pivot.index.tolist(),
+        "brands": BRAND_ORDER,
+        "stations": [_ints(row) for row in pivot.to_numpy()],
+    }
+
+
+def coverage_gaps(cube, n=15):
+    """Cities with competitors but no SGP: competitor stations and dominant brand."""
+    cells = cube.cells
+    sgp_cities = set(cells[cells["brand"] == "SGP"]["city"].unique())
+    non_sgp = cells[(cells["brand"] != "SGP") & (~cells["city"].isin(sgp_cities)) & (cells["city"] != "")]
+    by_city_brand = non_sgp.groupby(["city", "brand"])["n"].sum()
+    gap_counts = by_city_brand.groupby(level="city").sum().nlargest(n)
+    return {
+        "cities": gap_counts.index.tolist(),
+        "stations": _ints(gap_counts),
+        # Ties: first brand alphabetically
+        "dominantBrand": [by_city_brand[city].idxmax() for city in gap_counts.index],
+    }
+
+
+def alt_fuel(cube):
+    return {
+        "brands": BRAND_ORDER,
+        "cng": _ints(cube.count("brand", flags=["cng"]).reindex(BRAND_ORDER, fill_value=0)),
+        "lpg": _ints(cube.count("brand", flags=["lpg"]).reindex(BRAND_ORDER, fill_value=0)),
+    }
+
+
+def service_comparison(cube):
+    """% of each brand's stations offering each service group."""
+    totals = cube.count("brand").reindex(BRAND_ORDER, fill_value=0).tolist()
+    percent = {}
+    for name in SERVICE_GROUPS:
+        counts = cube.count("brand", flags=[f"service:{name}"]).reindex(BRAND_ORDER, fill_value=0)
+        percent[name] = [round(count / total * 100, 1) if total else 0
+                         for count, total in zip(counts.tolist(), totals)]
+    return {"brands": BRAND_ORDER, "services": list(SERVICE_GROUPS), "percent": percent}
+
+
+def regional(cube):
+    cells = cube.cells[cube.cells["region"].isin(REGION_ORDER)]
+    pivot = cells.groupby(["region", "brand"])["n"].sum().unstack(fill_value=0)
+    pivot = pivot.reindex(columns=BRAND_ORDER, fill_value=0)
+    pivot = pivot.reindex(REGION_ORDER, fill_value=0)
+    return {
+        "regions": REGION_ORDER,
+        "brands": BRAND_ORDER,
+        "stations": [_ints(row) for row in pivot.to_numpy()],
+    }
+
+
+def sgp_regional_share(cube):
+    """SGP share per region (largest first) and nationally, over SHARE_REGIONS."""
+    totals = cube.count("region")
+    sgp_counts = cube.count("region", brand="SGP")
+    rows = []
+    for region in SHARE_REGIONS:
+        total = int(totals.get(region, 0))
+        sgp = int(sgp_counts.get(region, 0))
+        if total > 0:
+            rows.append((region, sgp, total, sgp / total * 100))
+    rows.sort(key=lambda r: -r[3])
+
+    sgp_n = sum(r[1] for r in rows)
+    total_n = sum(r[2] for r in rows)
+    return {
+        "regions": [r[0] for r in rows],
+        "sgp": [r[1] for r in rows],
+        "stations": [r[2] for r in rows],
+        "percent": [r[3] for r in rows],
+        "nationalPercent": sgp_n / total_n * 100 if total_n > 0 else 18,
+    }
+
+
+def fuel_diversity(cube):
+    """Stations with and without fuel data, and fuel types per station that has them."""
+    totals = cube.count("brand")
+    with_fuel = cube.count("brand", flags=["has_fuel"])
+    fuel_types = cube.total("fuel_type_count", "brand", flags=["has_fuel"])
+    has_fuel, no_fuel, avg_types = [], [], []
+    for b in BRAND_ORDER:
+        total = int(totals.get(b, 0))
+        n = int(with_fuel.get(b, 0))
+        has_fuel.append(n)
+        no_fuel.append(total - n)
+        avg_types.append(round(fuel_types[b] / n, 1) if n > 0 else 0)
+    return {"brands": BRAND_ORDER, "withFuel": has_fuel, "withoutFuel": no_fuel,
+            "avgFuelTypes": avg_types}
+
+
+def competitive_intensity(cube, n=15):
+    """Cities served by 2+ brands, most brands first."""
+    cells = cube.cells[cube.cells["city"] != ""]
+    city_brands = cells.groupby("city")["brand"].nunique()
+    city_total = cells.groupby("city")["n"].sum()
+    top = city_brands[city_brands >= 2].sort_values(ascending=False).head(n)
+    return {
+        "cities": top.index.tolist(),
+        "stations": [int(city_total[c]) for c in top.index],
+        "brands": _ints(top),
+    }
+
+
+def sgp_vs_gulf(cube):
+    def count(brand, *flags, **equals):
+        return int(cube.select(flags, brand=brand, **equals)["n"].sum())
+
+    def values(brand, prefix):
+        return [
+            count(brand),
+            count(brand, city="Tbilisi"),
+            count(brand, "cng"),
+            count(brand, "lpg"),
+            count(brand, f"{prefix}_store"),
+            count(brand, f"{prefix}_service_center"),
+            count(brand, f"{prefix}_food"),
+        ]
+
+    return {"metrics": HEAD_TO_HEAD_METRICS, "SGP": values("SGP", "sgp"),
+            "Gulf": values("Gulf", "gulf")}
+
+
+def geographic_scatter(cube):
+    # The chart plots every station; the export keeps the per-brand counts
+    return {"brands": BRAND_ORDER,
+            "stations": [len(cube.points.get(b, ((), ()))[0]) for b in BRAND_ORDER]}
+
+
+def expansion_opportunity(cube, n=12):
+    """
+    The `n` largest SGP-free cities by competitor stations, scored
+    stations x brands (more competitors = proven demand), best first.
+    """
+    cells = cube.cells
+    sgp_cities = set(cells[cells["brand"] == "SGP"]["city"].unique())
+    non_sgp = cells[(cells["brand"] != "SGP") & (~cells["city"].isin(sgp_cities)) & (cells["city"] != "")]
+    gaps = non_sgp.groupby("city").agg(
+        stations=("n", "sum"),
+        brands=("brand", "nunique"),
+    ).sort_values("stations", ascending=False).head(n)
+    gaps["opportunity"] = gaps["stations"] * gaps["brands"]
+    # The chart's bottom-to-top order, reversed
+    gaps = gaps.sort_values("opportunity", ascending=True)[::-1]
+    return {
+        "cities": gaps.index.tolist(),
+        "stations": _ints(gaps["stations"]),
+        "brands": _ints(gaps["brands"]),
+        "score": _ints(gaps["opportunity"]),
+    }
+
+
+# (chart, series function), in chart order
+CHART_SERIES = [
+    ("01_market_share",          market_share),
+    ("02_tbilisi_battle",        tbilisi),
+    ("03_top_cities_stacked",    top_cities),
+    ("04_sgp_coverage_gaps",     coverage_gaps),
+    ("05_alt_fuel_leadership",   alt_fuel),
+    ("06_service_comparison",    service_comparison),
+    ("07_regional_presence",     regional),
+    ("08_sgp_regional_share",    sgp_regional_share),
+    ("09_fuel_diversity",        fuel_diversity),
+    ("10_competitive_intensity", competitive_intensity),
+    ("11_sgp_vs_gulf",           sgp_vs_gulf),
+    ("12_geographic_scatter",    geographic_scatter),
+    ("13_expansion_opportunity", expansion_opportunity),
+]
+
+
+# ── Web insight panel (web/src/lib/stats.ts) ─────────────────────────────────
+
+def js_round(x):
+    """Math.round: halves round up."""
+    return int(x + 0.5) if x >= 0 else -int(-x + 0.5)
+
+
+def by_brand(series):
+    return {b: int(series.get(b, 0)) for b in WEB_RECORD_ORDER}
+
+
+def city_stats(cube):
+    """
+    Stations per city (blank city left out), most stations first. Ties keep
+    the order in which the cities first appear in the station list, as
+    computeCityStats does.
+    """
+    cells = cube.cells[cube.cells["city"] != ""]
+    counts = cells.groupby(["city", "brand"])["n"].sum()
+    first = cells.groupby("city")["first"].min()
+    stats = [
+        {"city": city, "total": int(group.sum()), "byBrand": by_brand(group.droplevel("city"))}
+        for city, group in counts.groupby(level="city")
+    ]
+    return sorted(stats, key=lambda c: (-c["total"], first[c["city"]]))
+
+
+def insights(cube):
+    totals = cube.count("brand")
+    total = int(totals.sum())
+    market = sorted(
+        ({"brand": b, "count": int(totals.get(b, 0)),
+          "percentage": js_round(totals.get(b, 0) / total * 1000) / 10 if total else 0,
+          "color": BRAND_COLORS[b]} for b in WEB_BRAND_ORDER),
+        key=lambda m: -m["count"])
+
+    def flag_count(flag, brand):
+        return int(cube.select([flag], brand=brand)["n"].sum())
+
+    def competitor_max(flag):
+        return max(flag_count(flag, b) for b in WEB_BRAND_ORDER if b != "SGP")
+
+    def percent(count):
+        return js_round(count / sgp_total * 100) if sgp_total > 0 else 0
+
+    sgp_total = int(totals.get("SGP", 0))
+    counts = {flag: flag_count(flag, "SGP")
+              for flag in ("cng", "lpg", "waymart", "wc", "service:EV Charging", "service_center")}
+    sgp = {
+        "totalStations": sgp_total,
+        "marketShare": js_round(sgp_total / total * 1000) / 10 if total else 0,
+        "cngCount": counts["cng"],
+        "cngCompetitorMax": competitor_max("cng"),
+        "lpgCount": counts["lpg"],
+        "lpgCompetitorMax": competitor_max("lpg"),
+        "waymartCount": counts["waymart"],
+        "waymartPercent": percent(counts["waymart"]),
+        "wcCount": counts["wc"],
+        "wcPercent": percent(counts["wc"]),
+        "evChargingCount": counts["service:EV Charging"],
+        "evChargingPercent": percent(counts["service:EV Charging"]),
+        "serviceCenterCount": counts["service_center"],
+        "serviceCenterPercent": percent(counts["service_center"]),
+    }
+
+    cities = city_stats(cube)
+    gaps = []
+    for c in cities:
+        if c["byBrand"]["SGP"] == 0 and c["total"] >= 2:
+            priority = "high" if c["total"] >= 10 else "medium" if c["total"] >= 5 else "low"
+            gaps.append({
+                "city": c["city"],
+                "competitorStations": c["total"],
+                "brands": [b for b, n in c["byBrand"].items() if n > 0],
+                "priority": priority,
+            })
+
+    return {
+        "marketShare": market,
+        "cityStats": cities,
+        "sgpInsights": sgp,
+        "coverageGaps": gaps,
+        "tbilisiStats": next((c for c in cities if c["city"] == "Tbilisi"), None),
+    }
+
+
+# ── Export ───────────────────────────────────────────────────────────────────
+
+def build_analytics(cube):
+    return {
+        "version": FORMAT_VERSION,
+        "stations": int(cube.cells["n"].sum()),
+        "charts": {name: fn(cube) for name, fn in CHART_SERIES},
+        "insights": insights(cube),
+    }
+
+
+def _rounded(value):
+    if isinstance(value, float):
+        return round(value, 2)
+    if isinstance(value, dict):
+        return {k: _rounded(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_rounded(v) for v in value]
+    return value
+
+
+def write_analytics(cube, path=ANALYTICS_PATH):
+    """Write build_analytics(cube) to `path` as compact JSON; return the path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_rounded(build_analytics(cube)), f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp, path)
+    return path
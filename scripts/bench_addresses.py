@@ -0,0 +1,110 @@
+"""
+Benchmark: Gulf/Wissol address normalization — compiled, memoized
+AddressRules vs. the old per-row string passes.
+
+Builds a synthetic million-row address column from the shapes seen in the
+scraped data ("City, street #N", bare street names, road numbers, multi-
+line addresses), checks both implementations agree, and reports wall time
+for the old per-row code, AddressRules per row (LRU-cached) and the
+column-batch API. Run once with realistic repetition (a limited pool of
+distinct addresses) and once with every address distinct, where caching
+cannot help and only the compiled rules count.
+
+Usage:
+    python scripts/bench_addresses.py             # 1,000,000 rows
+    python scripts/bench_addresses.py 200000
+"""
+
+import random
+import sys
+import time
+
+import combine_data
+from address_rules import AddressRules
+
+CITIES = list(combine_data.CITY_CENTERS)
+STREETS = ["Agmashenebeli Avenue", "Rustaveli Str.", "Chavchavadze ave.",
+           "Kakheti Highway", "Tbilisi-Senaki-Leselidze hwy", "Tsereteli Str."]
+FRAGMENTS = ["Near Digomi Bridge", "Opposite the Metro", "Village Norio",
+             "Right Bank", "N64 Road", "Airport Road"]
+
+
+def legacy_is_valid_city(name):
+    """The original implementation."""
+    if not name:
+        return False
+    low = name.lower()
+    for kw in combine_data.NOT_CITY_KEYWORDS:
+        if kw in low:
+            return False
+    import re
+    if re.search(r'\bN\s*\d', name):
+        return False
+    return True
+
+
+def legacy_normalize(address):
+    """The original Gulf cleanup and city parse."""
+    addr = address.replace("\n", " ").replace("\r", " ").strip()
+    addr = " ".join(addr.split())
+    city = addr.split(",")[0].strip() if "," in addr else ""
+    if not legacy_is_valid_city(city):
+        city = ""
+    return addr, city
+
+
+def synthetic_address(rnd, i):
+    kind = rnd.random()
+    if kind < 0.5:
+        return f"{rnd.choice(CITIES)}, {rnd.choice(STREETS)} #{i}"
+    if kind < 0.7:
+        return f"{rnd.choice(FRAGMENTS)}, {rnd.choice(CITIES)}"
+    if kind < 0.85:
+        return f"  {rnd.choice(CITIES)},\n{rnd.choice(STREETS)}  #{i}\r\n"
+    return f"{rnd.choice(STREETS)} {i}"
+
+
+def synthetic_column(n, distinct, seed=0):
+    rnd = random.Random(seed)
+    pool = [synthetic_address(rnd, i) for i in range(distinct)]
+    return pool if distinct == n else [rnd.choice(pool) for _ in range(n)]
+
+
+def timed(fn, arg):
+    start = time.perf_counter()
+    result = fn(arg)
+    return result, time.perf_counter() - start
+
+
+def run(n, distinct):
+    column = synthetic_column(n, distinct)
+    print(f"\n{n:,} addresses, {len(set(column)):,} distinct")
+
+    old, old_t = timed(lambda col: [legacy_normalize(a) for a in col], column)
+
+    rules = AddressRules(combine_data.NOT_CITY_KEYWORDS)
+    per_row, row_t = timed(lambda col: [(rules.clean(a), rules.city(rules.clean(a))) for a in col],
+                           column)
+
+    rules = AddressRules(combine_data.NOT_CITY_KEYWORDS)
+
+    def batch(col):
+        cleaned = rules.cleaned(col)
+        return list(zip(cleaned, rules.cities(cleaned)))
+
+    batched, batch_t = timed(batch, column)
+    assert old == per_row == batched, "normalization differs"
+
+    print(f"  per-row string passes:  {old_t * 1000:8.1f} ms")
+    print(f"  AddressRules per row:   {row_t * 1000:8.1f} ms   ({old_t / row_t:.1f}x)")
+    print(f"  AddressRules batch:     {batch_t * 1000:8.1f} ms   ({old_t / batch_t:.1f}x)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    run(n, min(n, 20_000))
+    run(n, n)
+
+
+if __name__ == "__main__":
+    main()
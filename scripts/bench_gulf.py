@@ -0,0 +1,106 @@
+"""
+Benchmark: Gulf `var pins` extraction — bracket-matching scanner vs. the
+old lazy DOTALL regex.
+
+Builds synthetic map pages with large pin maps surrounded by realistic
+amounts of script and markup, checks both extractors agree, and reports
+wall time and peak Python heap for each. A last case puts `};` inside a
+pin description, where the old regex stops early and the page fails to
+parse.
+
+Usage:
+    python scripts/bench_gulf.py                  # 1k, 10k, 100k pins
+    python scripts/bench_gulf.py 5000 50000
+"""
+
+import json
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import gulf
+
+
+def legacy_decode_payload(body):
+    """The original implementation: decode the page, lazy DOTALL regex, json.loads."""
+    html = body.decode("utf-8")
+    match = re.search(r"var\s+pins\s*=\s*(\{.*?\})\s*;", html, re.DOTALL)
+    if not match:
+        raise ValueError("Could not find 'pins' data in the page source.")
+    return json.loads(match.group(1))
+
+
+def synthetic_page(n, description="", seed=0):
+    rnd = random.Random(seed)
+    pins = {}
+    for i in range(n):
+        pid = 5000 + i
+        pins[str(pid)] = {
+            "id": pid,
+            "name": f"Station {i}",
+            "description": description or f"Tbilisi, D. Agmashenebeli Avenue, #{i}",
+            "latitude": f"{41 + rnd.random() * 2:.10f}",
+            "longitude": f"{41 + rnd.random() * 5:.10f}",
+            "is_active": 1,
+            "fuel_types": rnd.sample(list(gulf.FUEL_TYPE_MAP), 4),
+            "poi_types": rnd.sample(list(gulf.POI_TYPE_MAP), 2),
+            "food_types": rnd.sample(list(gulf.FOOD_TYPE_MAP), 2),
+        }
+    filler = "<div class=\"card\"><p>Lorem ipsum dolor sit amet.</p></div>\n" * (n // 2)
+    page = (
+        "<html><head><script>var config = {\"lang\": \"en\"};</script></head><body>\n"
+        + filler
+        + "<script>\nvar pins = " + json.dumps(pins) + ";\n"
+        + "function initMap() { for (var k in pins) { addPin(pins[k]); } }\n</script>\n"
+        + filler
+        + "</body></html>\n"
+    )
+    return page.encode("utf-8"), pins
+
+
+def measure(fn, arg):
+    """Time one call, then repeat it under tracemalloc for the heap peak."""
+    start = time.perf_counter()
+    result = fn(arg)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(n):
+    body, pins = synthetic_page(n)
+    print(f"\n{n:,} pins, page {len(body) / 1e6:.1f} MB")
+    old, old_t, old_peak = measure(legacy_decode_payload, body)
+    new, new_t, new_peak = measure(gulf.decode_payload, body)
+    assert old == new == pins, "extractors disagree"
+    print(f"  lazy regex:  {old_t * 1000:8.1f} ms   peak {old_peak / 1e6:6.1f} MB")
+    print(f"  scanner:     {new_t * 1000:8.1f} ms   peak {new_peak / 1e6:6.1f} MB")
+    print(f"  speedup: {old_t / new_t:.1f}x, memory: {old_peak / new_peak:.1f}x less")
+
+
+def run_inner_terminator():
+    body, pins = synthetic_page(100, description="Kutaisi, Rustaveli Str. {closed};")
+    print("\n100 pins with '};' inside a description")
+    try:
+        legacy_decode_payload(body)
+        print("  lazy regex:  ok")
+    except ValueError as e:
+        print(f"  lazy regex:  FAILED ({type(e).__name__})")
+    assert gulf.decode_payload(body) == pins
+    print("  scanner:     ok")
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for n in sizes:
+        run(n)
+    run_inner_terminator()
+
+
+if __name__ == "__main__":
+    main()
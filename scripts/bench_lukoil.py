@@ -0,0 +1,120 @@
+"""
+Benchmark: Lukoil page parsing — single-pass tokenizer vs. the old
+two-findall regex extraction.
+
+Builds a synthetic stations page (table rows + Leaflet markers) of the same
+shape as lukoil.ge/stations, checks both parsers agree, and reports wall time
+and peak Python heap for each. The page is measured clean and again with a
+footer of numeric cells (pagination-style) after the table: each of those
+sends the old DOTALL row regex scanning to the end of the document.
+
+Usage:
+    python scripts/bench_lukoil.py            # 10,000 stations, 100 footer cells
+    python scripts/bench_lukoil.py 50000 200
+"""
+
+import random
+import re
+import sys
+import time
+import tracemalloc
+
+import lukoil
+
+CITIES = list(lukoil.CITY_MAP)
+ADDRESSES = list(lukoil.ADDRESS_MAP)
+TYPES = list(lukoil.TYPE_MAP)
+
+
+def legacy_parse_stations(html):
+    """The original implementation: two whole-document findall passes."""
+    markers = re.findall(
+        r'L\.marker\(\[([0-9.]+),\s*([0-9.]+)\]\);\s*\n\s*marker\.addTo\(mymap\);\s*\n\s*marker\.bindPopup\("(.*?)"\)',
+        html,
+    )
+    table_rows = re.findall(
+        r'<p class="text-lk-main text-md font-semibold">\s*(\d+)\s*</p>.*?'
+        r'<p class="text-lk-main text-md font-semibold">\s*(.*?)\s*</p>.*?'
+        r'<p class="text-lk-main text-sm font-semibold text-center">\s*(.*?)\s*</p>.*?'
+        r'<p class="text-lk-main text-md font-semibold">\s*(.*?)\s*</p>',
+        html,
+        re.DOTALL,
+    )
+    rows = []
+    for i, marker in enumerate(markers):
+        rows.append(lukoil.build_row(i, marker, table_rows[i] if i < len(table_rows) else None))
+    return rows
+
+
+def synthetic_page(n, footer_cells=0, seed=0):
+    rnd = random.Random(seed)
+    parts = ["<html><body><div class=\"stations\">\n"]
+    for i in range(1, n + 1):
+        parts.append(
+            '<div class="flex row">\n'
+            f'  <div class="cell"><p class="text-lk-main text-md font-semibold">\n    {i}\n  </p></div>\n'
+            f'  <div class="cell"><p class="text-lk-main text-md font-semibold">\n    {rnd.choice(CITIES)}\n  </p></div>\n'
+            '  <div class="cell"><span class="icon"></span>\n'
+            f'    <p class="text-lk-main text-sm font-semibold text-center">\n    {rnd.choice(ADDRESSES)}\n  </p></div>\n'
+            f'  <div class="cell"><p class="text-lk-main text-md font-semibold">\n    {rnd.choice(TYPES)}\n  </p></div>\n'
+            '</div>\n'
+        )
+    parts.append("</div>\n<script>\n")
+    for i in range(n):
+        lat = 41 + rnd.random() * 2
+        lng = 41 + rnd.random() * 5
+        parts.append(
+            f"    var marker = L.marker([{lat:.6f}, {lng:.6f}]);\n"
+            "    marker.addTo(mymap);\n"
+            f'    marker.bindPopup("\\u10d7\\u10d1\\u10d8\\u10da\\u10d8\\u10e1\\u10d8 {i}");\n'
+        )
+    parts.append("</script>\n<nav>")
+    for i in range(1, footer_cells + 1):
+        parts.append(f'<p class="text-lk-main text-md font-semibold">{i}</p>')
+    parts.append("</nav></body></html>\n")
+    return "".join(parts)
+
+
+def measure(fn, arg):
+    """Time one call, then repeat it under tracemalloc for the heap peak."""
+    start = time.perf_counter()
+    result = fn(arg)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run(n, footer_cells):
+    html = synthetic_page(n, footer_cells)
+    print(f"\nSynthetic page: {n:,} stations, {footer_cells} footer cells, {len(html) / 1e6:.1f} MB")
+
+    old, old_t, old_peak = measure(legacy_parse_stations, html)
+    new, new_t, new_peak = measure(lukoil.parse_stations, html)
+    assert old == new, "tokenizer output differs from regex output"
+
+    # Streaming straight from an encoded payload, as read from data/cache
+    body = html.encode("utf-8")
+    _, stream_t, stream_peak = measure(
+        lambda b: sum(1 for _ in lukoil.iter_stations(b)), body,
+    )
+
+    print(f"  regex findall:  {old_t * 1000:8.1f} ms   peak {old_peak / 1e6:6.1f} MB")
+    print(f"  tokenizer:      {new_t * 1000:8.1f} ms   peak {new_peak / 1e6:6.1f} MB")
+    print(f"  tokenizer (bytes stream, rows not kept):"
+          f" {stream_t * 1000:8.1f} ms   peak {stream_peak / 1e6:6.1f} MB")
+    print(f"  speedup: {old_t / new_t:.1f}x")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    footer_cells = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    run(n, 0)
+    if footer_cells:
+        run(n, footer_cells)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Co-location detection: groups of stations within `radius_m` of each other.
+
+Points are hashed into a grid of cells at least `radius_m` across, so any
+two points within range share a cell or sit in neighbouring ones. Each
+point is only compared with the points in its own and the eight
+surrounding cells, and pairs in range are joined with union-find; with
+stations spread over a country that is near-linear instead of the
+all-pairs O(n^2). Clusters are chained: A-B and B-C in range put A, B and
+C together even if A and C are further apart.
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from geocoder import KM_PER_DEGREE, haversine_km
+
+
+def find_clusters(lats, lons, radius_m):
+    """
+    Return clusters of 2+ point indices, each sorted, ordered by first index.
+    Points with missing coordinates are never clustered.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+    if len(valid) < 2:
+        return []
+
+    cell_lat = radius_m / 1000 / KM_PER_DEGREE
+    top = min(89.0, float(np.abs(lats[valid]).max()) + cell_lat)
+    cell_lon = cell_lat / math.cos(math.radians(top))
+    rows = np.floor(lats / cell_lat)
+    cols = np.floor(lons / cell_lon)
+
+    grid = defaultdict(list)
+    for i in valid.tolist():
+        grid[(rows[i], cols[i])].append(i)
+    grid = {cell: np.array(members) for cell, members in grid.items()}
+
+    parent = list(range(len(lats)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for (row, col), members in grid.items():
+        near = [grid.get((row + dr, col + dc)) for dr in (-1, 0, 1) for dc in (-1, 0, 1)]
+        candidates = np.concatenate([c for c in near if c is not None])
+        for i in members.tolist():
+            # Each pair is checked once, from its lower index
+            others = candidates[candidates > i]
+            if not len(others):
+                continue
+            dist_m = haversine_km(lats[i], lons[i], lats[others], lons[others]) * 1000
+            for j in others[dist_m <= radius_m].tolist():
+                ri, rj = find(i), find(j)
+                if ri != rj:
+                    parent[max(ri, rj)] = min(ri, rj)
+
+    groups = defaultdict(list)
+    for i in valid.tolist():
+        groups[find(i)].append(i)
+    return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
@@ -0,0 +1,178 @@
+"""
+Typed columnar copy of final.csv.
+
+final.csv keeps every value as text, so each reader re-infers types and
+re-fills blanks. Alongside it, combine_data writes data/final.columns/, a
+directory of plain NumPy .npy files that can be memory-mapped:
+
+    meta.json          row count, column kinds and category labels
+    latitude.npy       float64, NaN where the coordinate is blank
+    longitude.npy      float64
+    <column>.npy       integer codes into meta.json's category list,
+                       for every text column (brand, city, ...); the
+                       order of categories is not significant
+    <column>.tokens.npy
+                       uint8 packed bitsets of fuel_types and services:
+                       bit i of a row (bit i % 8 of byte i // 8) is set if
+                       the station lists token i of meta.json's
+                       "vocabulary" (see vocabulary.py)
+
+.npy is used rather than .npz because members of a zip archive cannot be
+memory-mapped. meta.json also records the size and mtime of the final.csv
+it was written with, so a CSV edited or regenerated on its own is never
+shadowed by a stale copy (see is_current()).
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+import vocabulary
+
+META_NAME = "meta.json"
+FORMAT_VERSION = 2
+
+FLOAT_COLUMNS = ("latitude", "longitude")
+
+
+def code_dtype(n):
+    """Smallest signed integer dtype that can index `n` categories."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def to_float(values):
+    out = np.empty(len(values), dtype=np.float64)
+    for i, v in enumerate(values):
+        try:
+            out[i] = float(v)
+        except (TypeError, ValueError):
+            out[i] = np.nan
+    return out
+
+
+def encode(values):
+    """Text column -> (codes, sorted category labels)."""
+    categories = sorted(set(values))
+    index = {c: i for i, c in enumerate(categories)}
+    codes = np.fromiter((index[v] for v in values), dtype=code_dtype(len(categories)),
+                        count=len(values))
+    return codes, categories
+
+
+def _stat(path):
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def save(rows, path, fieldnames, source=None, vocab=None):
+    """
+    Write `rows` (dicts of text, or a StationTable) as a column directory
+    at `path`.
+
+    `source` is the CSV the same rows were just saved to; its size and
+    mtime are recorded so is_current() can tell if it changes later.
+    With a Vocabulary `vocab` that knows every label, the token columns
+    are also stored as bitsets.
+    """
+    if hasattr(rows, "code_column"):
+        # StationTable: floats and codes are already there, nothing to parse
+        arrays = {
+            name: rows.float_column(name) if name in FLOAT_COLUMNS
+            else (rows.code_column(name).astype(code_dtype(len(rows.values[name]))),
+                  rows.values[name])
+            for name in fieldnames
+        }
+    else:
+        arrays = {}
+        for name in fieldnames:
+            values = [r.get(name) or "" for r in rows]
+            arrays[name] = to_float(values) if name in FLOAT_COLUMNS else encode(values)
+    _write(path, arrays, len(rows), source, vocab)
+
+
+def _write(path, arrays, n_rows, source, vocab=None):
+    tmp = f"{path}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = {}
+    for name, array in arrays.items():
+        if name in FLOAT_COLUMNS:
+            np.save(os.path.join(tmp, f"{name}.npy"), array)
+            columns[name] = {"kind": "float64"}
+        else:
+            codes, categories = array
+            np.save(os.path.join(tmp, f"{name}.npy"), codes)
+            columns[name] = {"kind": "category", "categories": categories}
+            if vocab is not None and name in vocabulary.TOKEN_FIELDS:
+                # Split once per category, then expanded through the codes
+                bits = vocabulary.pack(vocab.matrix(categories, codes))
+                np.save(os.path.join(tmp, f"{name}.tokens.npy"), bits)
+                columns[name]["tokens"] = True
+
+    meta = {
+        "version": FORMAT_VERSION,
+        "rows": n_rows,
+        "columns": columns,
+        "source": _stat(source) if source else None,
+        "vocabulary": vocab.names if vocab is not None else None,
+    }
+    with open(os.path.join(tmp, META_NAME), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp, path)
+
+
+def read_meta(path):
+    with open(os.path.join(path, META_NAME), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def is_current(path, source):
+    """True if `path` exists and was written together with `source` as it is now."""
+    try:
+        meta = read_meta(path)
+    except (FileNotFoundError, ValueError):
+        return False
+    if meta.get("version") != FORMAT_VERSION:
+        return False
+    if not os.path.exists(source):
+        return True
+    return meta.get("source") == _stat(source)
+
+
+def load(path, mmap_mode="r"):
+    """
+    Return {column: array}. Float columns and category codes are
+    memory-mapped; text columns are returned as object arrays of labels.
+    """
+    meta = read_meta(path)
+    data = {}
+    for name, spec in meta["columns"].items():
+        array = np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+        if spec["kind"] == "category":
+            labels = np.array(spec["categories"], dtype=object)
+            array = labels[array]
+        data[name] = array
+    return data
+
+
+def load_tokens(path, mmap_mode="r"):
+    """
+    Return (token names by ID, {column: packed bitsets}) for the token
+    columns stored at `path`, or None if it has none.
+    """
+    meta = read_meta(path)
+    if not meta.get("vocabulary"):
+        return None
+    bits = {
+        name: np.load(os.path.join(path, f"{name}.tokens.npy"), mmap_mode=mmap_mode)
+        for name, spec in meta["columns"].items() if spec.get("tokens")
+    }
+    return meta["vocabulary"], bits
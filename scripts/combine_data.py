@@ -1,14 +1,34 @@
+import argparse
 import csv
-import math
+import heapq
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import address_rules
+import colocation
+import columnar
+import external_sort
+import geocoder
+import regions
+import snapshots
+import sources
+import station_diff
+import vocabulary
+from run_report import REPORT_DIR, RunReport
+from sources import Source, builtins_registered, register, registry
+from station_table import StationTable
 
 DATA_DIR = "data"
 FINAL_PATH = os.path.join(DATA_DIR, "final.csv")
+# Typed, memory-mappable copy of final.csv (see columnar.py)
+COLUMNS_PATH = os.path.join(DATA_DIR, "final.columns")
+CLUSTERS_PATH = os.path.join(DATA_DIR, "clusters.csv")
 
 FIELDNAMES = [
     "station_id", "brand", "name", "address", "city",
     "latitude", "longitude", "fuel_types", "services",
-    "working_hours", "phone", "station_type",
+    "working_hours", "phone", "station_type", "region",
 ]
 
 # ---------------------------------------------------------------------------
@@ -53,8 +73,12 @@ CITY_CENTERS = {
     "Ambrolauri":    (42.5175, 43.1535),
 }
 
-# Max distance in degrees (~15km) for city assignment
-MAX_CITY_DISTANCE = 0.15
+# Max great-circle distance (km) for city assignment
+MAX_CITY_DISTANCE_KM = 15.0
+
+# Optional extra places for coordinate lookup: a name,latitude,longitude CSV
+# or a GeoNames dump such as GE.txt (see geocoder.load_gazetteer)
+GAZETTEER_PATH = os.path.join(DATA_DIR, "gazetteer.csv")
 
 # Keywords indicating an address fragment, not a city name
 NOT_CITY_KEYWORDS = [
@@ -66,35 +90,47 @@ NOT_CITY_KEYWORDS = [
 ]
 
 
-def haversine_approx(lat1, lon1, lat2, lon2):
-    """Approximate distance in degrees (sufficient for nearest-city matching)."""
-    return math.sqrt((lat1 - lat2) ** 2 + (lon1 - lon2) ** 2)
+_geocoder = None
+
+
+def get_geocoder():
+    """The shared Geocoder over CITY_CENTERS plus GAZETTEER_PATH, built on first use."""
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = geocoder.from_files(CITY_CENTERS, GAZETTEER_PATH, MAX_CITY_DISTANCE_KM)
+    return _geocoder
 
 
 def city_from_coords(lat, lon):
-    """Find the nearest city center within MAX_CITY_DISTANCE."""
-    best_city, best_dist = "", float("inf")
-    for city, (clat, clon) in CITY_CENTERS.items():
-        d = haversine_approx(lat, lon, clat, clon)
-        if d < best_dist:
-            best_dist = d
-            best_city = city
-    return best_city if best_dist <= MAX_CITY_DISTANCE else ""
+    """Find the nearest place within MAX_CITY_DISTANCE_KM."""
+    return get_geocoder().lookup(lat, lon)
+
+
+def prime_city_lookup(rows):
+    """
+    Resolve every row's coordinates in one batch before rows are normalized.
+    Each batch replaces the previous one, so a streamed combine primed chunk
+    by chunk keeps the lookup cache bounded.
+    """
+    lats, lons = [], []
+    for r in rows:
+        try:
+            lat, lon = float(r["latitude"]), float(r["longitude"])
+        except (ValueError, KeyError):
+            continue
+        lats.append(lat)
+        lons.append(lon)
+    get_geocoder().clear()
+    get_geocoder().prime(lats, lons)
+
+
+# NOT_CITY_KEYWORDS and the road-number rule, compiled once (address_rules.py)
+ADDRESS_RULES = address_rules.AddressRules(NOT_CITY_KEYWORDS)
 
 
 def is_valid_city(name):
     """Check if parsed city name is likely a real city (not an address fragment)."""
-    if not name:
-        return False
-    low = name.lower()
-    for kw in NOT_CITY_KEYWORDS:
-        if kw in low:
-            return False
-    # Reject if it contains "N" followed by a digit (like "N64", "N9")
-    import re
-    if re.search(r'\bN\s*\d', name):
-        return False
-    return True
+    return ADDRESS_RULES.is_valid_city(name)
 
 
 # ---------------------------------------------------------------------------
@@ -120,209 +156,239 @@ SGP_DISTRICT_MAP = {
 
 
 def load_csv(filename):
+    return list(iter_csv(filename))
+
+
+def iter_csv(filename):
+    """Rows of data/<filename>, read one at a time."""
     path = os.path.join(DATA_DIR, filename)
     with open(path, encoding="utf-8") as f:
-        return list(csv.DictReader(f))
+        yield from csv.DictReader(f)
 
 
 # ---------------------------------------------------------------------------
 # Gulf
 # ---------------------------------------------------------------------------
-def process_gulf(rows):
-    kept, excluded = [], []
-    for r in rows:
-        fuel = r.get("fuel_types", "").strip()
-        poi = r.get("poi_types", "").strip()
-
-        # Exclude Oil Terminals and Service-Centers that sell no fuel
-        if not fuel and poi in ("Oil Terminal", "Service Center"):
-            excluded.append((r["id"], r["name"], f"No fuel, poi_types={poi}"))
-            continue
-
-        # Build services from poi_types + food_types, dropping noise labels
-        svc_parts = []
-        for p in poi.split(", "):
-            if p and p not in ("Gas Station", "Shop"):
-                svc_parts.append(p)
-        food = r.get("food_types", "").strip()
-        if food:
-            svc_parts.extend(food.split(", "))
-
-        # Clean newlines from address before parsing
-        addr = r.get("address", "").replace("\n", " ").replace("\r", " ").strip()
-        addr = " ".join(addr.split())  # collapse multiple spaces
-
-        # City: first segment before comma in address
-        city = addr.split(",")[0].strip() if "," in addr else ""
-
-        # Validate: reject address fragments parsed as city names
-        if not is_valid_city(city):
-            city = ""
-
-        # Fallback: coordinate-based city lookup
-        if not city:
-            try:
-                city = city_from_coords(float(r["latitude"]), float(r["longitude"]))
-            except (ValueError, KeyError):
-                pass
-
-        kept.append({
-            "station_id": f"GULF_{r['id']}",
-            "brand": "Gulf",
-            "name": r["name"],
-            "address": addr,
-            "city": city,
-            "latitude": r["latitude"],
-            "longitude": r["longitude"],
-            "fuel_types": fuel,
-            "services": ", ".join(svc_parts),
-            "working_hours": "",
-            "phone": "",
-            "station_type": "",
-        })
-    return kept, excluded
+def exclude_gulf(r):
+    fuel = r.get("fuel_types", "").strip()
+    poi = r.get("poi_types", "").strip()
+
+    # Exclude Oil Terminals and Service-Centers that sell no fuel
+    if not fuel and poi in ("Oil Terminal", "Service Center"):
+        return f"No fuel, poi_types={poi}"
+    return None
+
+
+def normalize_gulf(r):
+    fuel = r.get("fuel_types", "").strip()
+    poi = r.get("poi_types", "").strip()
+
+    # Build services from poi_types + food_types, dropping noise labels
+    svc_parts = []
+    for p in poi.split(", "):
+        if p and p not in ("Gas Station", "Shop"):
+            svc_parts.append(p)
+    food = r.get("food_types", "").strip()
+    if food:
+        svc_parts.extend(food.split(", "))
+
+    # Clean newlines and repeated spaces from address before parsing
+    addr = ADDRESS_RULES.clean(r.get("address", ""))
+
+    # City: first segment before comma in address, unless it is an
+    # address fragment
+    city = ADDRESS_RULES.city(addr)
+
+    # Fallback: coordinate-based city lookup
+    if not city:
+        try:
+            city = city_from_coords(float(r["latitude"]), float(r["longitude"]))
+        except (ValueError, KeyError):
+            pass
+
+    return {
+        "station_id": f"GULF_{r['id']}",
+        "brand": "Gulf",
+        "name": r["name"],
+        "address": addr,
+        "city": city,
+        "latitude": r["latitude"],
+        "longitude": r["longitude"],
+        "fuel_types": fuel,
+        "services": ", ".join(svc_parts),
+        "working_hours": "",
+        "phone": "",
+        "station_type": "",
+    }
 
 
 # ---------------------------------------------------------------------------
 # Rompetrol
 # ---------------------------------------------------------------------------
-def process_rompetrol(rows):
-    kept, excluded = [], []
-    for r in rows:
-        fuel = r.get("fuel_types", "").strip()
-        services = r.get("services", "").strip()
-
-        # Exclude Head Office and entries with no fuel AND no services
-        if not fuel and not services:
-            excluded.append((r["id"], r["name"], "No fuel_types and no services"))
-            continue
-
-        kept.append({
-            "station_id": f"ROMPETROL_{r['id']}",
-            "brand": "Rompetrol",
-            "name": r["name"],
-            "address": r["address"],
-            "city": r.get("city", ""),
-            "latitude": r["latitude"],
-            "longitude": r["longitude"],
-            "fuel_types": fuel,
-            "services": services,
-            "working_hours": "24/7",
-            "phone": r.get("phone", ""),
-            "station_type": "",
-        })
-    return kept, excluded
+def exclude_rompetrol(r):
+    fuel = r.get("fuel_types", "").strip()
+    services = r.get("services", "").strip()
+
+    # Exclude Head Office and entries with no fuel AND no services
+    if not fuel and not services:
+        return "No fuel_types and no services"
+    return None
+
+
+def normalize_rompetrol(r):
+    return {
+        "station_id": f"ROMPETROL_{r['id']}",
+        "brand": "Rompetrol",
+        "name": r["name"],
+        "address": r["address"],
+        "city": r.get("city", ""),
+        "latitude": r["latitude"],
+        "longitude": r["longitude"],
+        "fuel_types": r.get("fuel_types", "").strip(),
+        "services": r.get("services", "").strip(),
+        "working_hours": "24/7",
+        "phone": r.get("phone", ""),
+        "station_type": "",
+    }
 
 
 # ---------------------------------------------------------------------------
 # Lukoil
 # ---------------------------------------------------------------------------
-def process_lukoil(rows):
-    kept, excluded = [], []
-    for r in rows:
-        city = r.get("city", "")
-        addr = r.get("address", "")
-        name = f"{city}, {addr}" if city else addr
-
-        kept.append({
-            "station_id": f"LUKOIL_{r['id']}",
-            "brand": "Lukoil",
-            "name": name,
-            "address": addr,
-            "city": city,
-            "latitude": r["latitude"],
-            "longitude": r["longitude"],
-            "fuel_types": "",
-            "services": "",
-            "working_hours": "",
-            "phone": "",
-            "station_type": r.get("type", ""),
-        })
-    return kept, excluded
+def normalize_lukoil(r):
+    city = r.get("city", "")
+    addr = r.get("address", "")
+    name = f"{city}, {addr}" if city else addr
+
+    return {
+        "station_id": f"LUKOIL_{r['id']}",
+        "brand": "Lukoil",
+        "name": name,
+        "address": addr,
+        "city": city,
+        "latitude": r["latitude"],
+        "longitude": r["longitude"],
+        "fuel_types": "",
+        "services": "",
+        "working_hours": "",
+        "phone": "",
+        "station_type": r.get("type", ""),
+    }
 
 
 # ---------------------------------------------------------------------------
 # Wissol
 # ---------------------------------------------------------------------------
-def process_wissol(rows):
-    kept, excluded = [], []
-    for r in rows:
-        svc = r.get("services", "").strip()
+def exclude_wissol(r):
+    # Exclude Truck Service Center (repair-only, no fuel)
+    if r.get("services", "").strip() == "Truck Service Center":
+        return "Truck Service Center (no fuel)"
+    return None
+
+
+def normalize_wissol(r):
+    svc = r.get("services", "").strip()
+    addr = r.get("address", "").strip()
+
+    # City: first segment before comma, unless it is an address fragment
+    city = ADDRESS_RULES.city(addr)
+
+    # Fallback: coordinate-based city lookup
+    if not city:
+        try:
+            city = city_from_coords(float(r["latitude"]), float(r["longitude"]))
+        except (ValueError, KeyError):
+            pass
+
+    return {
+        "station_id": f"WISSOL_{r['id']}",
+        "brand": "Wissol",
+        "name": addr if addr else city,
+        "address": addr,
+        "city": city,
+        "latitude": r["latitude"],
+        "longitude": r["longitude"],
+        "fuel_types": "",
+        "services": svc,
+        "working_hours": r.get("working_hours", ""),
+        "phone": r.get("phone", ""),
+        "station_type": "",
+    }
 
-        # Exclude Truck Service Center (repair-only, no fuel)
-        if svc == "Truck Service Center":
-            excluded.append((r["id"], r["address"], "Truck Service Center (no fuel)"))
-            continue
 
-        addr = r.get("address", "").strip()
-
-        # City: first segment before comma
-        city = addr.split(",")[0].strip() if "," in addr else ""
-
-        # Validate: reject address fragments parsed as city names
-        if not is_valid_city(city):
-            city = ""
-
-        # Fallback: coordinate-based city lookup
-        if not city:
-            try:
-                city = city_from_coords(float(r["latitude"]), float(r["longitude"]))
-            except (ValueError, KeyError):
-                pass
-
-        kept.append({
-            "station_id": f"WISSOL_{r['id']}",
-            "brand": "Wissol",
-            "name": addr if addr else city,
-            "address": addr,
-            "city": city,
-            "latitude": r["latitude"],
-            "longitude": r["longitude"],
-            "fuel_types": "",
-            "services": svc,
-            "working_hours": r.get("working_hours", ""),
-            "phone": r.get("phone", ""),
-            "station_type": "",
-        })
-    return kept, excluded
+# ---------------------------------------------------------------------------
+# SGP (SOCAR Georgia Petroleum)
+# ---------------------------------------------------------------------------
+def exclude_sgp(r):
+    fuel = r.get("fuel_types", "").strip()
+    svc = r.get("services", "").strip()
+
+    # Exclude EV-charger-only entries (no fuel)
+    if not fuel and "Charger" in svc:
+        return "EV Charger only (no fuel)"
+    return None
+
+
+def normalize_sgp(r):
+    # Use district (specific city/town) instead of region
+    district = r.get("district", "").strip()
+    city = SGP_DISTRICT_MAP.get(district, district)
+    # Title-case fix for lowercase entries
+    if city and city[0].islower():
+        city = city.title()
+
+    return {
+        "station_id": f"SGP_{r['id']}",
+        "brand": "SGP",
+        "name": r["name"],
+        "address": r["address"],
+        "city": city,
+        "latitude": r["latitude"],
+        "longitude": r["longitude"],
+        "fuel_types": r.get("fuel_types", "").strip(),
+        "services": r.get("services", "").strip(),
+        "working_hours": "",
+        "phone": "",
+        "station_type": "",
+    }
 
 
 # ---------------------------------------------------------------------------
-# SGP (SOCAR Georgia Petroleum)
+# Source registration (order = order of the combine report)
 # ---------------------------------------------------------------------------
-def process_sgp(rows):
-    kept, excluded = [], []
-    for r in rows:
-        fuel = r.get("fuel_types", "").strip()
-        svc = r.get("services", "").strip()
+GULF = register(Source("gulf", "Gulf", scraper="gulf",
+                       exclude=exclude_gulf, normalize=normalize_gulf,
+                       prepare=prime_city_lookup))
+ROMPETROL = register(Source("rompetrol", "Rompetrol", scraper="rompetrol",
+                            exclude=exclude_rompetrol, normalize=normalize_rompetrol))
+LUKOIL = register(Source("lukoil", "Lukoil", scraper="lukoil",
+                         normalize=normalize_lukoil))
+WISSOL = register(Source("wissol", "Wissol", scraper="wissol",
+                         exclude=exclude_wissol, normalize=normalize_wissol,
+                         prepare=prime_city_lookup, label_field="address"))
+SGP = register(Source("sgp", "SGP", scraper="sgp",
+                      exclude=exclude_sgp, normalize=normalize_sgp))
+builtins_registered()
 
-        # Exclude EV-charger-only entries (no fuel)
-        if not fuel and "Charger" in svc:
-            excluded.append((r["id"], r["name"], "EV Charger only (no fuel)"))
-            continue
 
-        # Use district (specific city/town) instead of region
-        district = r.get("district", "").strip()
-        city = SGP_DISTRICT_MAP.get(district, district)
-        # Title-case fix for lowercase entries
-        if city and city[0].islower():
-            city = city.title()
-
-        kept.append({
-            "station_id": f"SGP_{r['id']}",
-            "brand": "SGP",
-            "name": r["name"],
-            "address": r["address"],
-            "city": city,
-            "latitude": r["latitude"],
-            "longitude": r["longitude"],
-            "fuel_types": fuel,
-            "services": svc,
-            "working_hours": "",
-            "phone": "",
-            "station_type": "",
-        })
-    return kept, excluded
+def process_gulf(rows):
+    return GULF.process(rows)
+
+
+def process_rompetrol(rows):
+    return ROMPETROL.process(rows)
+
+
+def process_lukoil(rows):
+    return LUKOIL.process(rows)
+
+
+def process_wissol(rows):
+    return WISSOL.process(rows)
+
+
+def process_sgp(rows):
+    return SGP.process(rows)
 
 
 # ---------------------------------------------------------------------------
@@ -335,70 +401,483 @@ def save_csv(rows, path):
         writer.writerows(rows)
 
 
-def main():
-    processors = [
-        ("gulf.csv",      "Gulf",      process_gulf),
-        ("rompetrol.csv", "Rompetrol", process_rompetrol),
-        ("lukoil.csv",    "Lukoil",    process_lukoil),
-        ("wissol.csv",    "Wissol",    process_wissol),
-        ("sgp.csv",       "SGP",       process_sgp),
-    ]
+# ---------------------------------------------------------------------------
+# Per-source processing
+# ---------------------------------------------------------------------------
+# Raw rows below which sources are processed in this process: starting the
+# workers and pickling rows to and from them costs more than it saves
+PARALLEL_MIN_ROWS = 20000
+
+
+def sort_key(station):
+    return station["brand"], station["name"]
+
+
+def process_source(name, raw=None):
+    """
+    Process one source, reading data/<name>.csv when `raw` is None.
+    Returns (loaded, kept sorted by brand and name, excluded). Runs in a
+    worker process when sources are processed in parallel.
+    """
+    source = registry()[name]
+    if raw is None:
+        raw = load_csv(source.csv_name)
+    kept, excluded = source.process(raw)
+    kept.sort(key=sort_key)
+    return len(raw), kept, excluded
+
+
+def count_rows(names, raw_by_source):
+    """Raw rows about to be processed; for CSVs, estimated from line counts."""
+    total = 0
+    for name in names:
+        if name in raw_by_source:
+            total += len(raw_by_source[name])
+            continue
+        with open(os.path.join(DATA_DIR, registry()[name].csv_name), "rb") as f:
+            total += sum(block.count(b"\n") for block in iter(lambda: f.read(1 << 20), b""))
+    return total
+
+
+def process_sources(names, raw_by_source=None, jobs=None):
+    """
+    process_source() for every name in `names`, in a process pool of `jobs`
+    workers (default: one per core, or none for small inputs). Returns
+    {name: (loaded, kept, excluded)}; results match the serial path.
+    """
+    raw_by_source = raw_by_source or {}
+    if jobs is None:
+        small = count_rows(names, raw_by_source) < PARALLEL_MIN_ROWS
+        jobs = 1 if small else os.cpu_count() or 1
+    jobs = min(jobs, len(names))
+    if jobs <= 1:
+        return {name: process_source(name, raw_by_source.get(name)) for name in names}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(process_source, names, [raw_by_source.get(n) for n in names])
+        return dict(zip(names, results))
+
+
+def combine(raw_by_source, jobs=None):
+    """
+    Run every registered source's exclusion and normalization hooks.
+
+    `raw_by_source` maps source name -> raw rows, either read back from
+    data/<name>.csv or handed over in memory by sources.scrape(). Returns
+    (stations, report): stations as a StationTable sorted by brand, then
+    name, and report as (source, loaded, kept, excluded) tuples in registry
+    order.
+    """
+    names = [name for name in registry() if name in raw_by_source]
+    results = process_sources(names, raw_by_source, jobs)
+    report = [(registry()[name], *results[name]) for name in names]
+    return finish(report), report
+
+
+def finish(report):
+    """
+    Join the per-source results, each already sorted by brand and name,
+    into one StationTable and assign regions.
+
+    heapq.merge takes equal keys from earlier sources first, so the result
+    is exactly what a stable sort of all stations in registry order gives.
+    """
+    merged = heapq.merge(*(kept for _, _, kept, _ in report), key=sort_key)
+    table = StationTable.from_rows(merged, FIELDNAMES)
+    assign_regions(table)
+    return table
+
+
+def assign_regions(table):
+    """Set every station's region in one batch (see regions.py)."""
+    table.set_column("region", regions.assign(table.latitudes, table.longitudes,
+                                              table.column("city"), centers=CITY_CENTERS))
 
-    all_stations = []
-    total_excluded = 0
 
-    print("=" * 60)
-    print("Combining Georgia gas station datasets")
-    print("=" * 60)
+# ---------------------------------------------------------------------------
+# Co-located and duplicate sites
+# ---------------------------------------------------------------------------
+# Stations closer than this are treated as one site
+CLUSTER_RADIUS_M = 50
+
+# What to do with clustered stations:
+#   none   report only (default; final.csv keeps every station)
+#   brand  merge same-brand duplicates into the first one, joining their
+#          fuel types and services
+#   site   also collapse cross-brand clusters (e.g. a rebranded site whose
+#          old listing survives) into their first station
+MERGE_POLICIES = ("none", "brand", "site")
+
+CLUSTER_FIELDNAMES = [
+    "cluster", "kind", "station_id", "brand", "name", "city",
+    "latitude", "longitude", "distance_m", "kept",
+]
+
+
+def find_colocated(stations, radius_m=CLUSTER_RADIUS_M):
+    """Clusters (lists of row indices) of stations within radius_m."""
+    return colocation.find_clusters(stations.latitudes, stations.longitudes, radius_m)
+
+
+def cluster_kind(stations, cluster):
+    return "same-brand" if len({stations[i]["brand"] for i in cluster}) == 1 else "cross-brand"
+
+
+def join_values(values):
+    """Join ", "-separated lists, dropping repeats but keeping first-seen order."""
+    seen = {}
+    for v in values:
+        for part in v.split(", "):
+            if part:
+                seen.setdefault(part, None)
+    return ", ".join(seen)
+
+
+def merge_colocated(stations, clusters, policy="none"):
+    """
+    Apply a MERGE_POLICIES policy. Returns (stations, dropped ids); the
+    kept stations stay in their original order.
+    """
+    if policy not in MERGE_POLICIES:
+        raise ValueError(f"unknown merge policy: {policy}")
+    if policy == "none":
+        return stations, set()
+    merged = {}
+    drop = set()
+    for cluster in clusters:
+        if policy == "site":
+            groups = [cluster]
+        else:
+            by_brand = {}
+            for i in cluster:
+                by_brand.setdefault(stations[i]["brand"], []).append(i)
+            groups = list(by_brand.values())
+        for group in groups:
+            if len(group) < 2:
+                continue
+            keep = group[0]
+            drop.update(group[1:])
+            if policy == "brand":
+                merged[keep] = {
+                    "fuel_types": join_values(stations[i]["fuel_types"] for i in group),
+                    "services": join_values(stations[i]["services"] for i in group),
+                }
+    kept_rows = [i for i in range(len(stations)) if i not in drop]
+    kept = stations.take(kept_rows)
+    for new, old in enumerate(kept_rows):
+        for field, value in merged.get(old, {}).items():
+            kept.set_value(new, field, value)
+    return kept, {stations[i]["station_id"] for i in drop}
+
+
+def save_cluster_report(stations, clusters, dropped, path=CLUSTERS_PATH):
+    """One row per clustered station, with its distance to the cluster's first."""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CLUSTER_FIELDNAMES)
+        writer.writeheader()
+        for n, cluster in enumerate(clusters, 1):
+            kind = cluster_kind(stations, cluster)
+            lats, lons = stations.latitudes[cluster], stations.longitudes[cluster]
+            distances = geocoder.haversine_km(lats[0], lons[0], lats, lons) * 1000
+            for i, distance in zip(cluster, distances):
+                s = stations[i]
+                writer.writerow({
+                    "cluster": n,
+                    "kind": kind,
+                    "station_id": s["station_id"],
+                    "brand": s["brand"],
+                    "name": s["name"],
+                    "city": s["city"],
+                    "latitude": s["latitude"],
+                    "longitude": s["longitude"],
+                    "distance_m": f"{distance:.0f}",
+                    "kept": "no" if s["station_id"] in dropped else "yes",
+                })
+
+
+def colocate(stations, policy="none", radius_m=CLUSTER_RADIUS_M, report_path=CLUSTERS_PATH):
+    """Detect clusters, apply `policy`, optionally write the report. Returns stations."""
+    clusters = find_colocated(stations, radius_m)
+    kept, dropped = merge_colocated(stations, clusters, policy)
+    if report_path:
+        save_cluster_report(stations, clusters, dropped, report_path)
+
+    same = sum(1 for c in clusters if cluster_kind(stations, c) == "same-brand")
+    print(f"\nCo-located sites (within {radius_m} m): {len(clusters)} clusters, "
+          f"{same} same-brand, {len(clusters) - same} cross-brand, "
+          f"{sum(map(len, clusters))} stations")
+    if dropped:
+        print(f"  Merged away ({policy} policy): {len(dropped)} stations")
+    return kept
+
 
-    for filename, brand, processor in processors:
-        raw = load_csv(filename)
-        kept, excluded = processor(raw)
-        all_stations.extend(kept)
-        total_excluded += len(excluded)
+# ---------------------------------------------------------------------------
+# Incremental combine (see station_diff.py)
+# ---------------------------------------------------------------------------
+def rules_digest():
+    """Hash of everything besides the raw CSVs that normalization depends on."""
+    return station_diff.file_digest(__file__, geocoder.__file__, address_rules.__file__,
+                                    regions.__file__, sources.__file__, GAZETTEER_PATH)
+
+
+def combine_incremental(state, reuse=True, jobs=None):
+    """
+    Like combine() over data/<name>.csv, but with `reuse` a source whose
+    raw CSV hash matches `state` takes its stored results instead of being
+    loaded and processed again.
+
+    Returns (stations, report, source states, {name: "changed"/"unchanged"}).
+    """
+    rules = rules_digest()
+    cached = state.get("sources", {}) if state.get("rules") == rules else {}
+    digests, status = {}, {}
+    for name, source in registry().items():
+        digests[name] = station_diff.file_digest(os.path.join(DATA_DIR, source.csv_name))
+        entry = cached.get(name)
+        status[name] = "unchanged" if entry and entry["digest"] == digests[name] else "changed"
+
+    results = process_sources(
+        [name for name in registry() if not reuse or status[name] == "changed"], jobs=jobs)
+    report, source_states = [], {}
+    for name, source in registry().items():
+        if name in results:
+            loaded, kept, excluded = results[name]
+        else:
+            entry = cached[name]
+            # Stored sorted; sorting again is a single linear pass then
+            loaded, kept = entry["loaded"], sorted(entry["kept"], key=sort_key)
+            excluded = [tuple(e) for e in entry["excluded"]]
+        report.append((source, loaded, kept, excluded))
+        source_states[name] = {"digest": digests[name], "loaded": loaded,
+                               "kept": kept, "excluded": excluded}
+    return finish(report), report, source_states, status
+
+
+def record_state(state, all_stations, source_states, status):
+    """Diff against the previous run, write the diff and the new state."""
+    diff, prints = station_diff.diff_stations(
+        state.get("stations", {}), all_stations, FIELDNAMES,
+        old_prints=state.get("fingerprints"), sources=status,
+    )
+    station_diff.save_diff(diff)
+    station_diff.save_state({
+        "rules": rules_digest(),
+        "sources": source_states,
+        "stations": {s["station_id"]: dict(s) for s in all_stations},
+        "fingerprints": prints,
+    })
+    return diff
 
-        print(f"\n{brand}:")
-        print(f"  Loaded:   {len(raw)}")
-        print(f"  Kept:     {len(kept)}")
+
+# ---------------------------------------------------------------------------
+# Streaming combine (bounded memory, see external_sort.py)
+# ---------------------------------------------------------------------------
+def count_loaded(rows, counts, name):
+    """Pass `rows` through, counting them in counts[name]."""
+    counts[name] = 0
+    for r in rows:
+        counts[name] += 1
+        yield r
+
+
+def stream_kept(report, run_size):
+    """
+    Yield every source's kept stations, in registry order, streaming the raw
+    CSVs. `report` is filled with (source, loaded, kept count, excluded) as
+    each source finishes.
+    """
+    loaded = {}
+    for name, source in registry().items():
+        excluded, kept = [], 0
+        raw = count_loaded(iter_csv(source.csv_name), loaded, name)
+        for station in source.stream(raw, excluded, chunk_size=run_size):
+            kept += 1
+            yield station
+        report.append((source, loaded[name], kept, excluded))
+
+
+def write_stream(stations, path, chunk_size):
+    """
+    Assign regions chunk by chunk and write `stations` to `path` as they
+    arrive, yielding each station once it is written.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        stations = iter(stations)
+        while True:
+            chunk = list(islice(stations, chunk_size))
+            if not chunk:
+                return
+            lats = columnar.to_float([s["latitude"] for s in chunk])
+            lons = columnar.to_float([s["longitude"] for s in chunk])
+            cities = [s["city"] for s in chunk]
+            for s, region in zip(chunk, regions.assign(lats, lons, cities,
+                                                         centers=CITY_CENTERS)):
+                s["region"] = region
+            writer.writerows(chunk)
+            yield from chunk
+
+
+def combine_stream(run_size=external_sort.RUN_SIZE, path=FINAL_PATH):
+    """
+    Combine data/<name>.csv into `path` holding at most about `run_size`
+    stations in memory: raw rows are read lazily, sorted by brand and name
+    with an external merge sort, and written as they come out of the merge.
+    The file matches a regular combine byte for byte.
+
+    Returns (report, summary counts).
+    """
+    report = []
+    merged = external_sort.sort_rows(stream_kept(report, run_size), sort_key,
+                                     FIELDNAMES, run_size=run_size)
+    summary = summarize(write_stream(merged, path, run_size))
+    return report, summary
+
+
+def print_report(report):
+    """Print (source, loaded, kept, excluded) entries; kept is a list or a count."""
+    for source, loaded, kept, excluded in report:
+        print(f"\n{source.brand}:")
+        print(f"  Loaded:   {loaded}")
+        print(f"  Kept:     {kept if isinstance(kept, int) else len(kept)}")
         print(f"  Excluded: {len(excluded)}")
         for eid, ename, reason in excluded:
             print(f"    - ID {eid} ({ename}): {reason}")
 
-    # Sort by brand, then name
-    all_stations.sort(key=lambda s: (s["brand"], s["name"]))
 
+def save_final(all_stations, report=None):
+    """
+    Write final.csv and its typed column directory, with fuel_types and
+    services also stored as token bitsets (new labels are added to the
+    vocabulary first and listed in `report`), and add the run to the
+    history store. Returns the history entry (None if nothing changed).
+    """
     save_csv(all_stations, FINAL_PATH)
+    vocab, added = vocabulary.update(all_stations)
+    if report is not None:
+        report.vocabulary_added = added
+    columnar.save(all_stations, COLUMNS_PATH, FIELDNAMES, source=FINAL_PATH, vocab=vocab)
+    return snapshots.record(all_stations)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Combine the raw brand datasets.")
+    parser.add_argument("--merge", choices=MERGE_POLICIES, default="none",
+                        help="how to treat co-located stations (default: report only)")
+    parser.add_argument("--radius", type=float, default=CLUSTER_RADIUS_M,
+                        help=f"co-location radius in meters (default: {CLUSTER_RADIUS_M})")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only reprocess sources whose raw CSV changed since the last run")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes for per-source processing "
+                             "(default: one per core for large inputs, 1 = serial)")
+    parser.add_argument("--stream", action="store_true",
+                        help="write final.csv in bounded memory (skips co-location, "
+                             "the diff, history and final.columns)")
+    parser.add_argument("--run-size", type=int, default=external_sort.RUN_SIZE,
+                        help=f"stations held in memory with --stream "
+                             f"(default: {external_sort.RUN_SIZE})")
+    parser.add_argument("--report-dir", default=REPORT_DIR,
+                        help=f"where to write combine.json and combine.prom (default: {REPORT_DIR})")
+    args = parser.parse_args(argv)
+    if args.stream and (args.incremental or args.merge != "none"):
+        parser.error("--stream cannot be combined with --incremental or --merge")
+
+    print("=" * 60)
+    print("Combining Georgia gas station datasets")
+    print("=" * 60)
+
+    timer = RunReport("combine")
+    for name, source in registry().items():
+        timer.source(name, bytes=os.path.getsize(os.path.join(DATA_DIR, source.csv_name)))
+
+    if args.stream:
+        report, summary = timer.run("stream", combine_stream, args.run_size)
+        timer.add_combine(report)
+        timer.stats = summary
+        print_report(report)
+        print("\n" + "=" * 60)
+        print(f"FINAL: {summary['total']} gas stations streamed to {FINAL_PATH}")
+        print(f"Excluded: {sum(len(excluded) for _, _, _, excluded in report)} non-station entries")
+        print("=" * 60)
+        print_summary(summary)
+        print(f"\nRun report: {timer.write(args.report_dir)}")
+        return
+
+    state = station_diff.load_state()
+    all_stations, report, source_states, status = timer.run(
+        "combine", combine_incremental, state, args.incremental, args.jobs)
+    timer.add_combine(report)
+    for name, st in status.items():
+        timer.source(name, changed=st == "changed")
+    if args.incremental:
+        changed = [name for name, st in status.items() if st == "changed"]
+        print(f"\nIncremental: reprocessed {', '.join(changed) or 'no sources'}")
+    total_excluded = sum(len(excluded) for _, _, _, excluded in report)
+    print_report(report)
+
+    all_stations = timer.run("colocate", colocate, all_stations, args.merge, args.radius)
+    print(f"  Cluster report: {CLUSTERS_PATH}")
+
+    diff = timer.run("diff", record_state, state, all_stations, source_states, status)
+    print(f"\nChanges since last run: {station_diff.summary(diff)} -> {station_diff.DIFF_PATH}")
+
+    stored = timer.run("write", save_final, all_stations, timer)
+    if stored:
+        kind = f"{stored['ops']} changes" if stored["delta"] else "full checkpoint"
+        print(f"History: stored run {stored['ts']} ({kind}) in {snapshots.HISTORY_DIR}/")
+    else:
+        print("History: no changes since the last stored run")
 
     # Summary
     print("\n" + "=" * 60)
-    print(f"FINAL: {len(all_stations)} gas stations saved to {FINAL_PATH}")
+    print(f"FINAL: {len(all_stations)} gas stations saved to {FINAL_PATH} and {COLUMNS_PATH}/")
     print(f"Excluded: {total_excluded} non-station entries")
     print("=" * 60)
 
+    timer.stats = summarize(all_stations)
+    print_summary(timer.stats)
+    print(f"\nRun report: {timer.write(args.report_dir)}")
+
+
+# Fields whose fill rate the summary reports
+COMPLETENESS_FIELDS = ["city", "fuel_types", "services", "phone", "working_hours"]
+
+
+def summarize(stations):
+    """Counts for print_summary(), in one pass over any iterable of stations."""
+    summary = {"total": 0, "brands": {}, "cities": {},
+               "filled": dict.fromkeys(COMPLETENESS_FIELDS, 0)}
+    brands, cities, filled = summary["brands"], summary["cities"], summary["filled"]
+    for s in stations:
+        summary["total"] += 1
+        brands[s["brand"]] = brands.get(s["brand"], 0) + 1
+        c = s["city"] or "(unknown)"
+        cities[c] = cities.get(c, 0) + 1
+        for field in COMPLETENESS_FIELDS:
+            if s[field]:
+                filled[field] += 1
+    return summary
+
+
+def print_summary(summary):
     # Per-brand counts
-    brand_counts = {}
-    for s in all_stations:
-        brand_counts[s["brand"]] = brand_counts.get(s["brand"], 0) + 1
     print("\nBy brand:")
-    for brand, count in sorted(brand_counts.items()):
+    for brand, count in sorted(summary["brands"].items()):
         print(f"  {brand}: {count}")
 
     # City distribution (top 15)
-    city_counts = {}
-    for s in all_stations:
-        c = s["city"] or "(unknown)"
-        city_counts[c] = city_counts.get(c, 0) + 1
     print("\nTop 15 cities:")
-    for city, count in sorted(city_counts.items(), key=lambda x: -x[1])[:15]:
+    for city, count in sorted(summary["cities"].items(), key=lambda x: -x[1])[:15]:
         print(f"  {city}: {count}")
 
     # Data completeness
-    total = len(all_stations)
-    has_city = sum(1 for s in all_stations if s["city"])
-    has_fuel = sum(1 for s in all_stations if s["fuel_types"])
-    has_svc = sum(1 for s in all_stations if s["services"])
-    has_phone = sum(1 for s in all_stations if s["phone"])
-    has_hours = sum(1 for s in all_stations if s["working_hours"])
+    total = summary["total"]
+    has_city = summary["filled"]["city"]
+    has_fuel = summary["filled"]["fuel_types"]
+    has_svc = summary["filled"]["services"]
+    has_phone = summary["filled"]["phone"]
+    has_hours = summary["filled"]["working_hours"]
     print(f"\nData completeness ({total} total):")
     print(f"  city:          {has_city} ({100*has_city//total}%)")
     print(f"  fuel_types:    {has_fuel} ({100*has_fuel//total}%)")
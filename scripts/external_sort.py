@@ -0,0 +1,54 @@
+"""
+External merge sort for row streams that do not fit in memory.
+
+sort_rows() takes rows in runs of `run_size`, sorts each run in memory and
+spills it to a temporary CSV file, then merges the runs lazily with
+heapq.merge. Memory holds at most one run while spilling and one row per
+run while merging, whatever the size of the input.
+
+Both steps are stable (heapq.merge takes equal keys from earlier runs
+first), so the output order is exactly sorted(rows, key=key). Input that
+fits in a single run is sorted in memory and never touches disk.
+"""
+
+import csv
+import heapq
+import os
+import tempfile
+from itertools import islice
+
+# Rows sorted in memory per spilled run
+RUN_SIZE = 100000
+
+
+def spill(rows, fieldnames, directory):
+    """Write `rows` to a new CSV file (no header) in `directory`; return its path."""
+    fd, path = tempfile.mkstemp(suffix=".csv", dir=directory)
+    with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([r.get(name) or "" for name in fieldnames] for r in rows)
+    return path
+
+
+def read_run(path, fieldnames):
+    with open(path, newline="", encoding="utf-8") as f:
+        for values in csv.reader(f):
+            yield dict(zip(fieldnames, values))
+
+
+def sort_rows(rows, key, fieldnames, run_size=RUN_SIZE, tmp_dir=None):
+    """
+    Yield `rows` (dicts of text) sorted by `key`. Rows that go through disk
+    come back with exactly `fieldnames`, blanks for missing values.
+    """
+    rows = iter(rows)
+    run = sorted(islice(rows, run_size), key=key)
+    if len(run) < run_size:
+        yield from run
+        return
+
+    with tempfile.TemporaryDirectory(prefix="combine-runs-", dir=tmp_dir) as directory:
+        paths = []
+        while run:
+            paths.append(spill(run, fieldnames, directory))
+            run = sorted(islice(rows, run_size), key=key)
+        yield from heapq.merge(*(read_run(p, fieldnames) for p in paths), key=key)
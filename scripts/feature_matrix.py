@@ -0,0 +1,84 @@
+"""
+Multi-hot station x token matrices over the fuel_types / services tokens.
+
+Each token column becomes a boolean (stations, tokens) matrix over the
+vocabulary's token IDs (vocabulary.py): column i is set if the station
+lists token i. The matrices come either
+
+  - from the bitsets combine_data stored in data/final.columns/
+    (from_columnar(), nothing to split at all), or
+  - from the text: from_frame() splits every distinct value of a column
+    once (pd.factorize) and expands it to one row per station through the
+    factorize codes
+
+Questions like "does the station offer food" are then a token-to-category
+mapping (categories()) and a reduction over the matrices, with no string
+scanning per station. Tokens are matched exactly: "Charger" is not
+"Power Charger", and "CNG" (the fuel) is not "CNG Station" (a Gulf POI).
+"""
+
+import numpy as np
+import pandas as pd
+
+import columnar
+import vocabulary
+
+
+class FeatureMatrix:
+    def __init__(self, names, matrices):
+        # Token names by ID
+        self.names = names
+        # {column: bool (stations, tokens)}
+        self.matrices = matrices
+
+    @classmethod
+    def from_frame(cls, df, columns, vocab=None):
+        """
+        Matrices for text `columns` of `df`. Labels missing from the
+        vocabulary get IDs for this matrix only; the file is not changed.
+        """
+        if vocab is None:
+            vocab = vocabulary.load()
+        factorized = {column: pd.factorize(df[column]) for column in columns}
+        for column, (_, uniques) in factorized.items():
+            vocab.observe(column, uniques)
+        matrices = {column: vocab.matrix(list(uniques), codes)
+                    for column, (codes, uniques) in factorized.items()}
+        return cls(vocab.names, matrices)
+
+    @classmethod
+    def from_columnar(cls, path):
+        """Matrices from the bitsets in a column directory (None if it has none)."""
+        stored = columnar.load_tokens(path)
+        if stored is None:
+            return None
+        names, bits = stored
+        return cls(names, {column: vocabulary.unpack(b, len(names)) for column, b in bits.items()})
+
+    def token_mask(self, tokens=None):
+        """Bool per token ID: named in `tokens` (every token if None)."""
+        if tokens is None:
+            return np.ones(len(self.names), dtype=bool)
+        tokens = set(tokens)
+        return np.array([name in tokens for name in self.names], dtype=bool)
+
+    def counts(self, column):
+        """Distinct tokens per station in `column`."""
+        return self.matrices[column].sum(axis=1)
+
+    def categories(self, mapping):
+        """
+        Bool (stations, categories) for `mapping` {name: (columns, tokens)}:
+        a station is in a category if it lists any of the tokens in any of
+        the columns.
+        """
+        hits = None
+        for column, matrix in self.matrices.items():
+            masks = np.column_stack([
+                self.token_mask(tokens) & (column in columns)
+                for columns, tokens in mapping.values()
+            ])
+            # float32 goes through BLAS; the sums are small integers, so exact
+            part = matrix.astype(np.float32) @ masks.astype(np.float32)
+            hits = part if hits is None else hits + part
+        return hits > 0
@@ -1,8 +1,30 @@
 """
 Georgia Gas Station Market Analysis — Chart Generator
 Strategic focus: SOCAR (SGP) competitive position
+
+The stations are aggregated once into a brand x city x region x feature
+cube (station_cube.py) that all charts read, and charts render in a
+process pool on the headless Agg backend. Every chart is keyed on a hash
+of the columns it reads (see CHARTS) plus the code, and a chart whose key
+matches the one stored in CHART_CACHE_PATH is not redrawn, so after a
+small data change only the charts whose inputs moved are rendered again.
+The numbers behind every chart, plus the web app's insight figures, are
+also written as JSON (analytics.py).
+
+Usage:
+    python scripts/generate_charts.py            # redraw what changed
+    python scripts/generate_charts.py --force    # redraw everything
+    python scripts/generate_charts.py --jobs 1   # render in this process
 """
 
+import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
@@ -10,18 +32,27 @@ import numpy as np
 import os
 import math
 
+import analytics
+import columnar
+import feature_matrix
+import regions
+import station_cube
+import vocabulary
+from analytics import BRAND_COLORS, BRAND_ORDER, CUBE_FLAGS, CUBE_MEASURES
+from feature_matrix import FeatureMatrix
+from station_cube import build_cube
+
 CHARTS_DIR = "charts"
 DATA_PATH = "data/final.csv"
+COLUMNS_PATH = "data/final.columns"
+# Input hash of every chart as last rendered (data/cache/ is not committed)
+CHART_CACHE_PATH = "data/cache/charts.json"
 
-# Brand colors — SGP highlighted in SOCAR blue
-BRAND_COLORS = {
-    "SGP":       "#0072CE",  # SOCAR blue (hero)
-    "Gulf":      "#EE3124",
-    "Rompetrol": "#F5A623",
-    "Wissol":    "#4CAF50",
-    "Lukoil":    "#D32F2F",
-}
-BRAND_ORDER = ["Gulf", "Wissol", "SGP", "Rompetrol", "Lukoil"]
+STATION_COLUMNS = [
+    "station_id", "brand", "name", "address", "city",
+    "latitude", "longitude", "fuel_types", "services",
+    "working_hours", "phone", "station_type", "region",
+]
 
 plt.rcParams.update({
     "figure.facecolor": "white",
@@ -35,7 +66,23 @@ plt.rcParams.update({
 })
 
 
+def frame_from_stations(stations):
+    """Build the chart DataFrame straight from combined stations (no CSV)."""
+    if hasattr(stations, "to_columns"):
+        # StationTable: coordinates are already float64
+        return pd.DataFrame(stations.to_columns(), columns=STATION_COLUMNS)
+    df = pd.DataFrame(stations, columns=STATION_COLUMNS)
+    # Blank coordinates become NaN, as read_csv would make them
+    df["latitude"] = pd.to_numeric(df["latitude"], errors="coerce")
+    df["longitude"] = pd.to_numeric(df["longitude"], errors="coerce")
+    return df
+
+
 def load_data():
+    # Prefer the typed column directory: memory-mapped, nothing to parse or fill
+    if columnar.is_current(COLUMNS_PATH, DATA_PATH):
+        return pd.DataFrame(columnar.load(COLUMNS_PATH), columns=STATION_COLUMNS)
+
     df = pd.read_csv(DATA_PATH, encoding="utf-8")
     df["fuel_types"] = df["fuel_types"].fillna("")
     df["services"] = df["services"].fillna("")
@@ -43,6 +90,11 @@ def load_data():
     df["phone"] = df["phone"].fillna("")
     df["working_hours"] = df["working_hours"].fillna("")
     df["station_type"] = df["station_type"].fillna("")
+    if "region" in df:
+        df["region"] = df["region"].fillna("")
+    else:
+        # final.csv written before the region column existed
+        df["region"] = regions.assign(df["latitude"], df["longitude"], df["city"])
     return df
 
 
@@ -51,61 +103,58 @@ def save(fig, name):
     fig.savefig(path, bbox_inches="tight", facecolor="white")
     plt.close(fig)
     print(f"  saved {path}")
+    return path
 
 
 # ── 1. Market Share ──────────────────────────────────────────────────────────
 
-def chart_market_share(df):
-    counts = df["brand"].value_counts().reindex(BRAND_ORDER)
-    total = counts.sum()
-    colors = [BRAND_COLORS[b] for b in BRAND_ORDER]
+def chart_market_share(cube):
+    data = analytics.market_share(cube)
+    counts = data["stations"]
+    colors = [BRAND_COLORS[b] for b in data["brands"]]
 
     fig, ax = plt.subplots(figsize=(10, 5))
-    bars = ax.barh(counts.index, counts.values, color=colors, edgecolor="white", height=0.6)
+    bars = ax.barh(data["brands"], counts, color=colors, edgecolor="white", height=0.6)
 
-    for bar, val in zip(bars, counts.values):
-        pct = val / total * 100
+    for bar, val, pct in zip(bars, counts, data["percent"]):
         ax.text(bar.get_width() + 2, bar.get_y() + bar.get_height() / 2,
                 f"{val}  ({pct:.1f}%)", va="center", fontweight="bold", fontsize=12)
 
     ax.set_xlabel("Number of Stations")
     ax.set_title("Market Share by Station Count — Georgia Gas Station Market")
-    ax.set_xlim(0, counts.max() * 1.25)
+    ax.set_xlim(0, max(counts) * 1.25)
     ax.invert_yaxis()
-    save(fig, "01_market_share.png")
+    return fig
 
 
 # ── 2. Tbilisi Battleground ──────────────────────────────────────────────────
 
-def chart_tbilisi(df):
-    tbl = df[df["city"] == "Tbilisi"]
-    counts = tbl["brand"].value_counts().reindex(BRAND_ORDER).fillna(0).astype(int)
-    colors = [BRAND_COLORS[b] for b in BRAND_ORDER]
+def chart_tbilisi(cube):
+    data = analytics.tbilisi(cube)
+    counts = data["stations"]
+    colors = [BRAND_COLORS[b] for b in data["brands"]]
 
     fig, ax = plt.subplots(figsize=(10, 5))
-    bars = ax.bar(counts.index, counts.values, color=colors, edgecolor="white", width=0.6)
+    bars = ax.bar(data["brands"], counts, color=colors, edgecolor="white", width=0.6)
 
-    for bar, val in zip(bars, counts.values):
+    for bar, val in zip(bars, counts):
         if val > 0:
             ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.5,
                     str(val), ha="center", fontweight="bold", fontsize=13)
 
     ax.set_ylabel("Number of Stations")
-    ax.set_title(f"Tbilisi — The Capital Battleground ({counts.sum()} stations)")
-    ax.set_ylim(0, counts.max() * 1.2)
-    save(fig, "02_tbilisi_battle.png")
+    ax.set_title(f"Tbilisi — The Capital Battleground ({sum(counts)} stations)")
+    ax.set_ylim(0, max(counts) * 1.2)
+    return fig
 
 
 # ── 3. Top Cities Heatmap (stacked bar) ──────────────────────────────────────
 
-def chart_top_cities(df):
-    # Get top 12 cities by total count (excluding unknown)
-    city_counts = df[df["city"] != ""].groupby("city").size()
-    top_cities = city_counts.nlargest(12).index.tolist()
-
-    pivot = df[df["city"].isin(top_cities)].groupby(["city", "brand"]).size().unstack(fill_value=0)
-    pivot = pivot.reindex(columns=BRAND_ORDER, fill_value=0)
-    pivot = pivot.loc[pivot.sum(axis=1).sort_values(ascending=True).index]
+def chart_top_cities(cube):
+    # Top 12 cities by total count (excluding unknown), largest at the top
+    data = analytics.top_cities(cube)
+    pivot = pd.DataFrame(data["stations"][::-1], index=pd.Index(data["cities"][::-1], name="city"),
+                         columns=pd.Index(data["brands"], name="brand"))
 
     colors = [BRAND_COLORS[b] for b in BRAND_ORDER]
 
@@ -115,48 +164,36 @@ def chart_top_cities(df):
     ax.set_xlabel("Number of Stations")
     ax.set_title("Top 12 Cities — Brand Presence Breakdown")
     ax.legend(title="Brand", bbox_to_anchor=(1.01, 1), loc="upper left")
-    save(fig, "03_top_cities_stacked.png")
+    return fig
 
 
 # ── 4. SGP Coverage Gaps — Cities Where Competitors Exist but SGP is Absent ─
 
-def chart_coverage_gaps(df):
-    sgp_cities = set(df[df["brand"] == "SGP"]["city"].unique())
-    non_sgp = df[(df["brand"] != "SGP") & (~df["city"].isin(sgp_cities)) & (df["city"] != "")]
-    gap_counts = non_sgp.groupby("city").size().nlargest(15)
-
+def chart_coverage_gaps(cube):
+    data = analytics.coverage_gaps(cube)
     # Color by dominant brand in each city
-    gap_colors = []
-    for city in gap_counts.index:
-        city_df = non_sgp[non_sgp["city"] == city]
-        dominant = city_df["brand"].value_counts().index[0]
-        gap_colors.append(BRAND_COLORS[dominant])
+    gap_colors = [BRAND_COLORS[b] for b in data["dominantBrand"]]
 
     fig, ax = plt.subplots(figsize=(12, 6))
-    bars = ax.barh(gap_counts.index, gap_counts.values, color=gap_colors, edgecolor="white", height=0.6)
+    bars = ax.barh(data["cities"], data["stations"], color=gap_colors, edgecolor="white", height=0.6)
 
-    for bar, val in zip(bars, gap_counts.values):
+    for bar, val in zip(bars, data["stations"]):
         ax.text(bar.get_width() + 0.2, bar.get_y() + bar.get_height() / 2,
                 str(val), va="center", fontweight="bold")
 
     ax.set_xlabel("Competitor Stations Present")
     ax.set_title("Top 15 SGP Coverage Gaps — Cities Where Competitors Operate, SGP Does Not")
     ax.invert_yaxis()
-    save(fig, "04_sgp_coverage_gaps.png")
+    return fig
 
 
 # ── 5. Alternative Fuel Leadership (CNG / LPG) ──────────────────────────────
 
-def chart_alt_fuel(df):
-    brands = BRAND_ORDER
-    cng_counts = []
-    lpg_counts = []
-    for b in brands:
-        bdf = df[df["brand"] == b]
-        cng = bdf["fuel_types"].str.contains("CNG", na=False).sum()
-        lpg = bdf["fuel_types"].str.contains("LPG", na=False).sum()
-        cng_counts.append(cng)
-        lpg_counts.append(lpg)
+def chart_alt_fuel(cube):
+    data = analytics.alt_fuel(cube)
+    brands = data["brands"]
+    cng_counts = data["cng"]
+    lpg_counts = data["lpg"]
 
     x = np.arange(len(brands))
     w = 0.35
@@ -179,36 +216,16 @@ def chart_alt_fuel(df):
     ax.set_ylabel("Number of Stations")
     ax.set_title("Alternative Fuel Leadership — CNG & LPG Station Count by Brand")
     ax.legend()
-    save(fig, "05_alt_fuel_leadership.png")
+    return fig
 
 
 # ── 6. Service Richness Comparison ──────────────────────────────────────────
 
-def chart_service_comparison(df):
-    key_services = {
-        "Store/Market":   ["Way-Mart", "Market", "Supermarket", "Shop"],
-        "Food/Cafe":      ["Coffee", "Hot Dog", "Sandwich", "Hot-Dog Campaign", "Food"],
-        "Service Center": ["Service Center", "Service Block"],
-        "Car Wash":       ["Car Wash"],
-        "EV Charging":    ["Charger", "Power Charger", "Fast Charger"],
-        "Restroom (WC)":  ["WC"],
-        "ATM/Payment":    ["ATM", "POS Terminal", "Smart Pay", "Fill&Go"],
-        "CNG Fuel":       ["CNG"],
-    }
-
-    brands = BRAND_ORDER
-    data = {svc: [] for svc in key_services}
-
-    for b in brands:
-        bdf = df[df["brand"] == b]
-        total = len(bdf)
-        for svc_name, keywords in key_services.items():
-            count = 0
-            for _, row in bdf.iterrows():
-                combined = f"{row['services']}, {row['fuel_types']}"
-                if any(kw in combined for kw in keywords):
-                    count += 1
-            data[svc_name].append(round(count / total * 100, 1) if total else 0)
+def chart_service_comparison(cube):
+    series = analytics.service_comparison(cube)
+    key_services = series["services"]
+    brands = series["brands"]
+    data = series["percent"]
 
     x = np.arange(len(key_services))
     w = 0.15
@@ -220,62 +237,20 @@ def chart_service_comparison(df):
         bars = ax.bar(x + offset, vals, w, label=b, color=BRAND_COLORS[b], edgecolor="white")
 
     ax.set_xticks(x)
-    ax.set_xticklabels(key_services.keys(), rotation=30, ha="right")
+    ax.set_xticklabels(key_services, rotation=30, ha="right")
     ax.set_ylabel("% of Brand's Stations")
     ax.set_title("Service Offering Coverage by Brand — % of Stations with Each Service")
     ax.legend(title="Brand", bbox_to_anchor=(1.01, 1), loc="upper left")
     ax.yaxis.set_major_formatter(mticker.PercentFormatter())
-    save(fig, "06_service_comparison.png")
+    return fig
 
 
 # ── 7. Regional Dominance ────────────────────────────────────────────────────
 
-def chart_regional(df):
-    # Map cities to regions
-    region_map = {
-        "Tbilisi": "Tbilisi",
-        "Rustavi": "Kvemo Kartli", "Marneuli": "Kvemo Kartli", "Gardabani": "Kvemo Kartli",
-        "Bolnisi": "Kvemo Kartli", "Dmanisi": "Kvemo Kartli",
-        "Kutaisi": "Imereti", "Zestaponi": "Imereti", "Zestafoni": "Imereti",
-        "Sachkhere": "Imereti", "Chiatura": "Imereti", "Tkibuli": "Imereti",
-        "Samtredia": "Imereti", "Khoni": "Imereti", "Vani": "Imereti",
-        "Terjola": "Imereti", "Lanchkhuti": "Imereti", "Senaki": "Imereti",
-        "Kharagauli": "Imereti",
-        "Batumi": "Adjara", "Kobuleti": "Adjara", "Khelvachauri": "Adjara",
-        "Gonio": "Adjara", "Keda": "Adjara",
-        "Gori": "Shida Kartli", "Kaspi": "Shida Kartli", "Khashuri": "Shida Kartli",
-        "Kareli": "Shida Kartli",
-        "Zugdidi": "Samegrelo", "Poti": "Samegrelo",
-        "Martvili": "Samegrelo", "Khobi": "Samegrelo", "Abasha": "Samegrelo",
-        "Tsalenjikha": "Samegrelo", "Jvari": "Samegrelo",
-        "Telavi": "Kakheti", "Gurjaani": "Kakheti", "Sagarejo": "Kakheti",
-        "Akhmeta": "Kakheti", "Sighnaghi": "Kakheti", "Lagodekhi": "Kakheti",
-        "Dedoplistskaro": "Kakheti", "Kvareli": "Kakheti", "Kakheti": "Kakheti",
-        "Akhaltsikhe": "Samtskhe-Javakheti", "Akhalkalaki": "Samtskhe-Javakheti",
-        "Ninotsminda": "Samtskhe-Javakheti", "Borjomi": "Samtskhe-Javakheti",
-        "Bakuriani": "Samtskhe-Javakheti",
-        "Ozurgeti": "Guria", "Chokhatauri": "Guria",
-        "Ambrolauri": "Racha-Lechkhumi", "Oni": "Racha-Lechkhumi",
-        "Mtskheta": "Mtskheta-Mtianeti", "Kazbegi": "Mtskheta-Mtianeti",
-        "Mestia": "Svaneti",
-    }
-
-    def get_region(row):
-        city = row["city"]
-        if city in region_map:
-            return region_map[city]
-        return ""
-
-    df2 = df.copy()
-    df2["region"] = df2.apply(get_region, axis=1)
-    df2 = df2[df2["region"] != ""]
-
-    regions = ["Tbilisi", "Imereti", "Adjara", "Kvemo Kartli", "Samegrelo",
-               "Kakheti", "Shida Kartli", "Samtskhe-Javakheti", "Guria"]
-
-    pivot = df2[df2["region"].isin(regions)].groupby(["region", "brand"]).size().unstack(fill_value=0)
-    pivot = pivot.reindex(columns=BRAND_ORDER, fill_value=0)
-    pivot = pivot.reindex(regions)
+def chart_regional(cube):
+    data = analytics.regional(cube)
+    pivot = pd.DataFrame(data["stations"], index=pd.Index(data["regions"], name="region"),
+                         columns=pd.Index(data["brands"], name="brand"))
 
     colors = [BRAND_COLORS[b] for b in BRAND_ORDER]
 
@@ -286,60 +261,18 @@ def chart_regional(df):
     ax.set_title("Regional Presence — Brand Distribution Across Georgian Regions")
     ax.legend(title="Brand", bbox_to_anchor=(1.01, 1), loc="upper left")
     plt.xticks(rotation=35, ha="right")
-    save(fig, "07_regional_presence.png")
+    return fig
 
 
 # ── 8. SGP Share by Region ───────────────────────────────────────────────────
 
-def chart_sgp_regional_share(df):
-    # Map all cities to regions (same as chart_regional)
-    region_map = {
-        "Tbilisi": "Tbilisi",
-        "Rustavi": "Kvemo Kartli", "Marneuli": "Kvemo Kartli", "Gardabani": "Kvemo Kartli",
-        "Bolnisi": "Kvemo Kartli", "Dmanisi": "Kvemo Kartli",
-        "Kutaisi": "Imereti", "Zestaponi": "Imereti", "Zestafoni": "Imereti",
-        "Sachkhere": "Imereti", "Chiatura": "Imereti", "Tkibuli": "Imereti",
-        "Samtredia": "Imereti", "Terjola": "Imereti", "Lanchkhuti": "Imereti",
-        "Senaki": "Imereti", "Kharagauli": "Imereti",
-        "Batumi": "Adjara", "Kobuleti": "Adjara", "Khelvachauri": "Adjara",
-        "Gonio": "Adjara", "Keda": "Adjara",
-        "Gori": "Shida Kartli", "Kaspi": "Shida Kartli", "Khashuri": "Shida Kartli",
-        "Kareli": "Shida Kartli",
-        "Zugdidi": "Samegrelo", "Poti": "Samegrelo",
-        "Tsalenjikha": "Samegrelo", "Jvari": "Samegrelo",
-        "Telavi": "Kakheti", "Gurjaani": "Kakheti", "Sagarejo": "Kakheti",
-        "Akhmeta": "Kakheti", "Sighnaghi": "Kakheti", "Lagodekhi": "Kakheti",
-        "Dedoplistskaro": "Kakheti", "Kvareli": "Kakheti", "Kakheti": "Kakheti",
-        "Akhaltsikhe": "Samtskhe-Javakheti", "Borjomi": "Samtskhe-Javakheti",
-        "Bakuriani": "Samtskhe-Javakheti",
-        "Ozurgeti": "Guria", "Chokhatauri": "Guria",
-        "Ambrolauri": "Racha-Lechkhumi",
-        "Mtskheta": "Mtskheta-Mtianeti", "Kazbegi": "Mtskheta-Mtianeti",
-    }
-
-    df2 = df.copy()
-    df2["region"] = df2["city"].map(region_map).fillna("")
-    df2 = df2[df2["region"] != ""]
-
-    regions_list = ["Tbilisi", "Kvemo Kartli", "Imereti", "Adjara", "Samegrelo",
-                    "Kakheti", "Shida Kartli", "Samtskhe-Javakheti", "Guria"]
-
-    region_data = []
-    for region in regions_list:
-        rdf = df2[df2["region"] == region]
-        total = len(rdf)
-        sgp_count = len(rdf[rdf["brand"] == "SGP"])
-        if total > 0:
-            share = sgp_count / total * 100
-            region_data.append((region, sgp_count, total, share))
-
-    region_data.sort(key=lambda x: -x[3])
-    names = [r[0] for r in region_data]
-    shares = [r[3] for r in region_data]
-    sgp_n = [r[1] for r in region_data]
-    total_n = [r[2] for r in region_data]
-
-    national_share = sum(sgp_n) / sum(total_n) * 100 if sum(total_n) > 0 else 18
+def chart_sgp_regional_share(cube):
+    data = analytics.sgp_regional_share(cube)
+    names = data["regions"]
+    shares = data["percent"]
+    sgp_n = data["sgp"]
+    total_n = data["stations"]
+    national_share = data["nationalPercent"]
 
     fig, ax = plt.subplots(figsize=(12, 6))
     bars = ax.barh(names, shares, color="#0072CE", edgecolor="white", height=0.6)
@@ -355,28 +288,17 @@ def chart_sgp_regional_share(df):
     ax.axvline(x=national_share, color="red", linestyle="--", alpha=0.5,
                label=f"National avg ({national_share:.0f}%)")
     ax.legend()
-    save(fig, "08_sgp_regional_share.png")
+    return fig
 
 
 # ── 9. Fuel Type Diversity ───────────────────────────────────────────────────
 
-def chart_fuel_diversity(df):
-    brands = BRAND_ORDER
-    has_fuel = []
-    no_fuel = []
-    avg_types = []
-
-    for b in brands:
-        bdf = df[df["brand"] == b]
-        total = len(bdf)
-        with_fuel = bdf[bdf["fuel_types"] != ""]
-        has_fuel.append(len(with_fuel))
-        no_fuel.append(total - len(with_fuel))
-        if len(with_fuel) > 0:
-            avg_n = with_fuel["fuel_types"].apply(lambda x: len(x.split(", "))).mean()
-            avg_types.append(round(avg_n, 1))
-        else:
-            avg_types.append(0)
+def chart_fuel_diversity(cube):
+    data = analytics.fuel_diversity(cube)
+    brands = data["brands"]
+    has_fuel = data["withFuel"]
+    no_fuel = data["withoutFuel"]
+    avg_types = data["avgFuelTypes"]
 
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
 
@@ -403,26 +325,21 @@ def chart_fuel_diversity(df):
 
     fig.suptitle("Fuel Portfolio Analysis", fontsize=15, fontweight="bold", y=1.02)
     fig.tight_layout()
-    save(fig, "09_fuel_diversity.png")
+    return fig
 
 
 # ── 10. Competitive Intensity Map (top cities) ──────────────────────────────
 
-def chart_competitive_intensity(df):
-    city_brands = df[df["city"] != ""].groupby("city")["brand"].nunique()
-    city_total = df[df["city"] != ""].groupby("city").size()
-
-    multi = city_brands[city_brands >= 2].sort_values(ascending=False)
-    top_multi = multi.head(15)
-
-    cities = top_multi.index.tolist()
-    n_brands_list = top_multi.values
-    n_stations = [city_total[c] for c in cities]
+def chart_competitive_intensity(cube):
+    data = analytics.competitive_intensity(cube)
+    cities = data["cities"]
+    n_brands_list = data["brands"]
+    n_stations = data["stations"]
 
     fig, ax = plt.subplots(figsize=(12, 6))
-    bars = ax.barh(cities, n_stations, color=["#0072CE" if city_brands.get(c, 0) >= 4 else
-                                                "#F5A623" if city_brands.get(c, 0) >= 3 else
-                                                "#4CAF50" for c in cities],
+    bars = ax.barh(cities, n_stations, color=["#0072CE" if nb >= 4 else
+                                                "#F5A623" if nb >= 3 else
+                                                "#4CAF50" for nb in n_brands_list],
                    edgecolor="white", height=0.6)
 
     for bar, ns, nb in zip(bars, n_stations, n_brands_list):
@@ -432,36 +349,16 @@ def chart_competitive_intensity(df):
     ax.set_xlabel("Number of Stations")
     ax.set_title("Competitive Intensity — Cities with Multiple Brands")
     ax.invert_yaxis()
-    save(fig, "10_competitive_intensity.png")
+    return fig
 
 
 # ── 11. SGP vs Gulf Head-to-Head ─────────────────────────────────────────────
 
-def chart_sgp_vs_gulf(df):
-    metrics = ["Total Stations", "Tbilisi", "CNG Stations", "LPG Stations",
-               "With Store", "With Service Center", "With Food"]
-
-    sgp = df[df["brand"] == "SGP"]
-    gulf = df[df["brand"] == "Gulf"]
-
-    sgp_vals = [
-        len(sgp),
-        len(sgp[sgp["city"] == "Tbilisi"]),
-        sgp["fuel_types"].str.contains("CNG", na=False).sum(),
-        sgp["fuel_types"].str.contains("LPG", na=False).sum(),
-        sgp["services"].str.contains("Way-Mart|Store|Market", na=False).sum(),
-        sgp["services"].str.contains("Service Center|Service Block", na=False).sum(),
-        sgp["services"].str.contains("Food|McDonald", na=False).sum(),
-    ]
-    gulf_vals = [
-        len(gulf),
-        len(gulf[gulf["city"] == "Tbilisi"]),
-        gulf["fuel_types"].str.contains("CNG", na=False).sum(),
-        gulf["fuel_types"].str.contains("LPG", na=False).sum(),
-        gulf["services"].str.contains("Shop|Store|Market", na=False).sum(),
-        gulf["services"].str.contains("Service Center", na=False).sum(),
-        gulf["services"].str.contains("Coffee|Hot Dog|Sandwich", na=False).sum(),
-    ]
+def chart_sgp_vs_gulf(cube):
+    data = analytics.sgp_vs_gulf(cube)
+    metrics = data["metrics"]
+    sgp_vals = data["SGP"]
+    gulf_vals = data["Gulf"]
 
     x = np.arange(len(metrics))
     w = 0.35
@@ -484,21 +381,21 @@ def chart_sgp_vs_gulf(df):
     ax.set_ylabel("Count")
     ax.set_title("SGP vs Gulf — Head-to-Head Competitive Comparison")
     ax.legend()
-    save(fig, "11_sgp_vs_gulf.png")
+    return fig
 
 
 # ── 12. Geographic Scatter (map-like) ────────────────────────────────────────
 
-def chart_geographic_scatter(df):
+def chart_geographic_scatter(cube):
     fig, ax = plt.subplots(figsize=(12, 10))
 
     for brand in reversed(BRAND_ORDER):
-        bdf = df[df["brand"] == brand]
+        lons, lats = cube.points.get(brand, (np.empty(0), np.empty(0)))
         alpha = 0.9 if brand == "SGP" else 0.4
         size = 40 if brand == "SGP" else 15
         zorder = 10 if brand == "SGP" else 1
-        ax.scatter(bdf["longitude"], bdf["latitude"], c=BRAND_COLORS[brand],
-                   s=size, alpha=alpha, label=f"{brand} ({len(bdf)})",
+        ax.scatter(lons, lats, c=BRAND_COLORS[brand],
+                   s=size, alpha=alpha, label=f"{brand} ({len(lons)})",
                    edgecolors="white" if brand == "SGP" else "none",
                    linewidth=0.5, zorder=zorder)
 
@@ -507,24 +404,18 @@ def chart_geographic_scatter(df):
     ax.set_title("Geographic Distribution — All 554 Gas Stations Across Georgia")
     ax.legend(title="Brand", markerscale=1.5)
     ax.set_aspect("equal")
-    save(fig, "12_geographic_scatter.png")
+    return fig
 
 
 # ── 13. SGP Expansion Opportunity Score ──────────────────────────────────────
 
-def chart_expansion_opportunity(df):
-    sgp_cities = set(df[df["brand"] == "SGP"]["city"].unique())
-
-    # Cities with competitors but no SGP, ranked by number of competitor stations
-    non_sgp = df[(df["brand"] != "SGP") & (~df["city"].isin(sgp_cities)) & (df["city"] != "")]
-    gap_data = non_sgp.groupby("city").agg(
-        stations=("brand", "size"),
-        brands=("brand", "nunique"),
-    ).sort_values("stations", ascending=False).head(12)
-
-    # Opportunity score = stations * brands (more competitors = proven demand)
-    gap_data["opportunity"] = gap_data["stations"] * gap_data["brands"]
-    gap_data = gap_data.sort_values("opportunity", ascending=True)
+def chart_expansion_opportunity(cube):
+    # Cities with competitors but no SGP, best score at the top
+    data = analytics.expansion_opportunity(cube)
+    gap_data = pd.DataFrame(
+        {"stations": data["stations"][::-1], "brands": data["brands"][::-1],
+         "opportunity": data["score"][::-1]},
+        index=pd.Index(data["cities"][::-1], name="city"))
 
     fig, ax = plt.subplots(figsize=(12, 6))
     bars = ax.barh(gap_data.index, gap_data["opportunity"],
@@ -537,32 +428,150 @@ def chart_expansion_opportunity(df):
 
     ax.set_xlabel("Expansion Opportunity Score (stations x brands)")
     ax.set_title("SGP Expansion Priorities — Underserved Markets with Proven Demand")
-    save(fig, "13_expansion_opportunity.png")
+    return fig
 
 
 # ── Main ─────────────────────────────────────────────────────────────────────
 
-def main():
+# (output file, chart function, columns it reads). The columns are what the
+# chart's skip-cache key is hashed from, so keep them in step with the code.
+CHARTS = [
+    ("01_market_share.png",         chart_market_share,         ["brand"]),
+    ("02_tbilisi_battle.png",       chart_tbilisi,              ["brand", "city"]),
+    ("03_top_cities_stacked.png",   chart_top_cities,           ["brand", "city"]),
+    ("04_sgp_coverage_gaps.png",    chart_coverage_gaps,        ["brand", "city"]),
+    ("05_alt_fuel_leadership.png",  chart_alt_fuel,             ["brand", "fuel_types"]),
+    ("06_service_comparison.png",   chart_service_comparison,   ["brand", "services", "fuel_types"]),
+    ("07_regional_presence.png",    chart_regional,             ["brand", "region"]),
+    ("08_sgp_regional_share.png",   chart_sgp_regional_share,   ["brand", "region"]),
+    ("09_fuel_diversity.png",       chart_fuel_diversity,       ["brand", "fuel_types"]),
+    ("10_competitive_intensity.png", chart_competitive_intensity, ["brand", "city"]),
+    ("11_sgp_vs_gulf.png",          chart_sgp_vs_gulf,          ["brand", "city", "fuel_types", "services"]),
+    ("12_geographic_scatter.png",   chart_geographic_scatter,   ["brand", "latitude", "longitude"]),
+    ("13_expansion_opportunity.png", chart_expansion_opportunity, ["brand", "city"]),
+]
+CHART_FUNCTIONS = {name: fn for name, fn, _ in CHARTS}
+
+
+# Modules between final.csv and the pixels: the chart data (analytics), the
+# aggregation (station_cube), the token matrices it counts (feature_matrix,
+# vocabulary) and the typed columns they can be read from (columnar)
+CODE_MODULES = (analytics, station_cube, feature_matrix, vocabulary, columnar)
+
+
+def code_digest():
+    """
+    Hash of this file, CODE_MODULES and the matplotlib version: changing
+    any of them redraws every chart.
+    """
+    h = hashlib.sha256(matplotlib.__version__.encode())
+    for path in (__file__, *(module.__file__ for module in CODE_MODULES)):
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def chart_key(df, name, columns, code):
+    """Hash of the rows and columns chart `name` reads, in row order."""
+    h = hashlib.sha256(f"{code}\0{name}\0{len(df)}".encode())
+    for column in columns:
+        values = df[column]
+        if values.dtype.kind == "f":
+            h.update(values.to_numpy(dtype=np.float64).tobytes())
+        else:
+            h.update("\x1f".join(map(str, values)).encode("utf-8"))
+        h.update(b"\x1e")
+    return h.hexdigest()
+
+
+def load_chart_cache():
+    try:
+        with open(CHART_CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_chart_cache(cache):
+    os.makedirs(os.path.dirname(CHART_CACHE_PATH), exist_ok=True)
+    tmp = f"{CHART_CACHE_PATH}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+    os.replace(tmp, CHART_CACHE_PATH)
+
+
+# The aggregation cube, handed to each worker process once by init_worker()
+_worker_cube = None
+
+
+def init_worker(cube):
+    global _worker_cube
+    _worker_cube = cube
+
+
+def render_chart(name, cube=None):
+    """Draw and save one chart; in a worker, from the worker's cube."""
+    fig = CHART_FUNCTIONS[name](_worker_cube if cube is None else cube)
+    return save(fig, name)
+
+
+def load_features():
+    """The stored fuel/service token bitsets, if the column directory is current."""
+    if columnar.is_current(COLUMNS_PATH, DATA_PATH):
+        return FeatureMatrix.from_columnar(COLUMNS_PATH)
+    return None
+
+
+def render_charts(df, jobs=None, force=False, features=None, cube=None):
+    """
+    Render every chart whose input hash changed (all of them with `force`),
+    in a pool of `jobs` processes (default: one per core). The stations are
+    aggregated into one StationCube up front, and every chart reads that;
+    `features` is the FeatureMatrix of `df` and `cube` its StationCube, if
+    already at hand. Returns (rendered, skipped) chart file names.
+    """
     os.makedirs(CHARTS_DIR, exist_ok=True)
+    cache = {} if force else load_chart_cache()
+    code = code_digest()
+    keys = {name: chart_key(df, name, columns, code) for name, _, columns in CHARTS}
+    todo = [name for name in keys
+            if cache.get(name) != keys[name] or not os.path.exists(os.path.join(CHARTS_DIR, name))]
+    skipped = [name for name in keys if name not in todo]
+
+    print(f"Generating charts ({len(todo)} changed, {len(skipped)} unchanged)...")
+    if todo and cube is None:
+        cube = build_cube(df, CUBE_FLAGS, CUBE_MEASURES, features)
+    jobs = min(jobs or os.cpu_count() or 1, len(todo))
+    if jobs <= 1:
+        for name in todo:
+            render_chart(name, cube)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker,
+                                 initargs=(cube,)) as pool:
+            list(pool.map(render_chart, todo))
+
+    save_chart_cache(keys)
+    return todo, skipped
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the analysis charts.")
+    parser.add_argument("--force", action="store_true",
+                        help="redraw every chart, even if its inputs did not change")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="worker processes (default: one per core, 1 = in this process)")
+    parser.add_argument("--analytics", default=analytics.ANALYTICS_PATH,
+                        help=f"where to write the chart data as JSON (default: {analytics.ANALYTICS_PATH})")
+    args = parser.parse_args(argv)
+
     df = load_data()
     print(f"Loaded {len(df)} stations\n")
 
-    print("Generating charts...")
-    chart_market_share(df)
-    chart_tbilisi(df)
-    chart_top_cities(df)
-    chart_coverage_gaps(df)
-    chart_alt_fuel(df)
-    chart_service_comparison(df)
-    chart_regional(df)
-    chart_sgp_regional_share(df)
-    chart_fuel_diversity(df)
-    chart_competitive_intensity(df)
-    chart_sgp_vs_gulf(df)
-    chart_geographic_scatter(df)
-    chart_expansion_opportunity(df)
-
-    print(f"\nDone — {len(os.listdir(CHARTS_DIR))} charts saved to {CHARTS_DIR}/")
+    cube = build_cube(df, CUBE_FLAGS, CUBE_MEASURES, load_features())
+    rendered, skipped = render_charts(df, jobs=args.jobs, force=args.force, cube=cube)
+    print(f"Wrote {analytics.write_analytics(cube, args.analytics)}")
+
+    print(f"\nDone — {len(rendered)} charts redrawn, {len(skipped)} unchanged in {CHARTS_DIR}/")
 
 
 if __name__ == "__main__":
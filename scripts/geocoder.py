@@ -0,0 +1,150 @@
+"""
+Reverse geocoding: station coordinates -> nearest named place.
+
+Places are bucketed once into a lat/lon grid whose cells are at least
+`max_km` across, so every place within `max_km` of a point lies in the
+point's cell or one of its eight neighbours. A batch of points is resolved
+in one vectorized pass: candidate (point, place) pairs are gathered from
+the nine cells with searchsorted, their great-circle (haversine) distances
+computed together, and the nearest place within range kept per point.
+
+The gazetteer is the built-in city list, optionally extended from a local
+file (see load_gazetteer), so it can grow to tens of thousands of
+settlements without slowing lookups down.
+"""
+
+import csv
+import math
+import os
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+# GeoNames dump columns (https://download.geonames.org/export/dump/)
+GEONAMES_NAME, GEONAMES_LAT, GEONAMES_LON, GEONAMES_CLASS = 1, 4, 5, 6
+# Cells are keyed as row * KEY_STRIDE + column
+KEY_STRIDE = 1 << 32
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km; accepts scalars or NumPy arrays."""
+    lat1, lon1, lat2, lon2 = (np.radians(v) for v in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def load_gazetteer(path):
+    """
+    Read (name, lat, lon) places from a local file.
+
+    Two formats are accepted: a CSV with name, latitude and longitude
+    columns, or a GeoNames country dump (e.g. GE.txt, tab-separated), of
+    which only populated places (feature class P) are kept.
+    """
+    places = []
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.endswith(".csv"):
+            for row in csv.DictReader(f):
+                places.append((row["name"], float(row["latitude"]), float(row["longitude"])))
+        else:
+            for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(row) > GEONAMES_CLASS and row[GEONAMES_CLASS] == "P":
+                    places.append((row[GEONAMES_NAME],
+                                   float(row[GEONAMES_LAT]), float(row[GEONAMES_LON])))
+    return places
+
+
+class Geocoder:
+    """Nearest-place lookup within `max_km`; earlier places win exact ties."""
+
+    def __init__(self, places, max_km):
+        self.max_km = max_km
+        self.names = np.array([p[0] for p in places], dtype=object)
+        lats = np.array([p[1] for p in places], dtype=np.float64)
+        lons = np.array([p[2] for p in places], dtype=np.float64)
+
+        # Cell height covers max_km of latitude; cell width covers max_km of
+        # longitude even at the highest latitude a match can occur at.
+        self.cell_lat = max_km / KM_PER_DEGREE
+        top = min(89.0, float(np.abs(lats).max(initial=0)) + self.cell_lat)
+        self.cell_lon = self.cell_lat / math.cos(math.radians(top))
+
+        keys = self._keys(lats, lons)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+        self.lats = lats[self.order]
+        self.lons = lons[self.order]
+        self._cache = {}
+
+    def _cells(self, lats, lons):
+        return (np.floor(lats / self.cell_lat).astype(np.int64),
+                np.floor(lons / self.cell_lon).astype(np.int64))
+
+    def _keys(self, lats, lons, drow=0, dcol=0):
+        rows, cols = self._cells(lats, lons)
+        return (rows + drow) * KEY_STRIDE + (cols + dcol)
+
+    def nearest(self, lats, lons):
+        """Resolve arrays of coordinates; "" where nothing is within range."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        result = np.full(len(lats), "", dtype=object)
+        valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+        if not len(valid) or not len(self.keys):
+            return result
+        qlat, qlon = lats[valid], lons[valid]
+
+        # Candidate pairs from the 3x3 block of cells around each point
+        points, places = [], []
+        for drow in (-1, 0, 1):
+            for dcol in (-1, 0, 1):
+                keys = self._keys(qlat, qlon, drow, dcol)
+                lo = np.searchsorted(self.keys, keys, "left")
+                counts = np.searchsorted(self.keys, keys, "right") - lo
+                total = int(counts.sum())
+                if not total:
+                    continue
+                starts = np.cumsum(counts) - counts
+                points.append(np.repeat(np.arange(len(keys)), counts))
+                places.append(np.arange(total) - np.repeat(starts - lo, counts))
+        if not points:
+            return result
+        point, place = np.concatenate(points), np.concatenate(places)
+
+        dist = haversine_km(qlat[point], qlon[point], self.lats[place], self.lons[place])
+        near = dist <= self.max_km
+        point, place, dist = point[near], place[near], dist[near]
+
+        # Closest per point, ties going to the place listed first
+        ranked = np.lexsort((self.order[place], dist, point))
+        point, first = np.unique(point[ranked], return_index=True)
+        result[valid[point]] = self.names[self.order[place[ranked][first]]]
+        return result
+
+    def prime(self, lats, lons):
+        """Resolve a batch up front so later lookup() calls are cache hits."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        for lat, lon, name in zip(lats.tolist(), lons.tolist(), self.nearest(lats, lons)):
+            self._cache[(lat, lon)] = name
+
+    def clear(self):
+        """Forget every cached lookup."""
+        self._cache.clear()
+
+    def lookup(self, lat, lon):
+        key = (lat, lon)
+        if key not in self._cache:
+            self._cache[key] = self.nearest([lat], [lon])[0]
+        return self._cache[key]
+
+
+def from_files(builtin, path=None, max_km=15.0):
+    """Geocoder over `builtin` {name: (lat, lon)} plus `path`, if it exists."""
+    places = [(name, lat, lon) for name, (lat, lon) in builtin.items()]
+    if path and os.path.exists(path):
+        places.extend(load_gazetteer(path))
+    return Geocoder(places, max_km)
@@ -1,10 +1,8 @@
-import requests
 import re
 import json
 import csv
-import urllib3
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import payload_cache
 
 
 FUEL_TYPE_MAP = {
@@ -34,22 +32,85 @@ FOOD_TYPE_MAP = {
 }
 
 URL = "https://gulf.ge/en/map"
-
-
-def fetch_stations():
-    response = requests.get(URL, verify=False)
-    response.raise_for_status()
-    html = response.text
-
-    match = re.search(r"var\s+pins\s*=\s*(\{.*?\})\s*;", html, re.DOTALL)
-    if not match:
+TIMEOUT = 30
+
+
+def fetch_payload(timeout=TIMEOUT):
+    """Download the raw map page. Returns (bytes, changed)."""
+    return payload_cache.fetch("gulf", URL, timeout)
+
+
+# ---------------------------------------------------------------------------
+# `var pins = {...};` extraction
+# ---------------------------------------------------------------------------
+# The pins object is located with a literal-aware scanner instead of a lazy
+# DOTALL regex: brackets are counted while strings, template literals and
+# comments are skipped whole, so an inner `};` inside a description can not
+# end the object early. The scan runs directly on the raw bytes and only the
+# object's own slice is copied out for json.loads.
+
+PINS_START = re.compile(rb"var\s+pins\s*=\s*")
+
+# One step of the scan: a run of inert input stopping at the next bracket
+# that changes nesting. Whole string, template and comment literals are
+# inert, and so are flat arrays of scalars (the pins' fuel/poi/food code
+# lists), which keeps the Python-level loop to about two steps per pin.
+_STRING = rb"""
+      "[^"\\]*(?:\\.[^"\\]*)*"
+    | '[^'\\]*(?:\\.[^'\\]*)*'
+    | `[^`\\]*(?:\\.[^`\\]*)*`
+    | //[^\n]*
+    | /\*.*?\*/
+    | /
+"""
+# Every group is atomic and every run possessive: a run can only be split
+# one way, so when a "flat" array turns out to hold an object the array
+# branch fails at once (the bracket stack takes the `[`) instead of
+# backtracking through every split of the scalars before it.
+SCAN_STEP = re.compile(
+    rb"(?>[^{}\[\]\"'`/]++|(?>" + _STRING + rb")|\[(?>[^{}\[\]\"'`/]++|(?>" + _STRING + rb"))*+\])*+",
+    re.DOTALL | re.VERBOSE,
+)
+OPENERS = {ord("{"): ord("}"), ord("["): ord("]")}
+
+
+def literal_end(data, start):
+    """
+    Return the index just past the JS object/array literal opening at `start`.
+
+    Raises ValueError if the brackets do not balance before the end of data.
+    """
+    expected = []
+    pos = start
+    n = len(data)
+    while pos < n:
+        c = data[pos]
+        if c in OPENERS:
+            expected.append(OPENERS[c])
+        elif not expected or c != expected.pop():
+            raise ValueError(f"Unbalanced bracket at offset {pos}")
+        elif not expected:
+            return pos + 1
+        pos = SCAN_STEP.match(data, pos + 1).end()
+    raise ValueError("Unterminated object literal")
+
+
+def decode_payload(body):
+    match = PINS_START.search(body)
+    if not match or body[match.end():match.end() + 1] != b"{":
         raise ValueError("Could not find 'pins' data in the page source.")
 
-    raw = match.group(1)
-    stations = json.loads(raw)
+    start = match.end()
+    end = literal_end(body, start)
+    stations = json.loads(body[start:end].decode("utf-8"))
     return stations
 
 
+def fetch_stations(timeout=TIMEOUT):
+    body, _ = fetch_payload(timeout)
+    return decode_payload(body)
+
+
 def parse_stations(stations):
     rows = []
     for station_id, data in stations.items():
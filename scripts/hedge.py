@@ -0,0 +1,150 @@
+"""
+Hedged live / Wayback Machine fetching with a persisted circuit breaker.
+
+Rompetrol and Lukoil are fetched from their live sites when those answer,
+and from web.archive.org otherwise. Instead of waiting out the live
+timeout before even starting the Wayback request, the fallback is raced
+against the live request after a short head start (HEDGE_DELAY), and the
+first valid response wins; a fallback that has not started yet is
+cancelled, and an in-flight loser is abandoned. The live request is made
+without retries (the fallback is the retry), and a live attempt still
+running when the fallback wins counts as a live failure: the scrapers exit
+right after, so the abandoned attempt would never report its timeout.
+
+Each source also has a circuit breaker stored in data/cache/circuits.json:
+after FAILURE_THRESHOLD consecutive live failures the circuit opens and
+runs go straight to Wayback. Once PROBE_INTERVAL has passed, the next run
+probes the live site again (racing Wayback from the start), and a single
+successful live response closes the circuit.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+
+import payload_cache
+
+STATE_PATH = os.path.join(payload_cache.CACHE_DIR, "circuits.json")
+
+# Seconds the live site gets before the Wayback request is raced against it
+HEDGE_DELAY = 2.0
+# Consecutive live failures that open a source's circuit
+FAILURE_THRESHOLD = 2
+# Seconds an open circuit skips the live site before probing it again
+PROBE_INTERVAL = 6 * 3600
+
+CLOSED, PROBE, OPEN = "closed", "probe", "open"
+
+_lock = threading.Lock()
+
+
+def _load_state():
+    try:
+        with open(STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp = f"{STATE_PATH}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp, STATE_PATH)
+
+
+def circuit_mode(source, now=None):
+    """Return CLOSED, PROBE or OPEN for the live site of `source`."""
+    now = time.time() if now is None else now
+    with _lock:
+        c = _load_state().get(source)
+    if not c or not c.get("opened_at"):
+        return CLOSED
+    return PROBE if now - c["opened_at"] >= PROBE_INTERVAL else OPEN
+
+
+def record(source, ok, now=None):
+    """Record the outcome of a live attempt for `source`."""
+    now = time.time() if now is None else now
+    with _lock:
+        state = _load_state()
+        c = state.get(source, {"failures": 0, "opened_at": None})
+        if ok:
+            c = {"failures": 0, "opened_at": None}
+        else:
+            c["failures"] += 1
+            if c["failures"] >= FAILURE_THRESHOLD:
+                # (Re)open; a failed probe restarts the wait
+                c["opened_at"] = now
+        c["checked_at"] = now
+        state[source] = c
+        _save_state(state)
+
+
+def fetch_hedged(source, live, fallback, delay=HEDGE_DELAY):
+    """
+    Fetch `source` from its live site, hedged by a Wayback fallback.
+
+    `live` and `fallback` are (url, timeout, kwargs) tuples for
+    payload_cache.download. Returns (body, changed, origin) where origin is
+    "live" or "wayback". If every attempt fails, the last error is raised.
+    """
+    mode = circuit_mode(source)
+    results = queue.Queue()
+    # Set when the fallback should start now: the live attempt failed or
+    # a winner was found (in which case `done` is also set).
+    start_fallback = threading.Event()
+    done = threading.Event()
+    # The live outcome is recorded once, by whichever side settles it first
+    live_settled = []
+    settle_lock = threading.Lock()
+
+    def settle_live(ok):
+        with settle_lock:
+            if live_settled:
+                return
+            live_settled.append(ok)
+        record(source, ok)
+
+    def attempt(origin, spec, wait):
+        if wait:
+            start_fallback.wait(wait)
+        if done.is_set():
+            return
+        url, timeout, kwargs = spec
+        if origin == "live":
+            kwargs = {**kwargs, "retries": 0}
+        try:
+            d = payload_cache.download(source, url, timeout, **kwargs)
+        except Exception as e:
+            if origin == "live":
+                settle_live(False)
+            results.put((origin, None, e))
+            return
+        if origin == "live":
+            settle_live(True)
+        results.put((origin, d, None))
+
+    attempts = []
+    if mode != OPEN:
+        attempts.append(("live", live, 0))
+    attempts.append(("wayback", fallback, delay if mode == CLOSED else 0))
+    for args in attempts:
+        threading.Thread(target=attempt, args=args, daemon=True).start()
+
+    error = None
+    for _ in attempts:
+        origin, d, err = results.get()
+        if d is not None:
+            done.set()
+            start_fallback.set()
+            if mode != OPEN and origin != "live":
+                settle_live(False)
+            body, changed = payload_cache.commit(d)
+            return body, changed, origin
+        error = err
+        start_fallback.set()
+    raise error
@@ -0,0 +1,204 @@
+"""
+Shared HTTP plumbing for the scrapers.
+
+Every host gets exactly one pooled requests.Session, so repeated and
+concurrent fetches against the same site reuse keep-alive connections
+instead of opening a new one per call.
+
+Requests are also shaped per host: a token bucket limits the request
+rate, a semaphore caps how many are in flight at once, and 429/5xx
+responses and connection errors are retried with exponential backoff and
+full jitter (honouring Retry-After); only idempotent methods are retried
+unless the caller passes `retries`. Lukoil and Rompetrol both fall back to
+web.archive.org, which throttles aggressively, so that host gets the
+tightest limits. Every request is timed and recorded in metrics().
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+import urllib3
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+# Max pooled connections kept open per host
+POOL_SIZE = 4
+
+# host -> (requests per second, burst, max concurrent requests)
+HOST_LIMITS = {
+    "web.archive.org": (1.0, 2, 2),
+}
+DEFAULT_LIMIT = (5.0, 5, POOL_SIZE)
+
+# Retry policy
+MAX_RETRIES = 3
+# Methods retried by default; a POST is retried only when the caller says so
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_sessions = {}
+_limiters = {}
+_sessions_lock = threading.Lock()
+
+_metrics = []
+_metrics_lock = threading.Lock()
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `burst` saved."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def session_for(url):
+    """Return the shared session for the host of `url`, creating it on first use."""
+    host = host_of(url)
+    with _sessions_lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=POOL_SIZE,
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            # The Georgian sites serve incomplete certificate chains
+            session.verify = False
+            _sessions[host] = session
+    return session
+
+
+def limiter_for(url):
+    """Return (token bucket, concurrency semaphore) for the host of `url`."""
+    host = host_of(url)
+    with _sessions_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, burst, concurrency = HOST_LIMITS.get(host, DEFAULT_LIMIT)
+            limiter = (TokenBucket(rate, burst), threading.BoundedSemaphore(concurrency))
+            _limiters[host] = limiter
+    return limiter
+
+
+def retry_delay(attempt, response=None):
+    """Backoff before retry number `attempt` (0-based): Retry-After or full jitter."""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(retry_after).timestamp()
+                return min(BACKOFF_MAX, max(0.0, when - time.time()))
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def request(method, url, timeout, retries=None, **kwargs):
+    """
+    Issue a request through the pooled, rate-limited session for the url's host.
+
+    429/5xx responses and connection errors/timeouts are retried up to
+    `retries` times (default: MAX_RETRIES for IDEMPOTENT_METHODS, none for
+    others). The final response is returned whatever its status; the final
+    connection error is raised.
+    """
+    if retries is None:
+        retries = MAX_RETRIES if method.upper() in IDEMPOTENT_METHODS else 0
+    session = session_for(url)
+    bucket, slots = limiter_for(url)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        bucket.acquire()
+        response, error = None, None
+        with slots:
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+
+        retryable = error is not None or response.status_code in RETRY_STATUSES
+        if not retryable or attempt >= retries:
+            _record(method, url, response, error, attempt + 1,
+                    time.perf_counter() - start, kwargs.get("stream", False))
+            if error is not None:
+                raise error
+            return response
+
+        delay = retry_delay(attempt, response)
+        if response is not None:
+            # Hand the connection back to the pool before waiting
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url, timeout, **kwargs):
+    return request("GET", url, timeout, **kwargs)
+
+
+def post(url, timeout, **kwargs):
+    return request("POST", url, timeout, **kwargs)
+
+
+def _record(method, url, response, error, attempts, seconds, stream):
+    with _metrics_lock:
+        _metrics.append({
+            "host": host_of(url),
+            "method": method,
+            "url": url,
+            "status": response.status_code if response is not None else None,
+            "error": type(error).__name__ if error is not None else "",
+            "attempts": attempts,
+            "seconds": round(seconds, 4),
+            # Streamed bodies are not read yet, so their size is unknown
+            "bytes": 0 if response is None else None if stream else len(response.content),
+        })
+
+
+def metrics():
+    """Return a copy of the per-request timing records collected so far."""
+    with _metrics_lock:
+        return list(_metrics)
+
+
+def reset_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def close_all():
+    with _sessions_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -1,15 +1,17 @@
-import requests
-import re
+import codecs
 import csv
-import urllib3
+import re
+from collections import deque
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import hedge
 
 LIVE_URL = "https://www.lukoil.ge/stations"
 WAYBACK_URL = "https://web.archive.org/web/2025/https://www.lukoil.ge/stations"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 }
+LIVE_TIMEOUT = 10
+TIMEOUT = 30
 
 TYPE_MAP = {
     "საკუთარი": "Own",
@@ -108,67 +110,186 @@ ADDRESS_MAP = {
 }
 
 
-def fetch_page():
-    # Try live site first
-    try:
-        r = requests.get(LIVE_URL, headers=HEADERS, verify=False, timeout=10)
-        r.raise_for_status()
-        if "L.marker" in r.text:
-            print("Fetched from live site.")
-            return r.text
-    except Exception as e:
-        print(f"Live site unavailable ({e}), trying Wayback Machine...")
+def is_valid_payload(body):
+    return b"L.marker" in body
+
+
+def fetch_payload(timeout=TIMEOUT):
+    """Download the raw stations page. Returns (bytes, changed)."""
+    # Live site first, with the Wayback Machine raced in as a hedge
+    body, changed, origin = hedge.fetch_hedged(
+        "lukoil",
+        live=(LIVE_URL, min(timeout, LIVE_TIMEOUT),
+              {"headers": HEADERS, "validate": is_valid_payload}),
+        fallback=(WAYBACK_URL, timeout, {"headers": HEADERS}),
+    )
+    if origin == "live":
+        print("Fetched from live site.")
+    else:
+        print("Fetched from Wayback Machine cache.")
+    return body, changed
+
+
+def decode_payload(body):
+    return body.decode("utf-8")
+
 
-    # Fallback to Wayback Machine
-    r = requests.get(WAYBACK_URL, headers=HEADERS, verify=False, timeout=30)
-    r.raise_for_status()
-    print("Fetched from Wayback Machine cache.")
-    return r.text
+def fetch_page(timeout=TIMEOUT):
+    body, _ = fetch_payload(timeout)
+    return decode_payload(body)
 
 
 def translate(text, mapping):
     return mapping.get(text.strip(), text.strip())
 
 
-def parse_stations(html):
-    # Extract markers: lat, lng, popup text (address with city)
-    markers = re.findall(
-        r'L\.marker\(\[([0-9.]+),\s*([0-9.]+)\]\);\s*\n\s*marker\.addTo\(mymap\);\s*\n\s*marker\.bindPopup\("(.*?)"\)',
-        html,
-    )
+# ---------------------------------------------------------------------------
+# Single-pass page tokenizer
+# ---------------------------------------------------------------------------
+# The page carries the same stations twice: as Leaflet markers in a <script>
+# (coordinates + Georgian popup) and as a visible table (#, city, address,
+# type). Both lists are in the same order, so the i-th marker is paired with
+# the i-th table row. Instead of running one findall per list over the whole
+# document, the page is consumed as a stream of chunks and scanned once with
+# a single token pattern; every alternative ends at a literal terminator, so
+# no match can run past the next cell or statement. Pairs are emitted as
+# soon as both halves are available.
 
-    # Extract table rows: #, city, address, type
-    table_rows = re.findall(
-        r'<p class="text-lk-main text-md font-semibold">\s*(\d+)\s*</p>.*?'
-        r'<p class="text-lk-main text-md font-semibold">\s*(.*?)\s*</p>.*?'
-        r'<p class="text-lk-main text-sm font-semibold text-center">\s*(.*?)\s*</p>.*?'
-        r'<p class="text-lk-main text-md font-semibold">\s*(.*?)\s*</p>',
-        html,
-        re.DOTALL,
-    )
+CHUNK_SIZE = 64 * 1024
+
+TOKEN = re.compile(
+    r'L\.marker\(\[(?P<lat>[0-9.]+),\s*(?P<lng>[0-9.]+)\]\);\s*\n\s*marker\.addTo\(mymap\);'
+    r'\s*\n\s*marker\.bindPopup\("(?P<popup>[^\n]*?)"\)'
+    r'|<p class="text-lk-main text-(?:(?P<md>md font-semibold)|sm font-semibold text-center)">'
+    r'\s*(?P<text>.*?)\s*</p>',
+    re.DOTALL,
+)
+DIGITS = re.compile(r"\d+")
+# How every TOKEN alternative starts
+TOKEN_START = re.compile(r'L\.marker\(\[|<p class="text-lk-main text-')
+
+# Usual upper bound on the length of one token; a token that starts closer
+# than this to the end of the buffer may still be cut off by the chunk
+# boundary. Longer tokens are kept whole (see iter_tokens()).
+MAX_TOKEN_LEN = 8192
+
+
+def iter_text(source, chunk_size=CHUNK_SIZE):
+    """Yield str chunks from a str, bytes, text/binary file or iterable of chunks."""
+    if isinstance(source, str):
+        for i in range(0, len(source), chunk_size):
+            yield source[i:i + chunk_size]
+        return
+    if isinstance(source, (bytes, bytearray)):
+        view = memoryview(source)
+        source = (view[i:i + chunk_size] for i in range(0, len(view), chunk_size))
+    elif hasattr(source, "read"):
+        source = iter(lambda: source.read(chunk_size), source.read(0))
+
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for chunk in source:
+        yield chunk if isinstance(chunk, str) else decoder.decode(chunk)
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
 
-    rows = []
-    for i, (lat, lng, popup) in enumerate(markers):
-        if i < len(table_rows):
-            num, city_geo, addr_geo, stype_geo = table_rows[i]
-            city = translate(city_geo, CITY_MAP)
-            address = translate(addr_geo, ADDRESS_MAP)
-            station_type = TYPE_MAP.get(stype_geo.strip(), stype_geo.strip())
+
+def iter_tokens(source, chunk_size=CHUNK_SIZE):
+    """
+    Tokenize the page in one pass.
+
+    Yields ("marker", (lat, lng, popup)) and ("row", (num, city, address,
+    type)) in document order. Only the unconsumed tail of the input is kept
+    in memory; a token longer than MAX_TOKEN_LEN makes the buffer grow until
+    its terminator arrives.
+    """
+    chunks = iter_text(source, chunk_size)
+    buf = ""
+    eof = False
+    # Table-row state: cells collected so far for the row being assembled
+    cells = []
+
+    while not eof:
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
         else:
-            city = ""
-            address = popup.encode("raw_unicode_escape").decode("unicode_escape")
-            station_type = ""
-
-        rows.append({
-            "id": i + 1,
-            "city": city,
-            "address": address,
-            "latitude": lat,
-            "longitude": lng,
-            "type": station_type,
-        })
-
-    return rows
+            buf += chunk
+            if len(buf) < MAX_TOKEN_LEN:
+                continue
+
+        # Tokens starting inside the unsafe tail wait for the next chunk
+        limit = len(buf) if eof else len(buf) - MAX_TOKEN_LEN
+        pos = 0
+        for m in TOKEN.finditer(buf):
+            if m.start() >= limit:
+                break
+            pos = m.end()
+            if m.group("lat") is not None:
+                yield "marker", m.group("lat", "lng", "popup")
+                continue
+
+            # Row layout: md(#) -> md(city) -> sm(address) -> md(type); cells
+            # of the wrong kind in between are skipped, as the old regex did.
+            text = m.group("text")
+            if m.group("md") is not None:
+                if not cells:
+                    if DIGITS.fullmatch(text):
+                        cells.append(text)
+                elif len(cells) == 1 or len(cells) == 3:
+                    cells.append(text)
+            elif len(cells) == 2:
+                cells.append(text)
+
+            if len(cells) == 4:
+                yield "row", tuple(cells)
+                cells = []
+
+        # A token that starts before `limit` but has not matched yet may be
+        # longer than MAX_TOKEN_LEN: keep it and retry with more input
+        cut = TOKEN_START.search(buf, pos, limit)
+        buf = buf[cut.start() if cut else max(pos, limit):]
+
+
+def build_row(i, marker, table_row):
+    lat, lng, popup = marker
+    if table_row is not None:
+        num, city_geo, addr_geo, stype_geo = table_row
+        city = translate(city_geo, CITY_MAP)
+        address = translate(addr_geo, ADDRESS_MAP)
+        station_type = TYPE_MAP.get(stype_geo.strip(), stype_geo.strip())
+    else:
+        city = ""
+        address = popup.encode("raw_unicode_escape").decode("unicode_escape")
+        station_type = ""
+
+    return {
+        "id": i + 1,
+        "city": city,
+        "address": address,
+        "latitude": lat,
+        "longitude": lng,
+        "type": station_type,
+    }
+
+
+def iter_stations(source, chunk_size=CHUNK_SIZE):
+    """Stream station rows, pairing the i-th marker with the i-th table row."""
+    markers, table_rows = deque(), deque()
+    emitted = 0
+    for kind, value in iter_tokens(source, chunk_size):
+        (markers if kind == "marker" else table_rows).append(value)
+        while markers and table_rows:
+            yield build_row(emitted, markers.popleft(), table_rows.popleft())
+            emitted += 1
+    # Markers without a matching table row fall back to their popup text
+    while markers:
+        yield build_row(emitted, markers.popleft(), None)
+        emitted += 1
+
+
+def parse_stations(html):
+    return list(iter_stations(html))
 
 
 def save_csv(rows, path):
@@ -0,0 +1,166 @@
+"""
+Content-addressed cache for raw scraper payloads.
+
+Every downloaded body is stored once under data/cache/blobs/<sha256>, and
+data/cache/index.json remembers, per source, the URL it came from, the
+payload hash and the ETag / Last-Modified validators the server sent.
+
+On the next fetch those validators are replayed as If-None-Match /
+If-Modified-Since, so an unchanged page costs a 304 instead of a full
+download. Either way the caller learns whether the bytes changed, which
+lets the refresh skip parse_stations / save_csv for sources that did not
+move. A new payload stays "pending" in the index until the caller has
+saved what it parsed from it (mark_processed()); while it is pending it
+keeps reporting changed, so a parse or save that fails is retried on the
+next run instead of leaving a stale CSV behind. load() returns the last
+cached payload without any request, so a whole run can be replayed
+offline.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+import http_client
+
+CACHE_DIR = os.path.join("data", "cache")
+BLOB_DIR = os.path.join(CACHE_DIR, "blobs")
+INDEX_PATH = os.path.join(CACHE_DIR, "index.json")
+
+_lock = threading.Lock()
+
+
+class CacheMiss(LookupError):
+    """Raised when a source has never been cached."""
+
+
+def _load_index():
+    try:
+        with open(INDEX_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_index(index):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = INDEX_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp, INDEX_PATH)
+
+
+def _blob_path(digest):
+    return os.path.join(BLOB_DIR, digest)
+
+
+def _read_blob(digest):
+    with open(_blob_path(digest), "rb") as f:
+        return f.read()
+
+
+def _write_blob(digest, body):
+    path = _blob_path(digest)
+    if os.path.exists(path):
+        return
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(body)
+    os.replace(tmp, path)
+
+
+def entry(source):
+    """Return the index entry for `source`, or None if it was never cached."""
+    with _lock:
+        return _load_index().get(source)
+
+
+def load(source):
+    """Return the last cached payload for `source` without touching the network."""
+    e = entry(source)
+    if e is None or not os.path.exists(_blob_path(e["sha256"])):
+        raise CacheMiss(f"No cached payload for '{source}'")
+    return _read_blob(e["sha256"])
+
+
+# A payload that was downloaded (or revalidated with a 304) but not yet
+# recorded as the current payload of its source.
+Download = namedtuple("Download", "source url body sha256 etag last_modified")
+
+
+def download(source, url, timeout, method="GET", headers=None, validate=None, **kwargs):
+    """
+    Fetch `url` for `source` with conditional revalidation, without
+    recording the result. Pass the returned Download to commit().
+
+    `validate(body)` may reject a response (return False); a ValueError is
+    raised and nothing is cached.
+    """
+    previous = entry(source)
+    headers = dict(headers or {})
+    conditional = False
+    if previous and previous.get("url") == url and os.path.exists(_blob_path(previous["sha256"])):
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+            conditional = True
+        if previous.get("last_modified"):
+            headers["If-Modified-Since"] = previous["last_modified"]
+            conditional = True
+
+    r = http_client.request(method, url, timeout, headers=headers, **kwargs)
+    if r.status_code == 304 and conditional:
+        return Download(source, url, _read_blob(previous["sha256"]), previous["sha256"],
+                        previous.get("etag", ""), previous.get("last_modified", ""))
+    r.raise_for_status()
+
+    body = r.content
+    if validate is not None and not validate(body):
+        raise ValueError(f"Invalid payload from {url}")
+
+    return Download(source, url, body, hashlib.sha256(body).hexdigest(),
+                    r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+
+
+def commit(d):
+    """
+    Record a Download as the current payload of its source.
+
+    Returns (body, changed) where `changed` is False when the payload hash
+    matches the one previously cached for this source and that payload was
+    processed (see mark_processed()).
+    """
+    _write_blob(d.sha256, d.body)
+    with _lock:
+        index = _load_index()
+        previous = index.get(d.source)
+        changed = (previous is None or previous.get("sha256") != d.sha256
+                   or previous.get("pending", False))
+        index[d.source] = {
+            "url": d.url,
+            "sha256": d.sha256,
+            "size": len(d.body),
+            "etag": d.etag,
+            "last_modified": d.last_modified,
+            "fetched_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "pending": changed,
+        }
+        _save_index(index)
+    return d.body, changed
+
+
+def mark_processed(source):
+    """Record that the current payload of `source` was parsed and saved."""
+    with _lock:
+        index = _load_index()
+        if index.get(source, {}).get("pending"):
+            index[source]["pending"] = False
+            _save_index(index)
+
+
+def fetch(source, url, timeout, method="GET", headers=None, validate=None, **kwargs):
+    """Download and commit in one step. Returns (body, changed)."""
+    return commit(download(source, url, timeout, method, headers, validate, **kwargs))
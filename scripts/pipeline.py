@@ -0,0 +1,155 @@
+"""
+End-to-end pipeline: scrape -> combine -> charts, entirely in memory.
+
+`run` fetches every source through the registry, combines the raw rows,
+builds the chart DataFrame straight from the combined stations, renders
+the charts and writes their data for the web app (analytics.py), without
+writing and re-reading data/<brand>.csv or data/final.csv in between.
+CSVs are only written with --write-csv.
+
+A source that fails to fetch falls back to its last data/<brand>.csv when
+one exists, so a single flaky site does not drop a brand from the charts.
+Stage timings and per-source counters go to data/reports/pipeline.json and
+pipeline.prom (see run_report.py).
+
+Usage:
+    python scripts/pipeline.py run                  # scrape, combine, chart
+    python scripts/pipeline.py run --offline        # replay from data/cache/
+    python scripts/pipeline.py run --from-csv       # start from data/<brand>.csv
+    python scripts/pipeline.py run --write-csv      # also write the data files
+    python scripts/pipeline.py run --no-charts
+"""
+
+import argparse
+import os
+import sys
+
+import analytics
+import combine_data
+import http_client
+import sources
+from run_report import REPORT_DIR, RunReport
+from station_cube import build_cube
+
+
+def load_raw_csvs(registry, run):
+    raw = {}
+    for name, source in registry.items():
+        raw[name] = combine_data.load_csv(source.csv_name)
+        run.source(name, bytes=os.path.getsize(os.path.join(combine_data.DATA_DIR, source.csv_name)))
+    return raw
+
+
+def scrape_raw(registry, run, offline=False):
+    """
+    Scrape every source in memory. Returns ({name: raw rows}, sources.scrape()
+    results); the rows are None if a failed source has no CSV to fall back on.
+    """
+    try:
+        results, failures = sources.scrape(list(registry), offline=offline)
+    finally:
+        http_client.close_all()
+    run.add_http(http_client.metrics())
+
+    raw = {}
+    for name, source in registry.items():
+        if name in results:
+            rows, _, seconds, size = results[name]
+            print(f"  {name:<10} {len(rows):>4} stations  ({seconds:.1f}s)")
+            run.source(name, bytes=size, seconds=seconds)
+            raw[name] = rows
+            continue
+        run.source(name, up=False, error=str(failures[name]))
+        path = os.path.join(combine_data.DATA_DIR, source.csv_name)
+        if not os.path.exists(path):
+            print(f"  {name:<10} FAILED: {failures[name]}")
+            return None, results
+        print(f"  {name:<10} FAILED: {failures[name]} — using {path}")
+        raw[name] = combine_data.load_csv(source.csv_name)
+    return raw, results
+
+
+def write_csvs(registry, raw, stations, scraped, run):
+    """
+    Write data/<name>.csv for the sources in `scraped` (those fetched and
+    parsed this run) and the final outputs. A source that fell back to its
+    old CSV is left alone: saving would mark its cached payload processed
+    although it never parsed.
+    """
+    for name, source in registry.items():
+        if name in scraped:
+            source.save_csv(raw[name], combine_data.DATA_DIR)
+    combine_data.save_final(stations, run)
+
+
+def run(args):
+    registry = sources.registry()
+    timer = RunReport("pipeline")
+
+    if args.from_csv:
+        print(f"Loading {len(registry)} raw CSV(s)...")
+        raw = timer.run("load", load_raw_csvs, registry, timer)
+        scraped = {}
+    else:
+        mode = "from cache" if args.offline else "concurrently"
+        print(f"Scraping {len(registry)} source(s) {mode}...")
+        raw, scraped = timer.run("scrape", scrape_raw, registry, timer, offline=args.offline)
+        if raw is None:
+            print("Aborting: a source failed and has no previous CSV.")
+            print(f"Run report: {timer.write(args.report_dir)}")
+            return 1
+
+    stations, report = timer.run("combine", combine_data.combine, raw)
+    timer.add_combine(report)
+    combine_data.print_report(report)
+    report_path = combine_data.CLUSTERS_PATH if args.write_csv else None
+    stations = timer.run("colocate", combine_data.colocate, stations, args.merge,
+                         report_path=report_path)
+    timer.stats = combine_data.summarize(stations)
+    print(f"\nCombined: {len(stations)} gas stations")
+
+    if not args.no_charts:
+        # Imported here so --no-charts runs do not need matplotlib
+        import generate_charts
+        df = timer.run("frame", generate_charts.frame_from_stations, stations)
+        cube = timer.run("cube", build_cube, df, analytics.CUBE_FLAGS, analytics.CUBE_MEASURES)
+        timer.run("charts", generate_charts.render_charts, df, cube=cube)
+        timer.run("analytics", analytics.write_analytics, cube)
+
+    if args.write_csv:
+        timer.run("write", write_csvs, registry, raw, stations, scraped, timer)
+        print(f"\nWrote {combine_data.FINAL_PATH} and {combine_data.COLUMNS_PATH}/")
+
+    timer.report()
+    print(f"Run report: {timer.write(args.report_dir)}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Georgia gas station pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="scrape, combine and chart in memory")
+    source_group = run_parser.add_mutually_exclusive_group()
+    source_group.add_argument("--offline", action="store_true",
+                              help="replay from cached payloads instead of downloading")
+    source_group.add_argument("--from-csv", action="store_true",
+                              help="start from the existing data/<brand>.csv files")
+    run_parser.add_argument("--write-csv", action="store_true",
+                            help="also write data/<brand>.csv, data/final.csv, "
+                                 "data/final.columns/ and data/clusters.csv")
+    run_parser.add_argument("--merge", choices=combine_data.MERGE_POLICIES, default="none",
+                            help="how to treat co-located stations (default: report only)")
+    run_parser.add_argument("--no-charts", action="store_true",
+                            help="stop after combining")
+    run_parser.add_argument("--report-dir", default=REPORT_DIR,
+                            help=f"where to write pipeline.json and pipeline.prom "
+                                 f"(default: {REPORT_DIR})")
+    run_parser.set_defaults(handler=run)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
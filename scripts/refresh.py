@@ -0,0 +1,127 @@
+"""
+Refresh every brand's raw dataset concurrently.
+
+Runs the five scrapers on a thread pool so a full refresh takes as long as
+the slowest source rather than the sum of all of them. A source that fails
+is reported and skipped; the CSVs of the sources that succeeded are still
+written.
+
+Raw payloads go through payload_cache, so a source whose bytes did not
+change since the last run is neither re-parsed nor re-saved. With
+--offline nothing is downloaded and every source is replayed from its last
+cached payload.
+
+Usage:
+    python scripts/refresh.py              # all sources
+    python scripts/refresh.py gulf sgp     # a subset
+    python scripts/refresh.py --offline    # replay from data/cache/
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import http_client
+import sources
+from run_report import REPORT_DIR, RunReport
+
+
+def csv_path(name):
+    return os.path.join("data", f"{name}.csv")
+
+
+def refresh_source(source, offline=False):
+    """
+    Fetch, parse and save one source.
+
+    Returns (row count or None when skipped as unchanged, seconds, payload bytes).
+    """
+    start = time.perf_counter()
+    payload, changed = source.fetch(offline)
+    if not changed and os.path.exists(csv_path(source.name)):
+        return None, time.perf_counter() - start, len(payload)
+
+    rows = source.parse(payload)
+    source.save_csv(rows)
+    return len(rows), time.perf_counter() - start, len(payload)
+
+
+def refresh(names, offline=False):
+    """Refresh `names` in parallel. Returns (results, failures) keyed by name."""
+    registry = sources.registry()
+    results, failures = {}, {}
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        futures = {pool.submit(refresh_source, registry[name], offline): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failures[name] = e
+    return results, failures
+
+
+def print_http_metrics(records):
+    if not records:
+        return
+    print("\nHTTP by host:")
+    by_host = {}
+    for m in records:
+        by_host.setdefault(m["host"], []).append(m)
+    for host, ms in sorted(by_host.items()):
+        retries = sum(m["attempts"] - 1 for m in ms)
+        size = sum(m["bytes"] or 0 for m in ms)
+        slowest = max(m["seconds"] for m in ms)
+        print(f"  {host:<24} {len(ms)} req, {retries} retries, "
+              f"{size / 1024:.0f} KiB, slowest {slowest:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh raw station datasets.")
+    registry = sources.registry()
+    parser.add_argument("sources", nargs="*", metavar="source",
+                        help=f"one of {', '.join(registry)} (default: all)")
+    parser.add_argument("--offline", action="store_true",
+                        help="replay from cached payloads instead of downloading")
+    parser.add_argument("--report-dir", default=REPORT_DIR,
+                        help=f"where to write refresh.json and refresh.prom (default: {REPORT_DIR})")
+    args = parser.parse_args(argv)
+    names = args.sources or list(registry)
+    unknown = [n for n in names if n not in registry]
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}")
+
+    mode = "from cache" if args.offline else "concurrently"
+    print(f"Refreshing {len(names)} source(s) {mode}...")
+    run = RunReport("refresh")
+    start = time.perf_counter()
+    try:
+        results, failures = run.run("refresh", refresh, names, offline=args.offline)
+    finally:
+        http_client.close_all()
+    elapsed = time.perf_counter() - start
+
+    for name in names:
+        if name in results:
+            count, seconds, size = results[name]
+            run.source(name, changed=count is not None, bytes=size, seconds=seconds)
+            if count is None:
+                print(f"  {name:<10} unchanged  ({seconds:.1f}s)")
+            else:
+                run.source(name, raw_rows=count)
+                print(f"  {name:<10} {count:>4} stations  ({seconds:.1f}s) -> {csv_path(name)}")
+        else:
+            run.source(name, up=False, error=str(failures[name]))
+            print(f"  {name:<10} FAILED: {failures[name]}")
+
+    run.add_http(http_client.metrics())
+    print_http_metrics(http_client.metrics())
+    print(f"\nDone in {elapsed:.1f}s — {len(results)} ok, {len(failures)} failed")
+    print(f"Run report: {run.write(args.report_dir)}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""
+Region assignment for stations.
+
+When data/regions.geojson exists (Polygon / MultiPolygon features with a
+"name" property holding the region name used in the charts, e.g.
+"Kvemo Kartli"), each station's coordinates are tested against those
+boundaries. The polygons' bounding boxes are packed into an R-tree (STR
+bulk loading), which a whole batch of points descends level by level with
+vectorized box tests; only the surviving (point, polygon) pairs get the
+exact even-odd ray-casting test, also vectorized over points and edges.
+
+Stations outside every polygon, or all of them when there is no boundary
+file, fall back to CITY_REGIONS by city name, and those whose city is not
+listed there (blank, or spelled "Bordjomi") to the region of the nearest
+city center within NEAREST_CITY_MAX_KM.
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+import geocoder
+
+REGIONS_PATH = os.path.join("data", "regions.geojson")
+NAME_PROPERTY = "name"
+
+# Max children per R-tree node
+NODE_CAPACITY = 8
+# Max point-edge pairs tested in one vectorized ray-casting step
+PIP_CHUNK = 1_000_000
+# Farthest a station may be from the city center whose region it takes
+NEAREST_CITY_MAX_KM = 75.0
+
+CITY_REGIONS = {
+    "Tbilisi": "Tbilisi",
+    "Rustavi": "Kvemo Kartli", "Marneuli": "Kvemo Kartli", "Gardabani": "Kvemo Kartli",
+    "Bolnisi": "Kvemo Kartli", "Dmanisi": "Kvemo Kartli",
+    "Kutaisi": "Imereti", "Zestaponi": "Imereti", "Zestafoni": "Imereti",
+    "Sachkhere": "Imereti", "Chiatura": "Imereti", "Tkibuli": "Imereti",
+    "Samtredia": "Imereti", "Khoni": "Imereti", "Vani": "Imereti",
+    "Terjola": "Imereti", "Lanchkhuti": "Imereti", "Senaki": "Imereti",
+    "Kharagauli": "Imereti",
+    "Batumi": "Adjara", "Kobuleti": "Adjara", "Khelvachauri": "Adjara",
+    "Gonio": "Adjara", "Keda": "Adjara",
+    "Gori": "Shida Kartli", "Kaspi": "Shida Kartli", "Khashuri": "Shida Kartli",
+    "Kareli": "Shida Kartli",
+    "Zugdidi": "Samegrelo", "Poti": "Samegrelo",
+    "Martvili": "Samegrelo", "Khobi": "Samegrelo", "Abasha": "Samegrelo",
+    "Tsalenjikha": "Samegrelo", "Jvari": "Samegrelo",
+    "Telavi": "Kakheti", "Gurjaani": "Kakheti", "Sagarejo": "Kakheti",
+    "Akhmeta": "Kakheti", "Sighnaghi": "Kakheti", "Lagodekhi": "Kakheti",
+    "Dedoplistskaro": "Kakheti", "Kvareli": "Kakheti", "Kakheti": "Kakheti",
+    "Akhaltsikhe": "Samtskhe-Javakheti", "Akhalkalaki": "Samtskhe-Javakheti",
+    "Ninotsminda": "Samtskhe-Javakheti", "Borjomi": "Samtskhe-Javakheti",
+    "Bakuriani": "Samtskhe-Javakheti",
+    "Ozurgeti": "Guria", "Chokhatauri": "Guria",
+    "Ambrolauri": "Racha-Lechkhumi", "Oni": "Racha-Lechkhumi",
+    "Mtskheta": "Mtskheta-Mtianeti", "Kazbegi": "Mtskheta-Mtianeti",
+    "Mestia": "Svaneti",
+}
+
+
+class BoxTree:
+    """Static R-tree over (min_x, min_y, max_x, max_y) boxes, STR bulk-loaded."""
+
+    def __init__(self, boxes, capacity=NODE_CAPACITY):
+        boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        # Leaf level: the input boxes in STR order
+        order = self._str_order(boxes, capacity)
+        self.items = order
+        levels = [(boxes[order], None)]
+        while len(levels[-1][0]) > 1:
+            child_boxes = levels[-1][0]
+            n = len(child_boxes)
+            starts = np.arange(0, n, capacity)
+            counts = np.minimum(capacity, n - starts)
+            parent = np.column_stack([
+                np.minimum.reduceat(child_boxes[:, 0], starts),
+                np.minimum.reduceat(child_boxes[:, 1], starts),
+                np.maximum.reduceat(child_boxes[:, 2], starts),
+                np.maximum.reduceat(child_boxes[:, 3], starts),
+            ])
+            levels.append((parent, (starts, counts)))
+        # Root first; each level's children ranges index the level below
+        self.levels = levels[::-1]
+
+    @staticmethod
+    def _str_order(boxes, capacity):
+        """Sort-Tile-Recursive: slice by x centre, then sort each slice by y."""
+        n = len(boxes)
+        if n == 0:
+            return np.arange(0)
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        slice_size = capacity * math.ceil(math.sqrt(math.ceil(n / capacity)))
+        by_x = np.argsort(cx, kind="stable")
+        return np.concatenate([
+            chunk[np.argsort(cy[chunk], kind="stable")]
+            for chunk in np.split(by_x, range(slice_size, n, slice_size))
+        ])
+
+    def query_points(self, xs, ys):
+        """Return (point index, box index) pairs for every box containing a point."""
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if not len(self.items):
+            return np.arange(0), np.arange(0)
+        points = np.arange(len(xs))
+        nodes = np.zeros(len(xs), dtype=np.int64)
+        for depth, (boxes, _) in enumerate(self.levels):
+            if depth:
+                # Expand every surviving (point, parent) pair to its children
+                starts, counts = self.levels[depth - 1][1]
+                c = counts[nodes]
+                offsets = np.arange(int(c.sum())) - np.repeat(np.cumsum(c) - c, c)
+                points = np.repeat(points, c)
+                nodes = np.repeat(starts[nodes], c) + offsets
+            b = boxes[nodes]
+            x, y = xs[points], ys[points]
+            inside = (b[:, 0] <= x) & (x <= b[:, 2]) & (b[:, 1] <= y) & (y <= b[:, 3])
+            points, nodes = points[inside], nodes[inside]
+        return points, self.items[nodes]
+
+
+def polygon_parts(geometry):
+    """GeoJSON Polygon/MultiPolygon -> list of polygons, each a list of rings."""
+    if geometry["type"] == "Polygon":
+        return [geometry["coordinates"]]
+    if geometry["type"] == "MultiPolygon":
+        return list(geometry["coordinates"])
+    return []
+
+
+def points_in_rings(xs, ys, rings):
+    """Even-odd test of points against a polygon's rings (holes included)."""
+    edges = []
+    for ring in rings:
+        r = np.asarray(ring, dtype=np.float64)[:, :2]
+        edges.append(np.column_stack([r, np.roll(r, -1, axis=0)]))
+    e = np.concatenate(edges)
+    x1, y1, x2, y2 = e[:, 0], e[:, 1], e[:, 2], e[:, 3]
+
+    inside = np.zeros(len(xs), dtype=bool)
+    step = max(1, PIP_CHUNK // len(e))
+    for lo in range(0, len(xs), step):
+        x = xs[lo:lo + step, None]
+        y = ys[lo:lo + step, None]
+        crosses = (y1 > y) != (y2 > y)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        inside[lo:lo + step] = np.count_nonzero(crosses & (x < x_at), axis=1) % 2 == 1
+    return inside
+
+
+class RegionIndex:
+    """Named boundary polygons with an R-tree over their bounding boxes."""
+
+    def __init__(self, features):
+        self.names, self.rings = [], []
+        boxes = []
+        for feature in features:
+            name = (feature.get("properties") or {}).get(NAME_PROPERTY)
+            if not name or not feature.get("geometry"):
+                continue
+            for rings in polygon_parts(feature["geometry"]):
+                outer = np.asarray(rings[0], dtype=np.float64)
+                boxes.append((outer[:, 0].min(), outer[:, 1].min(),
+                              outer[:, 0].max(), outer[:, 1].max()))
+                self.names.append(name)
+                self.rings.append(rings)
+        self.tree = BoxTree(boxes)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f)["features"])
+
+    def locate(self, lats, lons):
+        """Region name per point ("" outside every polygon); first feature wins overlaps."""
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        result = np.full(len(lats), "", dtype=object)
+        found = np.zeros(len(lats), dtype=bool)
+        valid = np.isfinite(lats) & np.isfinite(lons)
+        # GeoJSON positions are (longitude, latitude)
+        points, parts = self.tree.query_points(np.where(valid, lons, np.inf),
+                                               np.where(valid, lats, np.inf))
+        for part in np.unique(parts):
+            candidates = points[parts == part]
+            candidates = candidates[~found[candidates]]
+            if not len(candidates):
+                continue
+            hit = candidates[points_in_rings(lons[candidates], lats[candidates],
+                                             self.rings[part])]
+            result[hit] = self.names[part]
+            found[hit] = True
+        return result
+
+
+_indexes = {}
+
+
+def get_index(path=REGIONS_PATH):
+    """The RegionIndex for `path`, or None when there is no boundary file."""
+    if path not in _indexes:
+        _indexes[path] = RegionIndex.from_file(path) if os.path.exists(path) else None
+    return _indexes[path]
+
+
+def nearest_city_regions(lats, lons, centers, max_km=NEAREST_CITY_MAX_KM):
+    """
+    Region of the nearest of `centers` {city: (lat, lon)} listed in
+    CITY_REGIONS, per point ("" without coordinates or beyond `max_km`).
+    """
+    known = [(CITY_REGIONS[city], lat, lon) for city, (lat, lon) in centers.items()
+             if city in CITY_REGIONS]
+    result = np.full(len(lats), "", dtype=object)
+    if not known or not len(lats):
+        return result
+    names = np.array([name for name, _, _ in known], dtype=object)
+    center_lats = np.array([lat for _, lat, _ in known])
+    center_lons = np.array([lon for _, _, lon in known])
+    lats = np.asarray(lats, dtype=float)
+    lons = np.asarray(lons, dtype=float)
+    valid = np.flatnonzero(np.isfinite(lats) & np.isfinite(lons))
+    distances = geocoder.haversine_km(lats[valid, None], lons[valid, None],
+                                      center_lats, center_lons)
+    nearest = distances.argmin(axis=1)
+    close = distances[np.arange(len(valid)), nearest] <= max_km
+    result[valid[close]] = names[nearest[close]]
+    return result
+
+
+def assign(lats, lons, cities, path=REGIONS_PATH, centers=None):
+    """
+    Region per station: boundary polygons first, CITY_REGIONS by city
+    otherwise, then the nearest of `centers` {city: (lat, lon)} if given.
+    """
+    index = get_index(path)
+    located = index.locate(lats, lons) if index else [""] * len(cities)
+    result = [region or CITY_REGIONS.get(city, "") for region, city in zip(located, cities)]
+    missing = [i for i, region in enumerate(result) if not region]
+    if centers and missing:
+        lats = np.asarray(lats, dtype=float)[missing]
+        lons = np.asarray(lons, dtype=float)[missing]
+        for i, region in zip(missing, nearest_city_regions(lats, lons, centers)):
+            result[i] = region
+    return result
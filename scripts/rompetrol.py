@@ -1,10 +1,8 @@
-import requests
 import re
 import json
 import csv
-import urllib3
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import hedge
 
 SERVICE_MAP = {
     "1": "Fill&Go",
@@ -24,6 +22,8 @@ SERVICE_MAP = {
     "35": "Quick Top-up Machine",
     "36": "ATM",
 }
+# SERVICE_MAP codes that are fuels
+FUEL_CODES = ("27", "28", "29", "30", "31")
 
 LIVE_URL = "https://www.rompetrol.ge/routeplanner/stations"
 WAYBACK_URL = "https://web.archive.org/web/2024/https://www.rompetrol.ge/routeplanner/stations"
@@ -32,26 +32,42 @@ HEADERS = {
     "Accept": "application/json",
     "X-Requested-With": "XMLHttpRequest",
 }
+LIVE_TIMEOUT = 10
+TIMEOUT = 30
 
 
-def fetch_stations():
-    # Try live site first
+def is_valid_payload(body):
     try:
-        r = requests.get(LIVE_URL, params={"language_id": 2}, headers=HEADERS, verify=False, timeout=10)
-        r.raise_for_status()
-        data = r.json()
-        if isinstance(data, list) and len(data) > 0:
-            print(f"Fetched from live site.")
-            return data
-    except Exception as e:
-        print(f"Live site unavailable ({e}), trying Wayback Machine...")
-
-    # Fallback to Wayback Machine
-    r = requests.get(WAYBACK_URL, params={"language_id": 2}, headers=HEADERS, verify=False, timeout=30)
-    r.raise_for_status()
-    data = r.json()
-    print("Fetched from Wayback Machine cache.")
-    return data
+        data = json.loads(body)
+    except ValueError:
+        return False
+    return isinstance(data, list) and len(data) > 0
+
+
+def fetch_payload(timeout=TIMEOUT):
+    """Download the raw stations JSON. Returns (bytes, changed)."""
+    # Live site first, with the Wayback Machine raced in as a hedge
+    params = {"language_id": 2}
+    body, changed, origin = hedge.fetch_hedged(
+        "rompetrol",
+        live=(LIVE_URL, min(timeout, LIVE_TIMEOUT),
+              {"params": params, "headers": HEADERS, "validate": is_valid_payload}),
+        fallback=(WAYBACK_URL, timeout, {"params": params, "headers": HEADERS}),
+    )
+    if origin == "live":
+        print("Fetched from live site.")
+    else:
+        print("Fetched from Wayback Machine cache.")
+    return body, changed
+
+
+def decode_payload(body):
+    return json.loads(body)
+
+
+def fetch_stations(timeout=TIMEOUT):
+    body, _ = fetch_payload(timeout)
+    return decode_payload(body)
 
 
 def parse_program_phone(infowindow):
@@ -76,12 +92,12 @@ def parse_stations(stations):
         fuel_types = ", ".join(
             SERVICE_MAP.get(svc, svc)
             for svc in s.get("services", [])
-            if svc in ("27", "28", "29", "30", "31")
+            if svc in FUEL_CODES
         )
         other_services = ", ".join(
             SERVICE_MAP.get(svc, svc)
             for svc in s.get("services", [])
-            if svc not in ("27", "28", "29", "30", "31")
+            if svc not in FUEL_CODES
         )
         program, phone = parse_program_phone(s.get("infowindow", ""))
         rows.append({
@@ -0,0 +1,201 @@
+"""
+Machine-readable run reports: a JSON document and a Prometheus textfile.
+
+refresh.py, combine_data.py and pipeline.py each fill a RunReport with
+stage timings, per-source row and byte counters, HTTP totals and the
+station statistics, then write it to data/reports/:
+
+    <job>.json   the whole report
+    <job>.prom   the same numbers in the Prometheus text format; point
+                 node_exporter's textfile collector at data/reports/
+                 (--collector.textfile.directory) to scrape them
+
+Both files are written under a temporary name and renamed into place, so
+a collector never reads half a report.
+
+Exported gauges, all labelled with job:
+
+    gas_stations_run_timestamp_seconds    when the run finished
+    gas_stations_run_duration_seconds     wall time of the run
+    gas_stations_run_success              0 if any source failed
+    gas_stations_stage_duration_seconds   {stage}
+    gas_stations_source_up                {source} 0 if it failed
+    gas_stations_source_rows              {source, kind}: raw, kept, excluded
+    gas_stations_source_bytes             {source} payload or raw CSV size
+    gas_stations_source_duration_seconds  {source}
+    gas_stations_http_requests            {host}
+    gas_stations_http_retries             {host}
+    gas_stations_http_bytes               {host}
+    gas_stations_stations                 stations in the output
+    gas_stations_brand_stations           {brand}
+    gas_stations_field_filled             {field} stations with a value
+    gas_stations_vocabulary_added         labels new to data/vocabulary.json
+
+Alert on throughput from the ratio of rows or bytes to seconds, and on
+data drops from source_rows / brand_stations against their usual level.
+"""
+
+import json
+import os
+import time
+
+REPORT_DIR = os.path.join("data", "reports")
+PREFIX = "gas_stations"
+
+HELP = {
+    "run_timestamp_seconds": "Unix time the run finished.",
+    "run_duration_seconds": "Wall time of the run.",
+    "run_success": "1 if every source succeeded, else 0.",
+    "stage_duration_seconds": "Time spent in each pipeline stage.",
+    "source_up": "1 if the source was fetched or loaded, else 0.",
+    "source_rows": "Rows per source: raw (scraped or loaded), kept and excluded.",
+    "source_bytes": "Raw payload or CSV bytes per source.",
+    "source_duration_seconds": "Time spent fetching and parsing each source.",
+    "http_requests": "HTTP requests per host.",
+    "http_retries": "HTTP retries per host.",
+    "http_bytes": "HTTP response bytes per host.",
+    "stations": "Stations in the combined output.",
+    "brand_stations": "Stations in the combined output per brand.",
+    "field_filled": "Stations with a non-empty value per field.",
+    "vocabulary_added": "Fuel/service labels added to the vocabulary by this run.",
+}
+
+ROW_KINDS = ("raw", "kept", "excluded")
+
+
+class StageTimer:
+    """Collects (stage, seconds) in the order stages ran."""
+
+    def __init__(self):
+        self.stages = []
+
+    def run(self, name, fn, *args, **kwargs):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.stages.append((name, time.perf_counter() - start))
+        return result
+
+    def report(self):
+        total = sum(seconds for _, seconds in self.stages)
+        print("\nStage timings:")
+        for name, seconds in self.stages:
+            print(f"  {name:<10} {seconds:8.2f}s")
+        print(f"  {'total':<10} {total:8.2f}s")
+
+
+class RunReport(StageTimer):
+    """Stage timings plus per-source counters and statistics for one run of `job`."""
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+        self.started = time.time()
+        self.finished = None
+        self.sources = {}
+        self.http = {}
+        # combine_data.summarize() of the output stations
+        self.stats = None
+        # Labels combine_data.save_final() added to data/vocabulary.json
+        self.vocabulary_added = []
+
+    def source(self, name, **counters):
+        """
+        Record counters for one source: up, error, raw_rows, kept_rows,
+        excluded_rows, bytes, seconds, changed. Later calls add to earlier ones.
+        """
+        self.sources.setdefault(name, {"up": True}).update(counters)
+
+    def add_combine(self, entries):
+        """Record combine_data's (source, loaded, kept, excluded) report entries."""
+        for source, loaded, kept, excluded in entries:
+            self.source(source.name, raw_rows=loaded, excluded_rows=len(excluded),
+                        kept_rows=kept if isinstance(kept, int) else len(kept))
+
+    def add_http(self, records):
+        """Fold http_client.metrics() records into per-host totals."""
+        for m in records:
+            host = self.http.setdefault(m["host"], {"requests": 0, "retries": 0, "bytes": 0})
+            host["requests"] += 1
+            host["retries"] += m["attempts"] - 1
+            host["bytes"] += m["bytes"] or 0
+
+    @property
+    def ok(self):
+        return all(s["up"] for s in self.sources.values())
+
+    def to_dict(self):
+        finished = self.finished or time.time()
+        return {
+            "job": self.job,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "duration_seconds": round(finished - self.started, 4),
+            "success": self.ok,
+            "stages": [{"name": n, "seconds": round(s, 4)} for n, s in self.stages],
+            "sources": self.sources,
+            "http": self.http,
+            "stats": self.stats,
+            "vocabulary_added": self.vocabulary_added,
+        }
+
+    def samples(self):
+        """(metric, labels, value) for every exported gauge."""
+        finished = self.finished or time.time()
+        yield "run_timestamp_seconds", {}, round(finished, 3)
+        yield "run_duration_seconds", {}, round(finished - self.started, 4)
+        yield "run_success", {}, int(self.ok)
+        for name, seconds in self.stages:
+            yield "stage_duration_seconds", {"stage": name}, round(seconds, 4)
+        for name, s in self.sources.items():
+            yield "source_up", {"source": name}, int(s["up"])
+            for kind in ROW_KINDS:
+                if f"{kind}_rows" in s:
+                    yield "source_rows", {"source": name, "kind": kind}, s[f"{kind}_rows"]
+            if "bytes" in s:
+                yield "source_bytes", {"source": name}, s["bytes"]
+            if "seconds" in s:
+                yield "source_duration_seconds", {"source": name}, round(s["seconds"], 4)
+        for host, h in sorted(self.http.items()):
+            for key in ("requests", "retries", "bytes"):
+                yield f"http_{key}", {"host": host}, h[key]
+        if self.stats:
+            yield "stations", {}, self.stats["total"]
+            for brand, count in sorted(self.stats["brands"].items()):
+                yield "brand_stations", {"brand": brand}, count
+            for field, count in self.stats["filled"].items():
+                yield "field_filled", {"field": field}, count
+        yield "vocabulary_added", {}, len(self.vocabulary_added)
+
+    def to_prometheus(self):
+        by_metric = {}
+        for metric, labels, value in self.samples():
+            by_metric.setdefault(metric, []).append((labels, value))
+        lines = []
+        for metric, values in by_metric.items():
+            name = f"{PREFIX}_{metric}"
+            lines.append(f"# HELP {name} {HELP[metric]}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values:
+                lines.append(f"{name}{{{format_labels(dict(job=self.job, **labels))}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory=REPORT_DIR):
+        """Write <job>.json and <job>.prom to `directory`; return the JSON path."""
+        self.finished = time.time()
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{self.job}.json")
+        _write_atomic(json_path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2))
+        _write_atomic(os.path.join(directory, f"{self.job}.prom"), self.to_prometheus())
+        return json_path
+
+
+def format_labels(labels):
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in labels.items())
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
@@ -1,8 +1,8 @@
-import requests
 import csv
-import urllib3
+import json
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import http_client
+import payload_cache
 
 API_URL = "https://sgp.ge/sgp-backend/api/integration/info/branches-new"
 HEADERS = {
@@ -12,15 +12,26 @@ HEADERS = {
     "Content-Type": "application/json",
 }
 PAYLOAD = {"ServiceTypeId": [], "FuelType": [], "BrandId": [], "RegionId": []}
+TIMEOUT = 30
 
 
-def fetch_stations():
-    r = requests.post(API_URL, json=PAYLOAD, headers=HEADERS, verify=False, timeout=30)
-    r.raise_for_status()
-    data = r.json()
+def fetch_payload(timeout=TIMEOUT):
+    """Download the raw branches JSON. Returns (bytes, changed)."""
+    # The branch search is a POST but changes nothing, so it is safe to retry
+    return payload_cache.fetch("sgp", API_URL, timeout, method="POST", json=PAYLOAD, headers=HEADERS,
+                               retries=http_client.MAX_RETRIES)
+
+
+def decode_payload(body):
+    data = json.loads(body)
     return data["GetBranches"]["Results"]
 
 
+def fetch_stations(timeout=TIMEOUT):
+    body, _ = fetch_payload(timeout)
+    return decode_payload(body)
+
+
 def parse_stations(stations):
     rows = []
     for s in stations:
@@ -0,0 +1,291 @@
+"""
+Append-only history of final.csv, stored as deltas.
+
+Each combine run is compared with the previous one and only what changed
+is written, as one gzipped JSON-lines file per run, partitioned by month:
+
+    data/history/
+      manifest.jsonl                  one line per stored run
+      2026/10/20261017T093000Z.jsonl.gz
+      checkpoints/20261017T093000Z.jsonl.gz
+      head.json                       latest full state (overwritten)
+      stations.json                   station_id -> runs that touched it
+
+Delta records are {"op": "put", "id", "row"} for new stations,
+{"op": "patch", "id", "fields"} with only the changed fields, and
+{"op": "del", "id"}. A run that changes nothing stores nothing, so disk
+use follows the amount of change rather than the number of runs.
+
+The manifest is the record of what is stored: a run's delta and checkpoint
+are written before its manifest line, which commits it, and head.json and
+stations.json are caches written after. If a run stopped between those
+steps, the caches lag the manifest and are rebuilt from it on next use.
+
+A full checkpoint is written on the first run and whenever the operations
+since the last checkpoint outnumber the stations in it; reconstructing
+"as of" any time then means loading one checkpoint and replaying at most
+about one snapshot's worth of deltas.
+
+Usage:
+    python scripts/snapshots.py list
+    python scripts/snapshots.py as-of 2026-10-01 [--out stations.csv]
+    python scripts/snapshots.py history SGP_104
+"""
+
+import argparse
+import calendar
+import csv
+import gzip
+import json
+import os
+import sys
+import time
+
+HISTORY_DIR = os.path.join("data", "history")
+MANIFEST_NAME = "manifest.jsonl"
+HEAD_NAME = "head.json"
+STATIONS_NAME = "stations.json"
+TIME_FORMAT = "%Y%m%dT%H%M%SZ"
+
+
+def _path(name, history_dir):
+    return os.path.join(history_dir, name)
+
+
+def _write_gz(path, records):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def _read_gz(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _load_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _save_json(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def manifest(history_dir=HISTORY_DIR):
+    """Stored runs, oldest first (a torn last line from an interrupted run is skipped)."""
+    try:
+        with open(_path(MANIFEST_NAME, history_dir), encoding="utf-8") as f:
+            lines = f.read().split("\n")
+    except FileNotFoundError:
+        return []
+    return [json.loads(line) for line in lines[:-1] if line.strip()]
+
+
+def _append_manifest(entry, history_dir):
+    """Append `entry` to the manifest, dropping a torn last line first."""
+    path = _path(MANIFEST_NAME, history_dir)
+    os.makedirs(history_dir, exist_ok=True)
+    with open(path, "ab+") as f:
+        f.seek(0)
+        keep = f.read().rfind(b"\n") + 1
+        f.truncate(keep)
+        f.write((json.dumps(entry) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def delta_ops(old, new):
+    """Operations turning `old` into `new` (both {station_id: row})."""
+    ops = []
+    for sid, row in new.items():
+        prev = old.get(sid)
+        if prev is None:
+            ops.append({"op": "put", "id": sid, "row": row})
+        elif prev != row:
+            fields = {k: v for k, v in row.items() if prev.get(k) != v}
+            fields.update({k: None for k in prev if k not in row})
+            ops.append({"op": "patch", "id": sid, "fields": fields})
+    ops.extend({"op": "del", "id": sid} for sid in old if sid not in new)
+    return ops
+
+
+def apply_ops(state, ops):
+    for op in ops:
+        if op["op"] == "put":
+            state[op["id"]] = op["row"]
+        elif op["op"] == "patch":
+            row = dict(state[op["id"]])
+            for k, v in op["fields"].items():
+                if v is None:
+                    row.pop(k, None)
+                else:
+                    row[k] = v
+            state[op["id"]] = row
+        else:
+            state.pop(op["id"], None)
+    return state
+
+
+def _run_ops(run, history_dir):
+    """Operations of one stored run (a first run stores only its checkpoint)."""
+    if run["delta"] is None:
+        return [{"op": "put", "id": r["station_id"], "row": r}
+                for r in _read_gz(_path(run["checkpoint"], history_dir))]
+    return list(_read_gz(_path(run["delta"], history_dir)))
+
+
+def _load_index(runs, history_dir):
+    """
+    (head, touched) for the stored `runs`: head.json and stations.json, or,
+    when head.json is not at the last run, both rebuilt from the manifest.
+    """
+    head = _load_json(_path(HEAD_NAME, history_dir), None)
+    if not runs:
+        return None, {}
+    if head is not None and head["ts"] == runs[-1]["ts"]:
+        return head, _load_json(_path(STATIONS_NAME, history_dir), {})
+    print(f"History: head.json is behind {MANIFEST_NAME}, rebuilding it")
+    touched = {}
+    for run in runs:
+        for op in _run_ops(run, history_dir):
+            touched.setdefault(op["id"], []).append(run["ts"])
+    head = {"ts": runs[-1]["ts"], "stations": as_of(runs[-1]["ts"], history_dir)}
+    _save_json(_path(STATIONS_NAME, history_dir), touched)
+    _save_json(_path(HEAD_NAME, history_dir), head)
+    return head, touched
+
+
+def record(rows, at=None, history_dir=HISTORY_DIR):
+    """
+    Store one run of `rows` (dicts with a station_id). Returns the manifest
+    entry, or None when nothing changed since the last stored run.
+    """
+    runs = manifest(history_dir)
+    ts = time.strftime(TIME_FORMAT, time.gmtime(at))
+    if runs and ts <= runs[-1]["ts"]:
+        if at is not None:
+            raise ValueError(f"run at {ts} is not after the last stored run {runs[-1]['ts']}")
+        # Two runs within one second: keep run times unique and increasing
+        last = calendar.timegm(time.strptime(runs[-1]["ts"], TIME_FORMAT))
+        ts = time.strftime(TIME_FORMAT, time.gmtime(last + 1))
+    new = {r["station_id"]: dict(r) for r in rows}
+    head, touched = _load_index(runs, history_dir)
+
+    entry = {"ts": ts, "stations": len(new), "delta": None, "checkpoint": None,
+             "ops": 0, "since_checkpoint": 0}
+    if head is None:
+        ops = [{"op": "put", "id": sid, "row": row} for sid, row in new.items()]
+    else:
+        ops = delta_ops(head["stations"], new)
+        if not ops:
+            return None
+        entry["delta"] = f"{ts[:4]}/{ts[4:6]}/{ts}.jsonl.gz"
+        entry["ops"] = len(ops)
+        entry["since_checkpoint"] = runs[-1]["since_checkpoint"] + len(ops)
+        _write_gz(_path(entry["delta"], history_dir), ops)
+
+    if head is None or entry["since_checkpoint"] > len(new):
+        entry["checkpoint"] = f"checkpoints/{ts}.jsonl.gz"
+        entry["since_checkpoint"] = 0
+        _write_gz(_path(entry["checkpoint"], history_dir), new.values())
+
+    _append_manifest(entry, history_dir)
+    for op in ops:
+        touched.setdefault(op["id"], []).append(ts)
+    _save_json(_path(STATIONS_NAME, history_dir), touched)
+    _save_json(_path(HEAD_NAME, history_dir), {"ts": ts, "stations": new})
+    return entry
+
+
+def _cutoff(when):
+    """'2026-10-01', '2026-10-01T12:00' or a stored ts -> comparable ts string."""
+    digits = "".join(ch for ch in when if ch.isdigit())
+    if len(digits) == 8:
+        return f"{digits}T235959Z"
+    digits = digits.ljust(14, "0")
+    return f"{digits[:8]}T{digits[8:14]}Z"
+
+
+def as_of(when, history_dir=HISTORY_DIR):
+    """Return {station_id: row} as it stood at `when` (None before the first run)."""
+    cutoff = _cutoff(when)
+    runs = [r for r in manifest(history_dir) if r["ts"] <= cutoff]
+    if not runs:
+        return None
+    base = max(i for i, r in enumerate(runs) if r["checkpoint"])
+    state = {r["station_id"]: r for r in _read_gz(_path(runs[base]["checkpoint"], history_dir))}
+    for run in runs[base + 1:]:
+        apply_ops(state, _read_gz(_path(run["delta"], history_dir)))
+    return state
+
+
+def history(station_id, history_dir=HISTORY_DIR):
+    """
+    Every stored change to one station, oldest first, as (ts, op, row) with
+    the full row after the change (None once deleted). Only the runs that
+    touched the station are read, plus the checkpoint the first one needs.
+    """
+    runs = manifest(history_dir)
+    touched = _load_index(runs, history_dir)[1].get(station_id, [])
+    if not touched:
+        return []
+    by_ts = {r["ts"]: r for r in runs}
+    events, row = [], None
+    for ts in touched:
+        ops = [op for op in _run_ops(by_ts[ts], history_dir) if op["id"] == station_id]
+        for op in ops:
+            row = apply_ops({station_id: row} if row else {}, [op]).get(station_id)
+            events.append((ts, op["op"], row))
+    return events
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the final.csv history.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="list stored runs")
+    as_of_parser = commands.add_parser("as-of", help="reconstruct the stations at a date")
+    as_of_parser.add_argument("when", help="date or time, e.g. 2026-10-01 or 2026-10-01T12:00")
+    as_of_parser.add_argument("--out", help="write the stations to this CSV")
+    history_parser = commands.add_parser("history", help="show one station's changes")
+    history_parser.add_argument("station_id")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for run in manifest():
+            kind = "checkpoint" if run["delta"] is None else f"{run['ops']} ops"
+            print(f"  {run['ts']}  {run['stations']:>5} stations  {kind}")
+    elif args.command == "as-of":
+        state = as_of(args.when)
+        if state is None:
+            print(f"No history before {args.when}")
+            return 1
+        print(f"{len(state)} stations as of {args.when}")
+        if args.out:
+            rows = list(state.values())
+            with open(args.out, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["station_id"])
+                writer.writeheader()
+                writer.writerows(rows)
+            print(f"  -> {args.out}")
+    else:
+        events = history(args.station_id)
+        if not events:
+            print(f"No history for {args.station_id}")
+            return 1
+        for ts, op, row in events:
+            detail = "" if row is None else f"{row.get('name', '')} ({row.get('latitude')}, {row.get('longitude')})"
+            print(f"  {ts}  {op:<5}  {detail}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Source registry: one plugin object per brand data source.
+
+A Source ties together everything the pipeline knows about one brand:
+  - fetch      download the raw payload (the scraper module's fetch_payload)
+  - parse      payload -> raw rows (decode_payload + parse_stations)
+  - prepare    optional, called once with all raw rows before the per-row
+               hooks run (e.g. to batch work they would repeat per row)
+  - exclude    raw row -> exclusion reason, or None to keep it
+  - normalize  raw row -> row in the unified final.csv schema
+
+The five built-in brands register themselves in combine_data, next to the
+rules they apply. With the registry, stations can flow from scraper to
+combiner in memory (see scrape()), and data/<brand>.csv becomes an
+optional side output instead of the only hand-off between the two.
+
+Adding a brand means writing its scraper module and registering a Source:
+
+    register(Source("newbrand", "NewBrand", scraper="newbrand",
+                    exclude=exclude_newbrand, normalize=normalize_newbrand))
+"""
+
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+
+import payload_cache
+
+_registry = {}
+# Set by combine_data once it has registered the built-in brands, whether it
+# was imported or is running as the main script
+_builtins_registered = False
+
+
+class Source:
+    def __init__(self, name, brand, scraper, normalize, exclude=None,
+                 prepare=None, label_field="name", timeout=30):
+        self.name = name
+        self.brand = brand
+        self.scraper = scraper
+        self.normalize = normalize
+        self.exclude = exclude
+        self.prepare = prepare
+        # Raw-row field shown next to the id when a row is excluded
+        self.label_field = label_field
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"Source({self.name!r}, brand={self.brand!r})"
+
+    @property
+    def module(self):
+        # Imported lazily so combining CSVs does not need the HTTP stack
+        return importlib.import_module(self.scraper)
+
+    @property
+    def csv_name(self):
+        return f"{self.name}.csv"
+
+    def fetch(self, offline=False):
+        """Return (payload, changed); offline replays the cached payload."""
+        if offline:
+            return payload_cache.load(self.name), True
+        return self.module.fetch_payload(timeout=self.timeout)
+
+    def parse(self, payload):
+        """Payload -> raw rows, typed exactly as data/<name>.csv would read back."""
+        module = self.module
+        return [as_csv_row(r) for r in module.parse_stations(module.decode_payload(payload))]
+
+    def save_csv(self, rows, data_dir="data"):
+        """Write data/<name>.csv and mark the cached payload it came from as processed."""
+        self.module.save_csv(rows, os.path.join(data_dir, self.csv_name))
+        payload_cache.mark_processed(self.name)
+
+    def process(self, rows):
+        """Apply exclusion and normalization. Returns (kept, excluded)."""
+        excluded = []
+        kept = list(self.stream(rows, excluded, chunk_size=max(1, len(rows))))
+        return kept, excluded
+
+    def stream(self, rows, excluded, chunk_size=10000):
+        """
+        Lazy process(): yield normalized rows from any iterable of raw rows,
+        appending exclusions to `excluded`. Rows are taken `chunk_size` at a
+        time and prepare runs once per chunk, so memory stays bounded.
+        """
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            if self.prepare:
+                self.prepare(chunk)
+            for r in chunk:
+                reason = self.exclude(r) if self.exclude else None
+                if reason:
+                    excluded.append((r["id"], r[self.label_field], reason))
+                    continue
+                yield self.normalize(r)
+
+
+def as_csv_row(row):
+    """Coerce a scraped row to the all-string form a CSV round trip produces."""
+    return {k: "" if v is None else str(v) for k, v in row.items()}
+
+
+def register(source):
+    """Add `source` to the registry (replacing one of the same name) and return it."""
+    _registry[source.name] = source
+    return source
+
+
+def builtins_registered():
+    global _builtins_registered
+    _builtins_registered = True
+
+
+def registry():
+    """Return {name: Source} for every registered source, in registration order."""
+    # The built-in brands register on import of combine_data. When
+    # combine_data.py is the running script they are already registered by
+    # __main__, and importing it again would load a second copy.
+    if not _builtins_registered:
+        importlib.import_module("combine_data")
+    return dict(_registry)
+
+
+def get(name):
+    return registry()[name]
+
+
+def scrape(names=None, offline=False):
+    """
+    Fetch and parse sources concurrently, entirely in memory.
+
+    Returns (results, failures): results maps name -> (raw rows, changed,
+    seconds, payload bytes); failures maps name -> exception. A failing source does not
+    affect the others.
+    """
+    sources = registry()
+    names = list(names or sources)
+    results, failures = {}, {}
+
+    def run(source):
+        start = time.perf_counter()
+        payload, changed = source.fetch(offline)
+        rows = source.parse(payload)
+        return rows, changed, time.perf_counter() - start, len(payload)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+        futures = {pool.submit(run, sources[n]): n for n in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failures[name] = e
+    return results, failures
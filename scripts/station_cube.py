@@ -0,0 +1,91 @@
+"""
+Brand x city x region x feature-flag count cube, shared by every chart.
+
+The charts used to filter the full station DataFrame over and over (one
+mask per brand, per city, per region), so chart time grew with rows times
+charts. build_cube() instead makes one pass over the stations:
+
+  - each flag ("has CNG", "offers food", ...) is a category of the
+    multi-hot fuel_types / services token matrices (feature_matrix.py),
+    packed into one integer bitmask per station
+  - one groupby over (brand, city, region, bitmask) counts the stations in
+    every occupied cell and sums the measures (e.g. fuel types per station)
+  - each cell also keeps the row of its first station ("first"), so
+    orderings that follow the station list (the web's tie-breaks) survive
+    the aggregation
+
+The result has at most one row per occupied cell, a few hundred at most,
+however many stations there are. Charts read counts from it with select()
+/ count() and ordinary pandas on the small `cells` frame. The scatter map
+alone needs the stations themselves, so the cube also keeps each brand's
+coordinates (`points`).
+"""
+
+import numpy as np
+
+from feature_matrix import FeatureMatrix
+
+DIMENSIONS = ["brand", "city", "region"]
+
+
+class StationCube:
+    def __init__(self, cells, flag_bits, points):
+        # DIMENSIONS + "flags" (bitmask) + "n" (stations) + "first" (row of the
+        # first station) + one column per measure
+        self.cells = cells
+        self.flag_bits = flag_bits
+        # {brand: (longitudes, latitudes)} in station order
+        self.points = points
+
+    def select(self, flags=(), **equals):
+        """Cells whose stations have every flag in `flags` and match `equals`."""
+        keep = np.ones(len(self.cells), dtype=bool)
+        for column, value in equals.items():
+            keep &= (self.cells[column] == value).to_numpy()
+        if flags:
+            bits = sum(self.flag_bits[f] for f in flags)
+            keep &= (self.cells["flags"].to_numpy() & bits) == bits
+        return self.cells[keep]
+
+    def count(self, by, flags=(), **equals):
+        """Stations per `by` (a dimension or list of them) among the selected cells."""
+        return self.select(flags, **equals).groupby(by)["n"].sum()
+
+    def total(self, measure, by, flags=(), **equals):
+        """Sum of `measure` per `by` among the selected cells."""
+        return self.select(flags, **equals).groupby(by)[measure].sum()
+
+
+def build_cube(df, flags, measures=None, features=None):
+    """
+    Aggregate `df` into a StationCube.
+
+    `flags` maps name -> (columns, tokens), the token-to-category mapping
+    of FeatureMatrix.categories(); `measures` maps name -> column, summing
+    the number of distinct tokens in that column. `features` is the
+    FeatureMatrix of `df` if already at hand (e.g. stored bitsets), else
+    it is built from the text.
+    """
+    measures = measures or {}
+    if features is None:
+        columns = sorted({c for cols, _ in flags.values() for c in cols} | set(measures.values()))
+        features = FeatureMatrix.from_frame(df, columns)
+    flag_bits = {name: 1 << i for i, name in enumerate(flags)}
+    bits = np.array(list(flag_bits.values()), dtype=np.int64)
+    mask = features.categories(flags).astype(np.int64) @ bits
+
+    keys = df[DIMENSIONS].copy()
+    keys["flags"] = mask
+    keys["n"] = 1
+    keys["first"] = np.arange(len(df))
+    for name, column in measures.items():
+        keys[name] = features.counts(column)
+    sums = {column: "sum" for column in keys.columns if column not in DIMENSIONS + ["flags"]}
+    sums["first"] = "min"
+    cells = keys.groupby(DIMENSIONS + ["flags"], sort=True).agg(sums).reset_index()
+
+    points = {
+        brand: (group["longitude"].to_numpy(), group["latitude"].to_numpy())
+        for brand, group in df[["brand", "longitude", "latitude"]].groupby("brand", sort=False)
+    }
+    return StationCube(cells, flag_bits, points)
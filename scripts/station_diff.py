@@ -0,0 +1,156 @@
+"""
+Row fingerprints, combine state and station-level diffs.
+
+After each combine, data/cache/combine_state.json keeps a content hash of
+every source's raw CSV together with the rows that source produced, plus
+the final stations keyed by station_id. combine_data --incremental uses it
+to reprocess only the sources whose hash changed, and every run writes
+data/final.diff.json comparing the new final stations with the previous
+ones:
+
+    {
+      "generated_at": "...",
+      "sources":  {"gulf": "changed", "sgp": "unchanged", ...},
+      "added":    [<station row>, ...],
+      "removed":  [{"station_id": ..., "brand": ..., "name": ...}, ...],
+      "moved":    [{"station_id": ..., "from": [lat, lon], "to": [lat, lon],
+                    "distance_m": ...}, ...],
+      "changed":  [{"station_id": ..., "fields": {field: [old, new]}}, ...]
+    }
+
+A station can be both moved and changed. Fingerprints make the common case
+(nothing about a station changed) a single hash comparison.
+"""
+
+import hashlib
+import json
+import math
+import os
+import time
+
+from geocoder import haversine_km
+
+STATE_PATH = os.path.join("data", "cache", "combine_state.json")
+DIFF_PATH = os.path.join("data", "final.diff.json")
+STATE_VERSION = 1
+
+COORD_FIELDS = ("latitude", "longitude")
+# Coordinates closer than this (degrees, ~1 cm) count as unmoved
+COORD_TOLERANCE = 1e-7
+
+
+def file_digest(*paths):
+    """
+    sha256 over the bytes of `paths`, each keyed by its file name only, so
+    the digest does not depend on the working directory or how the script
+    was started; missing files hash as absent.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.basename(path).encode("utf-8") + b"\0")
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+        except FileNotFoundError:
+            h.update(b"<missing>")
+    return h.hexdigest()
+
+
+def fingerprint(row, fieldnames):
+    h = hashlib.sha1()
+    for name in fieldnames:
+        h.update((row.get(name) or "").encode("utf-8") + b"\x1f")
+    return h.hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return state if state.get("version") == STATE_VERSION else {}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(dict(state, version=STATE_VERSION), f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _coords(row):
+    try:
+        return float(row["latitude"]), float(row["longitude"])
+    except (KeyError, ValueError):
+        return math.nan, math.nan
+
+
+def _moved(old, new):
+    (lat0, lon0), (lat1, lon1) = _coords(old), _coords(new)
+    if any(math.isnan(v) for v in (lat0, lon0, lat1, lon1)):
+        return (old.get("latitude"), old.get("longitude")) != (new.get("latitude"), new.get("longitude"))
+    return abs(lat0 - lat1) > COORD_TOLERANCE or abs(lon0 - lon1) > COORD_TOLERANCE
+
+
+def diff_stations(old, new_rows, fieldnames, old_prints=None, sources=None):
+    """
+    Diff `old` ({station_id: row}) against `new_rows` (list of rows).
+    `old_prints` are the stored fingerprints of `old`, computed if not given.
+    Returns (diff, new fingerprints {station_id: fingerprint}).
+    """
+    if old_prints is None:
+        old_prints = {sid: fingerprint(row, fieldnames) for sid, row in old.items()}
+    new_prints = {}
+    added, moved, changed = [], [], []
+    for row in new_rows:
+        sid = row["station_id"]
+        fp = new_prints[sid] = fingerprint(row, fieldnames)
+        if sid not in old:
+            added.append({f: row.get(f, "") for f in fieldnames})
+            continue
+        if old_prints.get(sid) == fp:
+            continue
+        prev = old[sid]
+        if _moved(prev, row):
+            (lat0, lon0), (lat1, lon1) = _coords(prev), _coords(row)
+            distance = haversine_km(lat0, lon0, lat1, lon1) * 1000
+            moved.append({
+                "station_id": sid,
+                "from": [prev.get("latitude", ""), prev.get("longitude", "")],
+                "to": [row.get("latitude", ""), row.get("longitude", "")],
+                "distance_m": None if math.isnan(distance) else round(float(distance), 1),
+            })
+        fields = {
+            f: [prev.get(f, ""), row.get(f, "")]
+            for f in fieldnames
+            if f not in COORD_FIELDS and (prev.get(f) or "") != (row.get(f) or "")
+        }
+        if fields:
+            changed.append({"station_id": sid, "fields": fields})
+
+    removed = [
+        {"station_id": sid, "brand": row.get("brand", ""), "name": row.get("name", "")}
+        for sid, row in old.items() if sid not in new_prints
+    ]
+    diff = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "sources": sources or {},
+        "added": added,
+        "removed": removed,
+        "moved": moved,
+        "changed": changed,
+    }
+    return diff, new_prints
+
+
+def save_diff(diff, path=DIFF_PATH):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(diff, f, ensure_ascii=False, indent=2)
+
+
+def summary(diff):
+    return (f"{len(diff['added'])} added, {len(diff['removed'])} removed, "
+            f"{len(diff['moved'])} moved, {len(diff['changed'])} changed")
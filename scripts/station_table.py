@@ -0,0 +1,197 @@
+"""
+StationTable: the combined stations stored column by column.
+
+Instead of one 13-key dict of strings per station, a StationTable keeps
+
+  - latitude / longitude as float64 arrays, parsed once on the way in
+    (the few source texts that do not round-trip through float, such as
+    trailing zeros or blanks, are remembered so output stays byte-identical)
+  - every text column as int32 codes into a per-column list of distinct
+    values, so each brand, city, fuel or service string is stored once
+
+Rows are still available as StationRow views (`table[i]`, iteration),
+which read like the old dicts (`row["city"]`, `row.get(...)`, `dict(row)`)
+and work with csv.DictWriter, but hold only the table and a row number.
+Sorting works on the codes (ranked by value) with one np.lexsort.
+"""
+
+from array import array
+
+import numpy as np
+
+FLOAT_FIELDS = ("latitude", "longitude")
+
+
+class StationRow:
+    """Read-only dict-like view of one row of a StationTable."""
+
+    __slots__ = ("table", "index")
+
+    def __init__(self, table, index):
+        self.table = table
+        self.index = index
+
+    def __getitem__(self, field):
+        return self.table.value(self.index, field)
+
+    def get(self, field, default=None):
+        if field in self.table.field_set:
+            return self.table.value(self.index, field)
+        return default
+
+    def keys(self):
+        return self.table.field_keys
+
+    def __iter__(self):
+        return iter(self.table.fieldnames)
+
+    def __len__(self):
+        return len(self.table.fieldnames)
+
+    def __contains__(self, field):
+        return field in self.table.field_set
+
+    def items(self):
+        return [(f, self[f]) for f in self.table.fieldnames]
+
+    def __eq__(self, other):
+        return dict(self) == dict(other) if hasattr(other, "keys") else NotImplemented
+
+    def __repr__(self):
+        return f"StationRow({dict(self)!r})"
+
+
+class StationTable:
+    def __init__(self, fieldnames):
+        self.fieldnames = list(fieldnames)
+        self.field_set = frozenset(self.fieldnames)
+        # Set-like, as csv.DictWriter expects from keys()
+        self.field_keys = dict.fromkeys(self.fieldnames).keys()
+        self.text_fields = [f for f in self.fieldnames if f not in FLOAT_FIELDS]
+        self.float_fields = [f for f in self.fieldnames if f in FLOAT_FIELDS]
+        self.codes = {f: array("i") for f in self.text_fields}
+        self.values = {f: [] for f in self.text_fields}
+        self._lookup = {f: {} for f in self.text_fields}
+        self.floats = {f: array("d") for f in self.float_fields}
+        # (field, row) -> source text, where repr(float(text)) differs from it
+        self.float_text = {}
+
+    @classmethod
+    def from_rows(cls, rows, fieldnames):
+        table = cls(fieldnames)
+        for row in rows:
+            table.append(row)
+        return table
+
+    def __len__(self):
+        return len(self.codes[self.text_fields[0]]) if self.text_fields else 0
+
+    def __getitem__(self, index):
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return StationRow(self, index % len(self))
+
+    def __iter__(self):
+        return (StationRow(self, i) for i in range(len(self)))
+
+    # -- building ----------------------------------------------------------
+
+    def intern(self, field, value):
+        """Code for `value` in a text column, adding it on first sight."""
+        lookup = self._lookup[field]
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(self.values[field])
+            self.values[field].append(value)
+        return code
+
+    def append(self, row):
+        n = len(self)
+        for f in self.text_fields:
+            self.codes[f].append(self.intern(f, row.get(f) or ""))
+        for f in self.float_fields:
+            text = row.get(f) or ""
+            try:
+                value = float(text)
+            except ValueError:
+                value = float("nan")
+            self.floats[f].append(value)
+            if repr(value) != text:
+                self.float_text[(f, n)] = text
+
+    def set_value(self, index, field, value):
+        """Overwrite one text cell."""
+        self.codes[field][index] = self.intern(field, value)
+
+    def set_column(self, field, values):
+        """Overwrite a whole text column."""
+        self.codes[field] = array("i", (self.intern(field, v) for v in values))
+
+    # -- reading -----------------------------------------------------------
+
+    def value(self, index, field):
+        if field in self.floats:
+            text = self.float_text.get((field, index))
+            return text if text is not None else repr(self.floats[field][index])
+        return self.values[field][self.codes[field][index]]
+
+    def float_column(self, field):
+        """
+        float64 array of a coordinate column (NaN where blank). A copy: a
+        view would pin the array's buffer, and the next append would fail.
+        """
+        return np.frombuffer(self.floats[field], dtype=np.float64).copy()
+
+    def code_column(self, field):
+        """int32 codes of a text column, indexing values[field]; a copy, as above."""
+        return np.frombuffer(self.codes[field], dtype=np.int32).copy()
+
+    def column(self, field):
+        """A column as a list of strings."""
+        if field in self.floats:
+            return [self.value(i, field) for i in range(len(self))]
+        values = self.values[field]
+        return [values[c] for c in self.codes[field]]
+
+    def to_columns(self):
+        """{field: values}: float64 arrays for coordinates, string lists otherwise."""
+        return {f: self.float_column(f) if f in self.floats else self.column(f)
+                for f in self.fieldnames}
+
+    @property
+    def latitudes(self):
+        return self.float_column("latitude")
+
+    @property
+    def longitudes(self):
+        return self.float_column("longitude")
+
+    # -- reordering --------------------------------------------------------
+
+    def take(self, indices):
+        """New table with the rows at `indices`, in that order."""
+        indices = np.asarray(indices, dtype=np.int64)
+        table = StationTable(self.fieldnames)
+        for f in self.text_fields:
+            table.values[f] = list(self.values[f])
+            table._lookup[f] = dict(self._lookup[f])
+            table.codes[f] = array("i", self.code_column(f)[indices].tobytes())
+        for f in self.float_fields:
+            table.floats[f] = array("d", self.float_column(f)[indices].tobytes())
+        if self.float_text:
+            position = {old: new for new, old in enumerate(indices.tolist())}
+            table.float_text = {
+                (f, position[i]): text for (f, i), text in self.float_text.items()
+                if i in position
+            }
+        return table
+
+    def sorted_by(self, fields):
+        """New table sorted by text `fields` (like sorting rows by that key tuple; stable)."""
+        keys = []
+        for f in reversed(fields):
+            values = self.values[f]
+            rank = np.empty(len(values), dtype=np.int64)
+            rank[sorted(range(len(values)), key=values.__getitem__)] = np.arange(len(values))
+            keys.append(rank[self.code_column(f)])
+        return self.take(np.lexsort(keys) if keys else np.arange(len(self)))
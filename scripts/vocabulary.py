@@ -0,0 +1,202 @@
+"""
+Canonical fuel / service vocabulary with stable integer token IDs.
+
+fuel_types and services are comma-joined labels ("CNG, Euro Regular, LPG"),
+and testing them with substrings is wrong in places: "Charger" also finds
+"Fast Charger", "CNG" finds "CNG Station". The vocabulary gives every label
+an integer ID, so a station's fuels and services become a set of IDs and
+filtering is an exact lookup.
+
+data/vocabulary.json lists the tokens in ID order:
+
+    {"id": 0, "name": "Euro Diesel", "kind": "fuel", "source": "gulf.FUEL_TYPE_MAP"}
+
+It starts from the scrapers' code maps (gulf FUEL_TYPE_MAP, POI_TYPE_MAP,
+FOOD_TYPE_MAP and rompetrol SERVICE_MAP); SGP and Wissol send English
+labels rather than codes, so their tokens are added as "observed". IDs are
+append-only: a token keeps its ID for good, and combine_data adds labels it
+has not seen before at the end (see update()).
+
+combine_data stores each station's tokens in data/final.columns/ as packed
+bitsets, one per column (see columnar.py); bit i of a station's row is set
+if it lists token i.
+
+Usage:
+    python scripts/vocabulary.py          # list the tokens
+    python scripts/vocabulary.py build    # add map and final.csv labels
+"""
+
+import argparse
+import csv
+import json
+import os
+
+import numpy as np
+
+VOCABULARY_PATH = os.path.join("data", "vocabulary.json")
+SEPARATOR = ", "
+
+# Token columns and the kind of token a new label in each one gets
+TOKEN_FIELDS = {"fuel_types": "fuel", "services": "service"}
+
+
+def split_entries(value):
+    return value.split(SEPARATOR) if value else []
+
+
+class Vocabulary:
+    def __init__(self, tokens=()):
+        # [{"id", "name", "kind", "source"}] in ID order
+        self.tokens = []
+        self.index = {}
+        for token in tokens:
+            self.add(token["name"], token["kind"], token["source"])
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def names(self):
+        return [t["name"] for t in self.tokens]
+
+    def add(self, name, kind, source):
+        """ID of `name`, appending it if new."""
+        if name not in self.index:
+            self.index[name] = len(self.tokens)
+            self.tokens.append({"id": len(self.tokens), "name": name,
+                                "kind": kind, "source": source})
+        return self.index[name]
+
+    def observe(self, field, values, source="observed"):
+        """
+        Add the labels of `values` (texts of `field`) not seen yet, in
+        sorted order so new IDs do not depend on station order; return them.
+        """
+        added = sorted({name for value in values for name in split_entries(value)
+                        if name not in self.index})
+        for name in added:
+            self.add(name, TOKEN_FIELDS[field], source)
+        return added
+
+    def ids(self, value):
+        """Sorted token IDs of one field value."""
+        return sorted({self.index[name] for name in split_entries(value)})
+
+    def matrix(self, values, codes):
+        """
+        Bool (stations, tokens) for stations given as `codes` into the
+        distinct `values` (-1 for a missing value). Each value is split once.
+        """
+        table = np.zeros((len(values) + 1, len(self)), dtype=bool)
+        for row, value in enumerate(values):
+            table[row, self.ids(value)] = True
+        return table[np.asarray(codes)]
+
+    def save(self, path=VOCABULARY_PATH):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write("[\n")
+            f.write(",\n".join(f"  {json.dumps(t, ensure_ascii=False)}" for t in self.tokens))
+            f.write("\n]\n")
+        os.replace(tmp, path)
+
+
+def load(path=VOCABULARY_PATH):
+    """The vocabulary at `path` (empty if there is none yet)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            tokens = json.load(f)
+    except FileNotFoundError:
+        return Vocabulary()
+    for i, token in enumerate(tokens):
+        if token["id"] != i:
+            raise ValueError(f"{path}: token {token['name']!r} has id {token['id']}, expected {i}")
+    return Vocabulary(tokens)
+
+
+def pack(matrix):
+    """Bool (stations, tokens) -> uint8 (stations, bytes), token i in bit i % 8 of byte i // 8."""
+    return np.packbits(matrix, axis=1, bitorder="little")
+
+
+def unpack(bits, n_tokens):
+    return np.unpackbits(bits, axis=1, count=n_tokens, bitorder="little").astype(bool)
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+def map_tokens():
+    """(name, kind, source) for every label in the scrapers' code maps."""
+    # Imported here: the scrapers pull in the HTTP stack, which combine
+    # does not need
+    import gulf
+    import rompetrol
+
+    tokens = [(name, "fuel", "gulf.FUEL_TYPE_MAP") for name in gulf.FUEL_TYPE_MAP.values()]
+    tokens += [(rompetrol.SERVICE_MAP[code], "fuel", "rompetrol.SERVICE_MAP")
+               for code in rompetrol.FUEL_CODES]
+    tokens += [(name, "service", "gulf.POI_TYPE_MAP") for name in gulf.POI_TYPE_MAP.values()]
+    tokens += [(name, "service", "gulf.FOOD_TYPE_MAP") for name in gulf.FOOD_TYPE_MAP.values()]
+    tokens += [(name, "service", "rompetrol.SERVICE_MAP")
+               for code, name in rompetrol.SERVICE_MAP.items()
+               if code not in rompetrol.FUEL_CODES]
+    return tokens
+
+
+def distinct_values(stations, field):
+    """Distinct texts of `field` in `stations` (dict rows or a StationTable)."""
+    if hasattr(stations, "code_column"):
+        return stations.values[field]
+    return {s.get(field) or "" for s in stations}
+
+
+def update(stations, path=VOCABULARY_PATH):
+    """
+    Load the vocabulary, add the labels in `stations` it does not have yet
+    and save it if anything was added. Returns (vocabulary, added labels).
+    """
+    vocab = load(path)
+    added = []
+    for field in TOKEN_FIELDS:
+        added += vocab.observe(field, distinct_values(stations, field))
+    if added:
+        vocab.save(path)
+        print(f"Vocabulary: added {len(added)} token(s): {', '.join(added)}")
+    return vocab, added
+
+
+def build(final_path, path=VOCABULARY_PATH):
+    """Add the scrapers' map labels, then the labels in `final_path`."""
+    vocab = load(path)
+    before = len(vocab)
+    for name, kind, source in map_tokens():
+        vocab.add(name, kind, source)
+    with open(final_path, newline="", encoding="utf-8") as f:
+        stations = list(csv.DictReader(f))
+    for field in TOKEN_FIELDS:
+        vocab.observe(field, distinct_values(stations, field))
+    vocab.save(path)
+    print(f"Wrote {path}: {len(vocab)} tokens ({len(vocab) - before} new)")
+    return vocab
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show or build the fuel/service vocabulary.")
+    parser.add_argument("command", nargs="?", choices=("show", "build"), default="show")
+    parser.add_argument("--final", default=os.path.join("data", "final.csv"),
+                        help="combined CSV whose labels build adds (default: data/final.csv)")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        build(args.final)
+        return
+    for t in load().tokens:
+        print(f"  {t['id']:>3}  {t['kind']:<8} {t['name']:<28} {t['source']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,146 @@
-import requests
-import re
-import json
+import codecs
 import csv
-import urllib3
+import json
+import re
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+import payload_cache
 
 URL = "https://wissol.ge/en/map"
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
 }
+TIMEOUT = 30
+
+
+def fetch_payload(timeout=TIMEOUT):
+    """Download the raw map page. Returns (bytes, changed)."""
+    return payload_cache.fetch("wissol", URL, timeout, headers=HEADERS)
+
+
+# ---------------------------------------------------------------------------
+# Streaming decode of the embedded `allLocations` literal
+# ---------------------------------------------------------------------------
+# The page embeds the stations as `const allLocations = JSON.parse('...')`,
+# a JS string literal holding a JSON array of GeoJSON features. Rather than
+# materialising the page, the literal, its unescaped copy and the parsed
+# list, the byte stream is scanned for the literal, unescaped piece by piece
+# and fed to a JSON decoder that yields one feature at a time.
+
+CHUNK_SIZE = 64 * 1024
+LITERAL_START = b"const allLocations = JSON.parse('"
+# Literal content up to the unescaped closing quote (or the end of the buffer)
+LITERAL_BODY = re.compile(rb"(?:[^\\']+|\\(?s:.))*")
+# Longest escape sequence unicode_escape understands without \N{...}
+MAX_ESCAPE_LEN = 10
+WHITESPACE = re.compile(r"[\s,]*")
+
+_decoder = json.JSONDecoder()
+
+
+def iter_bytes(source, chunk_size=CHUNK_SIZE):
+    """Yield byte chunks from bytes, a binary file or an iterable of chunks."""
+    if isinstance(source, (bytes, bytearray)):
+        view = memoryview(source)
+        for i in range(0, len(view), chunk_size):
+            yield view[i:i + chunk_size]
+    elif hasattr(source, "read"):
+        yield from iter(lambda: source.read(chunk_size), b"")
+    else:
+        yield from source
 
 
-def fetch_stations():
-    r = requests.get(URL, headers=HEADERS, verify=False, timeout=30)
-    r.raise_for_status()
-    html = r.text
+def iter_literal_text(chunks):
+    """
+    Yield the unescaped text of the allLocations literal in pieces.
 
-    match = re.search(r"const allLocations = JSON\.parse\('(.+?)'\)", html)
-    if not match:
+    Pieces are cut so that no escape sequence is split between two calls
+    to the unicode_escape codec.
+    """
+    buf = b""
+    found = False
+    for chunk in chunks:
+        buf += chunk
+        if not found:
+            at = buf.find(LITERAL_START)
+            if at < 0:
+                # Keep just enough to catch a marker split across chunks
+                buf = buf[-(len(LITERAL_START) - 1):]
+                continue
+            found = True
+            buf = buf[at + len(LITERAL_START):]
+
+        end = LITERAL_BODY.match(buf).end()
+        if end < len(buf) and buf[end] == ord("'"):
+            yield codecs.unicode_escape_decode(buf[:end])[0]
+            return
+
+        # Stop before the last backslash run near the end: the escape it
+        # starts may still be missing bytes.
+        cut = end
+        tail = buf.rfind(b"\\", max(0, end - MAX_ESCAPE_LEN))
+        if tail >= 0:
+            cut = len(buf[:tail].rstrip(b"\\"))
+        if cut:
+            yield codecs.unicode_escape_decode(buf[:cut])[0]
+            buf = buf[cut:]
+
+    if not found:
         raise ValueError("Could not find 'allLocations' data in the page source.")
+    raise ValueError("Unterminated 'allLocations' literal in the page source.")
+
+
+def iter_features(source, chunk_size=CHUNK_SIZE):
+    """Yield the GeoJSON features of the page one by one."""
+    pieces = iter_literal_text(iter_bytes(source, chunk_size))
+    buf = ""
+    pos = 0
+    started = False
+    done = False
+    while not done:
+        piece = next(pieces, None)
+        if piece is None:
+            done = True
+        else:
+            buf = buf[pos:] + piece
+            pos = 0
+
+        if not started:
+            pos = WHITESPACE.match(buf, pos).end()
+            if pos == len(buf):
+                continue
+            if buf[pos] != "[":
+                raise ValueError("'allLocations' is not a JSON array.")
+            pos += 1
+            started = True
+
+        while True:
+            pos = WHITESPACE.match(buf, pos).end()
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                feature, end = _decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if done:
+                    raise
+                break
+            # A value touching the end of the buffer may be cut short
+            # (e.g. a number); wait until its terminator has arrived.
+            if end == len(buf) and not done:
+                break
+            pos = end
+            yield feature
+
+    raise ValueError("Truncated 'allLocations' array in the page source.")
+
+
+def decode_payload(body):
+    """Lazily decode the features of a raw page; feed straight to parse_stations."""
+    return iter_features(body)
+
 
-    raw = match.group(1)
-    raw = raw.encode().decode("unicode_escape")
-    raw = raw.replace("/", "/")
-    stations = json.loads(raw)
-    return stations
+def fetch_stations(timeout=TIMEOUT):
+    body, _ = fetch_payload(timeout)
+    return list(decode_payload(body))
 
 
 def parse_stations(stations):
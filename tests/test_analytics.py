@@ -0,0 +1,42 @@
+import pandas as pd
+
+import analytics
+from station_cube import build_cube
+
+
+def web_city_stats(rows):
+    """computeCityStats (web/src/lib/stats.ts) over station rows."""
+    city_map = {}
+    for row in rows:
+        city = row["city"] or "Unknown"
+        stats = city_map.setdefault(city, {"city": city, "total": 0,
+                                           "byBrand": dict.fromkeys(analytics.WEB_RECORD_ORDER, 0)})
+        stats["total"] += 1
+        stats["byBrand"][row["brand"]] += 1
+    # Array.prototype.sort is stable: ties keep first-appearance order
+    return sorted((c for c in city_map.values() if c["city"] != "Unknown"),
+                  key=lambda c: -c["total"])
+
+
+def station(brand, city):
+    return {"brand": brand, "city": city, "region": "", "latitude": 41.7, "longitude": 44.8,
+            "fuel_types": "Euro Diesel", "services": ""}
+
+
+def test_city_ties_follow_station_order():
+    # Zugdidi, Batumi and Gori tie on two stations each but first appear in
+    # that (non-alphabetical) order; Kutaisi ties Poti on one
+    rows = [station(b, c) for b, c in [
+        ("Gulf", "Zugdidi"), ("Wissol", "Kutaisi"), ("Gulf", "Batumi"), ("SGP", "Tbilisi"),
+        ("Lukoil", ""), ("Wissol", "Zugdidi"), ("Rompetrol", "Gori"), ("Gulf", "Gori"),
+        ("SGP", "Batumi"), ("Gulf", "Tbilisi"), ("SGP", "Tbilisi"), ("Lukoil", "Poti"),
+    ]]
+    cube = build_cube(pd.DataFrame(rows), analytics.CUBE_FLAGS, analytics.CUBE_MEASURES)
+    insights = analytics.insights(cube)
+
+    expected = web_city_stats(rows)
+    assert [c["city"] for c in expected] == ["Tbilisi", "Zugdidi", "Batumi", "Gori",
+                                             "Kutaisi", "Poti"]
+    assert insights["cityStats"] == expected
+    assert [g["city"] for g in insights["coverageGaps"]] == ["Zugdidi", "Gori"]
+    assert insights["tbilisiStats"] == expected[0]
@@ -0,0 +1,101 @@
+import itertools
+import math
+
+import numpy as np
+
+import colocation
+import combine_data
+from geocoder import KM_PER_DEGREE, haversine_km
+from station_table import StationTable
+
+# Degrees of latitude per metre
+M = 1 / 1000 / KM_PER_DEGREE
+
+
+def brute_force(lats, lons, radius_m):
+    parent = list(range(len(lats)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+    for i, j in itertools.combinations(range(len(lats)), 2):
+        if haversine_km(lats[i], lons[i], lats[j], lons[j]) * 1000 <= radius_m:
+            parent[max(find(i), find(j))] = min(find(i), find(j))
+    groups = {}
+    for i in range(len(lats)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(2)
+    lats = rng.uniform(41.60, 41.62, 300)
+    lons = rng.uniform(44.70, 44.73, 300)
+    for radius_m in (20, 50, 120):
+        assert colocation.find_clusters(lats, lons, radius_m) == brute_force(lats, lons, radius_m)
+
+
+def test_pairs_across_cell_edges():
+    radius_m = 50
+    # The grid find_clusters builds for points around 41.7 N
+    cell_lat = radius_m * M
+    cell_lon = cell_lat / math.cos(math.radians(41.7 + 30 * M + cell_lat))
+    edge_lat = math.floor(41.7 / cell_lat) * cell_lat
+    edge_lon = math.floor(44.0 / cell_lon) * cell_lon
+    lon_m = cell_lon / radius_m
+    # Pairs 40 m apart straddling a row edge, a column edge and a corner
+    pairs = [
+        ([edge_lat - 20 * M, edge_lat + 20 * M], [44.0, 44.0]),
+        ([41.7, 41.7], [edge_lon - 20 * lon_m, edge_lon + 20 * lon_m]),
+        ([edge_lat - 14 * M, edge_lat + 14 * M], [edge_lon - 14 * lon_m, edge_lon + 14 * lon_m]),
+    ]
+    for lats, lons in pairs:
+        assert colocation.find_clusters(lats, lons, radius_m) == [[0, 1]]
+    # Out of range, and missing coordinates never cluster
+    assert colocation.find_clusters([41.7, 41.7 + 60 * M], [44.0, 44.0], radius_m) == []
+    assert colocation.find_clusters([41.7, np.nan, 41.7], [44.0, 44.0, np.nan], radius_m) == []
+
+
+def test_chaining():
+    # A-B and B-C are 40 m apart, A-C 80 m: one cluster; D is alone
+    lats = [41.7 + 80 * M, 41.7, 41.7 + 40 * M, 42.0]
+    lons = [44.0] * 4
+    assert colocation.find_clusters(lats, lons, 50) == [[0, 1, 2]]
+
+
+def table(rows):
+    return StationTable.from_rows(
+        [dict({f: "" for f in combine_data.FIELDNAMES}, **row) for row in rows],
+        combine_data.FIELDNAMES)
+
+
+STATIONS = [
+    {"station_id": "G1", "brand": "Gulf", "fuel_types": "Euro Diesel", "services": "Cafe"},
+    {"station_id": "S1", "brand": "SGP", "fuel_types": "CNG", "services": ""},
+    {"station_id": "G2", "brand": "Gulf", "fuel_types": "Euro Diesel, LPG", "services": "ATM, Cafe"},
+    {"station_id": "W1", "brand": "Wissol", "fuel_types": "", "services": ""},
+    {"station_id": "G3", "brand": "Gulf", "fuel_types": "Premium", "services": ""},
+]
+CLUSTERS = [[0, 1, 2, 4]]
+
+
+def test_merge_brand_policy():
+    kept, dropped = combine_data.merge_colocated(table(STATIONS), CLUSTERS, "brand")
+    assert dropped == {"G2", "G3"}
+    assert [s["station_id"] for s in kept] == ["G1", "S1", "W1"]
+    assert kept[0]["fuel_types"] == "Euro Diesel, LPG, Premium"
+    assert kept[0]["services"] == "Cafe, ATM"
+    assert kept[1]["fuel_types"] == "CNG"
+
+
+def test_merge_site_and_none_policies():
+    kept, dropped = combine_data.merge_colocated(table(STATIONS), CLUSTERS, "site")
+    assert dropped == {"S1", "G2", "G3"}
+    assert [s["station_id"] for s in kept] == ["G1", "W1"]
+    # The kept station's own fields are left as they were
+    assert kept[0]["fuel_types"] == "Euro Diesel"
+
+    stations = table(STATIONS)
+    kept, dropped = combine_data.merge_colocated(stations, CLUSTERS, "none")
+    assert kept is stations and dropped == set()
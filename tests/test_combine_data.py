@@ -0,0 +1,62 @@
+import csv
+import os
+
+import combine_data
+import station_diff
+
+FINAL_CSV = os.path.join(os.path.dirname(__file__), os.pardir, "data", "final.csv")
+
+
+def test_tracked_final_csv_matches_the_writer():
+    # data/final.csv is committed: it must have the columns combine writes
+    with open(FINAL_CSV, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    assert reader.fieldnames == combine_data.FIELDNAMES
+    assert all(row["region"] for row in rows)
+
+
+def copy_sources(tmp_path, monkeypatch):
+    """Point combine_data at a copy of the raw CSVs in tmp_path."""
+    data = os.path.dirname(FINAL_CSV)
+    for source in combine_data.registry().values():
+        with open(os.path.join(data, source.csv_name), "rb") as f:
+            (tmp_path / source.csv_name).write_bytes(f.read())
+    monkeypatch.setattr(combine_data, "DATA_DIR", str(tmp_path))
+
+
+def run_incremental(state, tmp_path):
+    """One combine_incremental run whose state goes through the JSON file."""
+    stations, _, source_states, status = combine_data.combine_incremental(state, jobs=1)
+    path = str(tmp_path / "state.json")
+    station_diff.save_state({"rules": combine_data.rules_digest(), "sources": source_states}, path)
+    return [dict(s) for s in stations], station_diff.load_state(path), status
+
+
+def test_incremental_reuses_unchanged_sources(tmp_path, monkeypatch):
+    copy_sources(tmp_path, monkeypatch)
+    processed = []
+    process_sources = combine_data.process_sources
+    monkeypatch.setattr(combine_data, "process_sources",
+                        lambda names, **kw: processed.append(list(names)) or process_sources(names, **kw))
+    names = list(combine_data.registry())
+
+    full, state, status = run_incremental({}, tmp_path)
+    assert set(status.values()) == {"changed"} and processed[-1] == names
+
+    again, state, status = run_incremental(state, tmp_path)
+    assert set(status.values()) == {"unchanged"} and processed[-1] == []
+    assert again == full
+
+    # Touch one raw CSV: only that source is processed again
+    path = tmp_path / "sgp.csv"
+    path.write_bytes(path.read_bytes() + b"\n")
+    partial, state, status = run_incremental(state, tmp_path)
+    assert processed[-1] == ["sgp"]
+    assert [n for n, st in status.items() if st == "changed"] == ["sgp"]
+    assert partial == full
+
+    # A rules change invalidates every stored source
+    monkeypatch.setattr(combine_data, "rules_digest", lambda: "other rules")
+    _, _, status = run_incremental(state, tmp_path)
+    assert set(status.values()) == {"changed"} and processed[-1] == names
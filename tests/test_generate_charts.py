@@ -0,0 +1,54 @@
+import pandas as pd
+import pytest
+
+import feature_matrix
+import generate_charts
+
+
+@pytest.fixture
+def charts(tmp_path, monkeypatch):
+    """render_charts into tmp_path, with render_chart only touching the file."""
+    monkeypatch.setattr(generate_charts, "CHARTS_DIR", str(tmp_path / "charts"))
+    monkeypatch.setattr(generate_charts, "CHART_CACHE_PATH", str(tmp_path / "charts.json"))
+    monkeypatch.setattr(generate_charts, "render_chart",
+                        lambda name, cube=None: (tmp_path / "charts" / name).touch())
+
+    def render(df):
+        rendered, _ = generate_charts.render_charts(df, jobs=1, cube=object())
+        return sorted(rendered)
+    return render
+
+
+def frame():
+    return pd.DataFrame([
+        {"station_id": "SGP_1", "brand": "SGP", "name": "A", "address": "", "city": "Tbilisi",
+         "latitude": 41.7, "longitude": 44.8, "fuel_types": "Euro Diesel", "services": "Cafe",
+         "working_hours": "", "phone": "", "station_type": "", "region": "Tbilisi"},
+        {"station_id": "GULF_1", "brand": "Gulf", "name": "B", "address": "", "city": "Gori",
+         "latitude": 41.9, "longitude": 44.1, "fuel_types": "CNG", "services": "",
+         "working_hours": "", "phone": "", "station_type": "", "region": "Shida Kartli"},
+    ])
+
+
+def test_only_charts_reading_a_changed_column_redraw(charts):
+    df = frame()
+    assert charts(df) == sorted(name for name, _, _ in generate_charts.CHARTS)
+    assert charts(df) == []
+
+    df.loc[1, "region"] = "Imereti"
+    assert charts(df) == ["07_regional_presence.png", "08_sgp_regional_share.png"]
+
+    df.loc[1, "latitude"] = 42.0
+    assert charts(df) == ["12_geographic_scatter.png"]
+
+    df.loc[0, "services"] = "Cafe, ATM"
+    assert charts(df) == ["06_service_comparison.png", "11_sgp_vs_gulf.png"]
+
+
+def test_chart_path_module_change_redraws_everything(charts, tmp_path, monkeypatch):
+    df = frame()
+    charts(df)
+    changed = tmp_path / "feature_matrix.py"
+    changed.write_text(open(feature_matrix.__file__).read() + "\n# changed\n")
+    monkeypatch.setattr(feature_matrix, "__file__", str(changed))
+    assert len(charts(df)) == len(generate_charts.CHARTS)
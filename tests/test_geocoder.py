@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+
+import geocoder
+from geocoder import Geocoder, haversine_km
+
+
+def brute_force(places, lats, lons, max_km):
+    result = []
+    for lat, lon in zip(lats, lons):
+        best, best_km = "", math.inf
+        for name, plat, plon in places:
+            km = haversine_km(lat, lon, plat, plon)
+            if km <= max_km and km < best_km:
+                best, best_km = name, km
+        result.append(best)
+    return result
+
+
+def test_nearest_matches_brute_force():
+    rng = np.random.default_rng(1)
+    places = [(f"p{i}", lat, lon) for i, (lat, lon)
+              in enumerate(zip(rng.uniform(41, 43.5, 150), rng.uniform(40, 46.7, 150)))]
+    lats, lons = rng.uniform(40.8, 43.7, 400), rng.uniform(39.8, 46.9, 400)
+    for max_km in (5.0, 15.0, 60.0):
+        g = Geocoder(places, max_km)
+        assert g.nearest(lats, lons).tolist() == brute_force(places, lats, lons, max_km)
+
+
+def test_neighbours_across_cell_edges():
+    g = Geocoder([("origin", 0.0, 0.0)], 15.0)
+    # Points near the top and bottom edges of the origin's cell, the
+    # second one in the cell below
+    edge_lat = g.cell_lat * 0.999
+    assert g.nearest([edge_lat, -edge_lat], [0.0, 0.0]).tolist() == ["origin", "origin"]
+    # A place at a cell corner is found from the diagonal neighbour
+    corner = Geocoder([("corner", g.cell_lat - 1e-9, g.cell_lon - 1e-9)], 15.0)
+    assert corner.nearest([g.cell_lat + 0.01], [g.cell_lon + 0.01]).tolist() == ["corner"]
+
+
+def test_max_km_cutoff_and_ties():
+    km = 1 / geocoder.KM_PER_DEGREE
+    # "twin" sits on "a": the place listed first wins the tie
+    g = Geocoder([("a", 0.0, 0.0), ("b", 0.0, 30 * km), ("twin", 0.0, 0.0)], 10.0)
+    lats = [0.0, 0.0, 0.0, np.nan]
+    lons = [9.99 * km, 10.01 * km, 22 * km, 0.0]
+    assert g.nearest(lats, lons).tolist() == ["a", "", "b", ""]
+    assert Geocoder([], 10.0).nearest([0.0], [0.0]).tolist() == [""]
+
+
+def test_prime_and_lookup_cache(monkeypatch):
+    g = Geocoder([("a", 41.7, 44.8)], 15.0)
+    g.prime([41.71, 50.0], [44.81, 50.0])
+    calls = []
+    monkeypatch.setattr(g, "nearest", lambda lats, lons: calls.append(lats) or [""])
+    assert g.lookup(41.71, 44.81) == "a"
+    assert g.lookup(50.0, 50.0) == ""
+    assert calls == []
+    g.clear()
+    assert g.lookup(41.71, 44.81) == ""
+    assert len(calls) == 1
+
+
+def test_from_files_adds_gazetteer(tmp_path):
+    path = tmp_path / "gazetteer.csv"
+    path.write_text("name,latitude,longitude\nVillage,42.0,43.0\n")
+    g = geocoder.from_files({"Town": (41.0, 44.0)}, str(path), max_km=5.0)
+    assert g.nearest([42.01, 41.01, 45.0], [43.0, 44.0, 45.0]).tolist() == ["Village", "Town", ""]
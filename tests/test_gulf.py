@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+import gulf
+
+
+def page(pins):
+    return b"<script>var pins = " + pins + b";\nvar other = {};</script>"
+
+
+def test_pins_with_literals():
+    pins = {"1": {"name": "A }; [x]", "fuel": ["ED", "ER"], "poi": [], "note": "it's"}}
+    body = page(json.dumps(pins).encode())
+    assert gulf.decode_payload(body) == pins
+
+
+def test_mixed_array_does_not_backtrack():
+    # Scalars followed by an object: the flat-array shortcut fails, and
+    # must do so without trying every way to split the scalars
+    pins = {"a": [1] * 40 + [{"x": 1}, [2, [3]]]}
+    body = page(json.dumps(pins).encode())
+    assert gulf.decode_payload(body) == pins
+    # The step consumes a flat array whole, and gives up on one that holds
+    # an object without matching any of it (a backtracking pattern would
+    # hang here rather than fail)
+    assert gulf.SCAN_STEP.match(b"x = [1, 2]; y {").end() == len(b"x = [1, 2]; y ")
+    assert gulf.SCAN_STEP.match(b"[" + b"1, " * 5000 + b"{").end() == 0
+
+
+def test_unbalanced():
+    with pytest.raises(ValueError):
+        gulf.decode_payload(page(b'{"a": [1, 2}'))
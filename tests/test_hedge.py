@@ -0,0 +1,87 @@
+import threading
+import time
+
+import pytest
+
+import hedge
+import payload_cache
+
+
+@pytest.fixture(autouse=True)
+def state(tmp_path, monkeypatch):
+    monkeypatch.setattr(hedge, "STATE_PATH", str(tmp_path / "circuits.json"))
+    monkeypatch.setattr(payload_cache, "commit", lambda d: (d, True))
+
+
+def test_circuit_opens_probes_and_closes():
+    assert hedge.circuit_mode("src", now=0) == hedge.CLOSED
+    hedge.record("src", False, now=0)
+    assert hedge.circuit_mode("src", now=1) == hedge.CLOSED
+    hedge.record("src", False, now=10)
+    assert hedge.circuit_mode("src", now=11) == hedge.OPEN
+    assert hedge.circuit_mode("src", now=10 + hedge.PROBE_INTERVAL) == hedge.PROBE
+    # A failed probe restarts the wait
+    hedge.record("src", False, now=20 + hedge.PROBE_INTERVAL)
+    assert hedge.circuit_mode("src", now=30 + hedge.PROBE_INTERVAL) == hedge.OPEN
+    hedge.record("src", True, now=40 + hedge.PROBE_INTERVAL)
+    assert hedge.circuit_mode("src", now=41 + hedge.PROBE_INTERVAL) == hedge.CLOSED
+    assert hedge.circuit_mode("other", now=0) == hedge.CLOSED
+
+
+def fake_download(monkeypatch, behaviour):
+    """Route payload_cache.download by URL to `behaviour`; log the calls."""
+    calls = []
+
+    def download(source, url, timeout, **kwargs):
+        calls.append((url, kwargs))
+        return behaviour[url]()
+    monkeypatch.setattr(payload_cache, "download", download)
+    return calls
+
+
+LIVE = ("live", 10, {"validate": None})
+WAYBACK = ("wayback", 30, {})
+
+
+def test_live_wins_without_retries(monkeypatch):
+    calls = fake_download(monkeypatch, {"live": lambda: b"live body",
+                                        "wayback": lambda: b"wayback body"})
+    assert hedge.fetch_hedged("src", LIVE, WAYBACK, delay=5) == (b"live body", True, "live")
+    assert calls == [("live", {"validate": None, "retries": 0})]
+
+
+def test_hanging_live_counts_as_failure(monkeypatch):
+    release = threading.Event()
+
+    def hang():
+        release.wait(5)
+        raise TimeoutError("live timed out")
+    calls = fake_download(monkeypatch, {"live": hang, "wayback": lambda: b"wayback body"})
+    try:
+        for _ in range(hedge.FAILURE_THRESHOLD):
+            assert hedge.fetch_hedged("src", LIVE, WAYBACK, delay=0.01)[2] == "wayback"
+        assert hedge.circuit_mode("src") == hedge.OPEN
+        # Open: straight to Wayback, the live site is not tried
+        calls.clear()
+        assert hedge.fetch_hedged("src", LIVE, WAYBACK, delay=5)[2] == "wayback"
+        assert [url for url, _ in calls] == ["wayback"]
+    finally:
+        release.set()
+
+
+def test_live_failure_starts_fallback_at_once(monkeypatch):
+    def fail():
+        raise ConnectionError("refused")
+    fake_download(monkeypatch, {"live": fail, "wayback": lambda: b"wayback body"})
+    start = time.perf_counter()
+    assert hedge.fetch_hedged("src", LIVE, WAYBACK, delay=30)[2] == "wayback"
+    # Well under the 30 s head start
+    assert time.perf_counter() - start < 20
+
+
+def test_every_attempt_failing_raises(monkeypatch):
+    def fail():
+        raise ConnectionError("down")
+    fake_download(monkeypatch, {"live": fail, "wayback": fail})
+    with pytest.raises(ConnectionError):
+        hedge.fetch_hedged("src", LIVE, WAYBACK, delay=0)
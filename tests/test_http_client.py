@@ -0,0 +1,115 @@
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+import http_client
+
+
+class StubResponse:
+    def __init__(self, status, headers=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self.content = b"body"
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class StubSession:
+    """Plays back `outcomes` (StubResponse or exception) one per request."""
+
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.methods = []
+
+    def request(self, method, url, timeout, **kwargs):
+        self.methods.append(method)
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Install a StubSession for the next request; sleeps are recorded, not slept."""
+    sleeps = []
+    monkeypatch.setattr(http_client.time, "sleep", sleeps.append)
+    monkeypatch.setattr(http_client, "limiter_for",
+                        lambda url: (http_client.TokenBucket(1000, 1000),
+                                     http_client.threading.BoundedSemaphore(1)))
+
+    def install(*outcomes):
+        session = StubSession(outcomes)
+        monkeypatch.setattr(http_client, "session_for", lambda url: session)
+        return session, sleeps
+    return install
+
+
+def test_retried_responses_are_closed(stub):
+    busy, failing = StubResponse(503), StubResponse(429, {"Retry-After": "2"})
+    ok = StubResponse(200)
+    session, sleeps = stub(busy, failing, ok)
+    assert http_client.request("GET", "https://example.test/", 5) is ok
+    assert busy.closed and failing.closed and not ok.closed
+    assert sleeps[1] == 2.0
+    assert http_client.metrics()[-1]["attempts"] == 3
+
+
+def test_final_response_and_error_after_retries(stub):
+    last = StubResponse(500)
+    session, _ = stub(*[StubResponse(500)] * 2, last)
+    assert http_client.request("GET", "https://example.test/", 5, retries=2) is last
+    stub(*[requests.ConnectionError("down")] * 4)
+    with pytest.raises(requests.ConnectionError):
+        http_client.request("GET", "https://example.test/", 5)
+
+
+def test_post_is_not_retried_unless_asked(stub):
+    session, _ = stub(requests.Timeout("slow"), StubResponse(200))
+    with pytest.raises(requests.Timeout):
+        http_client.post("https://example.test/", 5)
+    assert session.methods == ["POST"]
+
+    session, _ = stub(requests.Timeout("slow"), StubResponse(200))
+    assert http_client.post("https://example.test/", 5, retries=1).status_code == 200
+    assert session.methods == ["POST", "POST"]
+
+
+def test_retry_delay_honours_retry_after(monkeypatch):
+    monkeypatch.setattr(http_client.random, "uniform", lambda lo, hi: hi)
+    assert http_client.retry_delay(0, StubResponse(429, {"Retry-After": "3"})) == 3.0
+    assert http_client.retry_delay(0, StubResponse(429, {"Retry-After": "9999"})) == http_client.BACKOFF_MAX
+    later = formatdate(time.time() + 10, usegmt=True)
+    assert 8 <= http_client.retry_delay(0, StubResponse(503, {"Retry-After": later})) <= 10
+    past = formatdate(time.time() - 60, usegmt=True)
+    assert http_client.retry_delay(0, StubResponse(503, {"Retry-After": past})) == 0.0
+    # Unparseable or missing: capped exponential backoff
+    assert http_client.retry_delay(2, StubResponse(503, {"Retry-After": "soon"})) == 2.0
+    assert http_client.retry_delay(20) == http_client.BACKOFF_MAX
+
+
+def test_token_bucket_spends_burst_then_waits(monkeypatch):
+    clock = [100.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        clock[0] += seconds
+    monkeypatch.setattr(http_client.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(http_client.time, "sleep", sleep)
+
+    bucket = http_client.TokenBucket(rate=2.0, burst=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert sleeps == []
+    bucket.acquire()
+    assert sleeps == [0.5]
+    # Idle time refills up to the burst only
+    clock[0] += 60
+    for _ in range(3):
+        bucket.acquire()
+    assert sleeps == [0.5]
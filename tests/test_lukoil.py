@@ -0,0 +1,32 @@
+import lukoil
+
+MARKER = ('L.marker([41.7, 44.8]);\n  marker.addTo(mymap);\n'
+          '  marker.bindPopup("{popup}")\n')
+CELL = '<p class="text-lk-main text-{kind}">{text}</p>\n'
+MD = "md font-semibold"
+SM = "sm font-semibold text-center"
+
+
+def page(popups):
+    parts = [MARKER.format(popup=p) for p in popups]
+    for i, _ in enumerate(popups):
+        parts += [CELL.format(kind=MD, text=str(i + 1)), CELL.format(kind=MD, text="City"),
+                  CELL.format(kind=SM, text="Address"), CELL.format(kind=MD, text="Type")]
+    return "".join(parts)
+
+
+def test_tokens_across_chunks():
+    html = page(["a", "b", "c"])
+    expected = list(lukoil.iter_tokens(html, chunk_size=len(html)))
+    assert [k for k, _ in expected] == ["marker"] * 3 + ["row"] * 3
+    for chunk_size in (1, 7, 100):
+        assert list(lukoil.iter_tokens(html, chunk_size=chunk_size)) == expected
+
+
+def test_token_longer_than_window_is_kept():
+    long_popup = "x" * (3 * lukoil.MAX_TOKEN_LEN)
+    html = page(["a", long_popup, "c"])
+    rows = list(lukoil.iter_stations(html.encode("utf-8"), chunk_size=1000))
+    assert len(rows) == 3
+    markers = [v for k, v in lukoil.iter_tokens(html, chunk_size=1000) if k == "marker"]
+    assert [m[2] for m in markers] == ["a", long_popup, "c"]
@@ -0,0 +1,28 @@
+import hashlib
+
+import pytest
+
+import payload_cache
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(payload_cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(payload_cache, "BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setattr(payload_cache, "INDEX_PATH", str(tmp_path / "index.json"))
+    return payload_cache
+
+
+def download(body):
+    return payload_cache.Download("gulf", "https://example.test/", body,
+                                  hashlib.sha256(body).hexdigest(), "", "")
+
+
+def test_unprocessed_payload_stays_changed(cache):
+    assert cache.commit(download(b"v1")) == (b"v1", True)
+    # Parsing or saving failed: no mark_processed(), so the same bytes
+    # must be reported as changed again
+    assert cache.commit(download(b"v1")) == (b"v1", True)
+    cache.mark_processed("gulf")
+    assert cache.commit(download(b"v1")) == (b"v1", False)
+    assert cache.commit(download(b"v2")) == (b"v2", True)
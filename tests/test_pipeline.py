@@ -0,0 +1,43 @@
+import combine_data
+import pipeline
+import sources
+from run_report import RunReport
+
+
+class FakeSource:
+    def __init__(self, name):
+        self.name = name
+        self.csv_name = f"{name}.csv"
+        self.saved = None
+
+    def save_csv(self, rows, data_dir="data"):
+        self.saved = rows
+
+
+def test_failed_source_keeps_its_csv(tmp_path, monkeypatch):
+    registry = {"good": FakeSource("good"), "flaky": FakeSource("flaky")}
+    (tmp_path / "flaky.csv").write_text("id\n1\n")
+    monkeypatch.setattr(combine_data, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(combine_data, "load_csv", lambda name: [{"id": "old"}])
+    monkeypatch.setattr(combine_data, "save_final", lambda stations, run: None)
+    monkeypatch.setattr(sources, "scrape", lambda names, offline=False: (
+        {"good": ([{"id": "new"}], True, 0.1, 10)}, {"flaky": ValueError("parse failed")}))
+
+    run = RunReport("pipeline")
+    raw, scraped = pipeline.scrape_raw(registry, run)
+    assert raw == {"good": [{"id": "new"}], "flaky": [{"id": "old"}]}
+    assert not run.sources["flaky"]["up"]
+
+    pipeline.write_csvs(registry, raw, [], scraped, run)
+    assert registry["good"].saved == [{"id": "new"}]
+    # Saving would mark flaky's unparsed payload as processed
+    assert registry["flaky"].saved is None
+
+
+def test_failed_source_without_csv_aborts(tmp_path, monkeypatch):
+    registry = {"flaky": FakeSource("flaky")}
+    monkeypatch.setattr(combine_data, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(sources, "scrape", lambda names, offline=False: (
+        {}, {"flaky": ValueError("parse failed")}))
+    raw, scraped = pipeline.scrape_raw(registry, RunReport("pipeline"))
+    assert raw is None and scraped == {}
@@ -0,0 +1,63 @@
+import numpy as np
+
+import regions
+
+
+def square(x0, y0, x1, y1):
+    return [[x0, y0], [x1, y0], [x1, y1], [x0, y1], [x0, y0]]
+
+
+def feature(name, geometry_type, coordinates):
+    return {"type": "Feature", "properties": {"name": name},
+            "geometry": {"type": geometry_type, "coordinates": coordinates}}
+
+
+def test_box_tree_matches_brute_force():
+    rng = np.random.default_rng(0)
+    lo = rng.uniform(0, 90, size=(200, 2))
+    boxes = np.column_stack([lo, lo + rng.uniform(0, 10, size=(200, 2))])
+    xs, ys = rng.uniform(0, 100, size=(2, 500))
+    points, items = regions.BoxTree(boxes, capacity=4).query_points(xs, ys)
+
+    inside = ((boxes[:, 0] <= xs[:, None]) & (xs[:, None] <= boxes[:, 2])
+              & (boxes[:, 1] <= ys[:, None]) & (ys[:, None] <= boxes[:, 3]))
+    expected = set(zip(*np.nonzero(inside)))
+    assert set(zip(points.tolist(), items.tolist())) == expected
+
+
+def test_box_tree_empty():
+    points, items = regions.BoxTree([]).query_points([1.0], [1.0])
+    assert len(points) == len(items) == 0
+
+
+def test_points_in_rings_with_hole():
+    rings = [square(0, 0, 10, 10), square(4, 4, 6, 6)]
+    xs = np.array([1.0, 5.0, 9.0, 11.0])
+    ys = np.array([1.0, 5.0, 5.0, 5.0])
+    assert regions.points_in_rings(xs, ys, rings).tolist() == [True, False, True, False]
+
+
+def test_locate_multipolygon_and_overlap_order():
+    index = regions.RegionIndex([
+        feature("Split", "MultiPolygon", [[square(0, 0, 2, 2)], [square(10, 0, 12, 2)]]),
+        feature("Holed", "Polygon", [square(0, 0, 5, 5), square(0.5, 0.5, 1.5, 1.5)]),
+        feature("Later", "Polygon", [square(3, 3, 6, 6)]),
+    ])
+    # (lon, lat): both Split parts; inside Split and Holed (first wins);
+    # Holed only; Holed and Later (first wins); Later only; nowhere
+    lons = [11, 1, 3, 4, 5.5, 20]
+    lats = [1, 1, 1, 4, 5.5, 20]
+    assert index.locate(lats, lons).tolist() == [
+        "Split", "Split", "Holed", "Holed", "Later", ""]
+
+
+def test_assign_falls_back_to_nearest_city():
+    centers = {"Tbilisi": (41.7151, 44.8271), "Batumi": (41.6168, 41.6367),
+               "Unknown": (41.70, 44.80)}
+    lats = [41.72, 41.60, 41.72, np.nan, 43.5]
+    lons = [44.83, 41.62, 44.83, np.nan, 44.0]
+    cities = ["", "Batumi", "Bordjomi", "", ""]
+    assigned = regions.assign(lats, lons, cities, path="missing.geojson", centers=centers)
+    assert assigned == ["Tbilisi", "Adjara", "Tbilisi", "", ""]
+    assert regions.assign(lats, lons, cities, path="missing.geojson") == [
+        "", "Adjara", "", "", ""]
@@ -0,0 +1,44 @@
+import json
+import shutil
+
+import snapshots
+
+
+def rows(*names):
+    return [{"station_id": f"S{i}", "name": name} for i, name in enumerate(names)]
+
+
+def test_record_and_as_of(tmp_path):
+    snapshots.record(rows("a", "b"), at=1_000_000, history_dir=tmp_path)
+    snapshots.record(rows("a", "c"), at=2_000_000, history_dir=tmp_path)
+    assert snapshots.record(rows("a", "c"), at=3_000_000, history_dir=tmp_path) is None
+    assert snapshots.as_of("1970-01-12", history_dir=tmp_path)["S1"]["name"] == "b"
+    assert snapshots.as_of("1970-01-24", history_dir=tmp_path)["S1"]["name"] == "c"
+    assert [op for _, op, _ in snapshots.history("S1", history_dir=tmp_path)] == ["put", "patch"]
+
+
+def test_head_behind_manifest_is_rebuilt(tmp_path):
+    # A run that stopped after its manifest line but before head.json and
+    # stations.json: the next run must diff against the manifest's state
+    snapshots.record(rows("a", "b"), at=1_000_000, history_dir=tmp_path)
+    shutil.copy(tmp_path / "head.json", tmp_path / "head.old")
+    shutil.copy(tmp_path / "stations.json", tmp_path / "stations.old")
+    snapshots.record(rows("a", "c"), at=2_000_000, history_dir=tmp_path)
+    (tmp_path / "head.old").replace(tmp_path / "head.json")
+    (tmp_path / "stations.old").replace(tmp_path / "stations.json")
+
+    assert [op for _, op, _ in snapshots.history("S1", history_dir=tmp_path)] == ["put", "patch"]
+    assert snapshots.record(rows("a", "c"), at=3_000_000, history_dir=tmp_path) is None
+    entry = snapshots.record(rows("a", "d"), at=4_000_000, history_dir=tmp_path)
+    assert entry["ops"] == 1
+    assert snapshots.as_of("1970-02-28", history_dir=tmp_path)["S1"]["name"] == "d"
+
+
+def test_torn_manifest_line_is_dropped(tmp_path):
+    snapshots.record(rows("a"), at=1_000_000, history_dir=tmp_path)
+    with open(tmp_path / "manifest.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"ts": "1970')
+    assert len(snapshots.manifest(tmp_path)) == 1
+    snapshots.record(rows("b"), at=2_000_000, history_dir=tmp_path)
+    lines = (tmp_path / "manifest.jsonl").read_text().splitlines()
+    assert [json.loads(line)["ops"] for line in lines] == [0, 1]
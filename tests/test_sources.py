@@ -0,0 +1,21 @@
+import os
+import runpy
+import sys
+
+import sources
+
+COMBINE_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "scripts", "combine_data.py")
+
+
+def test_registry_reuses_running_script(monkeypatch):
+    # combine_data.py run as a script: its registrations come from that
+    # module, and registry() must not import a second copy of it
+    monkeypatch.setattr(sources, "_registry", {})
+    monkeypatch.setattr(sources, "_builtins_registered", False)
+    monkeypatch.delitem(sys.modules, "combine_data", raising=False)
+    script = runpy.run_path(COMBINE_PATH, run_name="combine_script")
+
+    registry = sources.registry()
+    assert "combine_data" not in sys.modules
+    assert list(registry) == ["gulf", "rompetrol", "lukoil", "wissol", "sgp"]
+    assert registry["gulf"].normalize is script["normalize_gulf"]
@@ -0,0 +1,54 @@
+import os
+
+import station_diff
+
+
+def test_file_digest_ignores_directory(tmp_path, monkeypatch):
+    (tmp_path / "rules.py").write_text("RULES = 1\n")
+    absolute = station_diff.file_digest(str(tmp_path / "rules.py"))
+    monkeypatch.chdir(tmp_path)
+    assert station_diff.file_digest("rules.py") == absolute
+    assert station_diff.file_digest(os.path.join(".", "rules.py")) == absolute
+
+
+def test_file_digest_follows_contents(tmp_path):
+    path = tmp_path / "rules.py"
+    path.write_text("RULES = 1\n")
+    before = station_diff.file_digest(str(path))
+    path.write_text("RULES = 2\n")
+    assert station_diff.file_digest(str(path)) != before
+    assert station_diff.file_digest(str(tmp_path / "absent.csv")) != before
+
+
+FIELDS = ["station_id", "brand", "name", "latitude", "longitude", "city"]
+
+
+def row(sid, lat="41.7", lon="44.8", city="Tbilisi", name="A"):
+    return {"station_id": sid, "brand": "SGP", "name": name,
+            "latitude": lat, "longitude": lon, "city": city}
+
+
+def test_diff_classifies_stations():
+    old = {sid: row(sid) for sid in ("same", "gone", "moved", "renamed", "jitter")}
+    new = [
+        row("same"),
+        row("moved", lat="41.71"),
+        row("renamed", city="Rustavi", name="B"),
+        # Within COORD_TOLERANCE: not a move, and no other field changed
+        row("jitter", lat="41.70000001"),
+        row("new"),
+    ]
+    diff, prints = station_diff.diff_stations(old, new, FIELDS, sources={"sgp": "changed"})
+    assert [a["station_id"] for a in diff["added"]] == ["new"]
+    assert diff["removed"] == [{"station_id": "gone", "brand": "SGP", "name": "A"}]
+    assert [m["station_id"] for m in diff["moved"]] == ["moved"]
+    assert 1100 < diff["moved"][0]["distance_m"] < 1120
+    assert diff["changed"] == [{"station_id": "renamed", "fields": {
+        "name": ["A", "B"], "city": ["Tbilisi", "Rustavi"]}}]
+    assert diff["sources"] == {"sgp": "changed"}
+    assert set(prints) == {"same", "moved", "renamed", "jitter", "new"}
+
+    # Stored fingerprints stand in for recomputing them from the old rows
+    again, _ = station_diff.diff_stations({sid: row(sid) for sid in prints}, new, FIELDS,
+                                          old_prints=prints)
+    assert station_diff.summary(again) == "0 added, 0 removed, 0 moved, 0 changed"
@@ -0,0 +1,17 @@
+import numpy as np
+
+from station_table import StationTable
+
+FIELDS = ["station_id", "city", "latitude", "longitude"]
+
+
+def test_columns_do_not_pin_the_table():
+    table = StationTable.from_rows(
+        [{"station_id": "A", "city": "Gori", "latitude": "41.9", "longitude": "44.1"}], FIELDS)
+    lats, codes = table.latitudes, table.code_column("city")
+    table.append({"station_id": "B", "city": "Poti", "latitude": "", "longitude": "41.6"})
+    lats[0] = 0.0
+    assert lats.tolist() == [0.0] and codes.tolist() == [0]
+    assert table.latitudes[0] == 41.9 and np.isnan(table.latitudes[1])
+    assert table.column("city") == ["Gori", "Poti"]
+    assert table[1]["latitude"] == ""
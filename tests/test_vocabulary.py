@@ -0,0 +1,30 @@
+import pandas as pd
+
+import vocabulary
+from feature_matrix import FeatureMatrix
+from run_report import RunReport
+
+
+def test_update_returns_added_labels(tmp_path):
+    path = str(tmp_path / "vocabulary.json")
+    stations = [{"fuel_types": "LPG, CNG", "services": ""}, {"fuel_types": "CNG", "services": "ATM"}]
+    vocab, added = vocabulary.update(stations, path)
+    assert added == ["CNG", "LPG", "ATM"]
+    assert vocabulary.load(path).names == vocab.names == added
+    assert vocabulary.update(stations, path)[1] == []
+
+
+def test_report_lists_added_labels():
+    report = RunReport("combine")
+    report.vocabulary_added = ["LPG"]
+    assert report.to_dict()["vocabulary_added"] == ["LPG"]
+    assert "gas_stations_vocabulary_added{job=\"combine\"} 1" in report.to_prometheus()
+
+
+def test_from_frame_uses_an_empty_vocabulary():
+    # An empty Vocabulary is falsy (len 0) but must still be the one used
+    vocab = vocabulary.Vocabulary()
+    df = pd.DataFrame({"fuel_types": ["CNG", ""], "services": ["", "ATM"]})
+    matrix = FeatureMatrix.from_frame(df, ["fuel_types", "services"], vocab)
+    assert vocab.names == matrix.names == ["CNG", "ATM"]
+    assert matrix.matrices["fuel_types"].tolist() == [[True, False], [False, False]]
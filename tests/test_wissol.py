@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+import wissol
+
+
+FEATURES = [
+    {"type": "Feature", "geometry": {"type": "Point", "coordinates": [44.8, 41.7]},
+     "properties": {"id": 1, "address": "თბილისი, Rustaveli Ave. #1",
+                    "services": [{"name": {"en": "Coffee"}}, {"name": {"en": "ATM"}}]}},
+    {"type": "Feature", "geometry": {"type": "Point", "coordinates": [41.6, 41.6]},
+     "properties": {"id": 2, "address": "Batumi, Chavchavadze St. 'Old' \\ quoted \"x\"",
+                    "working_hours": "24/7", "services": []}},
+]
+
+
+def js_literal(text):
+    """`text` as the body of a single-quoted JS string, non-ASCII as \\uXXXX."""
+    out = text.replace("\\", "\\\\").replace("'", "\\'")
+    return "".join(c if ord(c) < 128 else f"\\u{ord(c):04x}" for c in out)
+
+
+def page(features, ensure_ascii=False):
+    literal = js_literal(json.dumps(features, ensure_ascii=ensure_ascii))
+    return (f"<html><script>const allLocations = JSON.parse('{literal}');\n"
+            f"const other = JSON.parse('[]');</script></html>").encode("ascii")
+
+
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_features_across_chunk_sizes(ensure_ascii):
+    body = page(FEATURES, ensure_ascii)
+    # Chunk size 1 splits every escape sequence and the start marker
+    for chunk_size in (1, 2, 3, 5, 7, 64, len(body)):
+        assert list(wissol.iter_features(body, chunk_size=chunk_size)) == FEATURES
+
+
+def test_empty_array_and_iterable_source():
+    body = page([])
+    assert list(wissol.iter_features(body, chunk_size=4)) == []
+    chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+    assert list(wissol.iter_features(iter(chunks))) == []
+
+
+def test_parse_stations():
+    rows = wissol.parse_stations(wissol.decode_payload(page(FEATURES)))
+    assert [r["id"] for r in rows] == [1, 2]
+    assert rows[0]["services"] == "Coffee, ATM"
+    assert (rows[0]["latitude"], rows[0]["longitude"]) == (41.7, 44.8)
+
+
+def test_missing_and_truncated_literal():
+    with pytest.raises(ValueError, match="Could not find"):
+        list(wissol.iter_features(b"<html>no data</html>", chunk_size=4))
+    body = page(FEATURES)
+    # Cut inside the literal, halfway through the second feature
+    cut = body[:body.index(b"Batumi")]
+    for chunk_size in (1, 16, len(cut)):
+        with pytest.raises(ValueError, match="Unterminated"):
+            list(wissol.iter_features(cut, chunk_size=chunk_size))
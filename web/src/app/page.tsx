@@ -1,7 +1,7 @@
 'use client';
 
 import { useState, useEffect, useMemo } from 'react';
-import { Station, Brand, BrandStats, CityStats, SGPInsights, CoverageGap } from '@/lib/types';
+import { Station, Brand, Analytics, Insights } from '@/lib/types';
 import { computeMarketShare, computeCityStats, computeSGPInsights, computeCoverageGaps } from '@/lib/stats';
 import StatsBar from '@/components/StatsBar';
 import Sidebar from '@/components/Sidebar';
@@ -9,6 +9,8 @@ import MapView from '@/components/MapView';
 
 export default function Home() {
   const [stations, setStations] = useState<Station[]>([]);
+  // undefined while analytics.json is loading, null if it is unavailable
+  const [analytics, setAnalytics] = useState<Analytics | null | undefined>(undefined);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [activeBrands, setActiveBrands] = useState<Set<Brand>>(
@@ -33,15 +35,31 @@ export default function Home() {
     fetchStations();
   }, []);
 
-  // Compute stats from FULL dataset (not filtered)
-  const marketShare = useMemo(() => computeMarketShare(stations), [stations]);
-  const cityStats = useMemo(() => computeCityStats(stations), [stations]);
-  const sgpInsights = useMemo(() => computeSGPInsights(stations), [stations]);
-  const coverageGaps = useMemo(() => computeCoverageGaps(stations), [stations]);
-  const tbilisiStats = useMemo(
-    () => cityStats.find(c => c.city === 'Tbilisi') || null,
-    [cityStats]
-  );
+  // Fetch precomputed stats (scripts/generate_charts.py). They are much
+  // smaller than stations.json, so the stats render before the map data
+  // arrives; without them the stats are computed from the stations below
+  useEffect(() => {
+    fetch('/data/analytics.json')
+      .then(res => (res.ok ? res.json() : null))
+      .then(setAnalytics)
+      .catch(() => setAnalytics(null));
+  }, []);
+
+  // Stats cover the FULL dataset (not filtered). null until either
+  // analytics.json or, failing that, stations.json has loaded
+  const insights = useMemo<Insights | null>(() => {
+    if (analytics) return analytics.insights;
+    if (analytics === undefined || loading || error) return null;
+    const cityStats = computeCityStats(stations);
+    return {
+      marketShare: computeMarketShare(stations),
+      cityStats,
+      sgpInsights: computeSGPInsights(stations),
+      coverageGaps: computeCoverageGaps(stations),
+      tbilisiStats: cityStats.find(c => c.city === 'Tbilisi') || null,
+    };
+  }, [analytics, loading, error, stations]);
+  const totalStations = analytics ? analytics.stations : stations.length;
 
   // Filter stations for map display
   const filteredStations = useMemo(
@@ -62,8 +80,9 @@ export default function Home() {
     });
   };
 
-  // Loading state
-  if (loading) {
+  // Loading state: only until the stats are available; the map waits for
+  // the stations on its own
+  if (!insights && !error) {
     return (
       <div className="h-screen w-screen flex items-center justify-center bg-gradient-to-br from-slate-100 to-slate-200">
         <div className="flex flex-col items-center gap-4">
@@ -75,8 +94,8 @@ export default function Home() {
     );
   }
 
-  // Error state
-  if (error) {
+  // Error state: nothing to show at all
+  if (!insights) {
     return (
       <div className="h-screen w-screen flex items-center justify-center bg-gradient-to-br from-red-50 to-red-100">
         <div className="flex flex-col items-center gap-4 p-8 bg-white rounded-2xl shadow-xl max-w-md mx-4">
@@ -98,12 +117,18 @@ export default function Home() {
     );
   }
 
+  const { marketShare, cityStats, sgpInsights, coverageGaps, tbilisiStats } = insights;
+  // Until the stations arrive, count the visible ones from the stats
+  const visibleCount = loading
+    ? marketShare.filter(ms => activeBrands.has(ms.brand)).reduce((sum, ms) => sum + ms.count, 0)
+    : filteredStations.length;
+
   return (
     <div className="h-screen w-screen flex flex-col overflow-hidden bg-slate-100">
       {/* Top Stats Bar */}
       <StatsBar
-        totalStations={stations.length}
-        filteredCount={filteredStations.length}
+        totalStations={totalStations}
+        filteredCount={visibleCount}
         marketShare={marketShare}
         onToggleSidebar={() => setSidebarOpen(!sidebarOpen)}
         isSidebarOpen={sidebarOpen}
@@ -121,13 +146,34 @@ export default function Home() {
           cityStats={cityStats}
           sgpInsights={sgpInsights}
           coverageGaps={coverageGaps}
-          totalStations={stations.length}
+          totalStations={totalStations}
           tbilisiStats={tbilisiStats}
         />
 
         {/* Map */}
         <main className="flex-1 relative">
-          <MapView stations={filteredStations} />
+          {loading ? (
+            <div className="w-full h-full flex items-center justify-center bg-gradient-to-br from-slate-100 to-slate-200">
+              <div className="flex flex-col items-center gap-3">
+                <div className="w-12 h-12 border-4 border-sgp border-t-transparent rounded-full animate-spin" />
+                <span className="text-sm text-slate-500 font-medium">Loading gas stations...</span>
+              </div>
+            </div>
+          ) : error ? (
+            <div className="w-full h-full flex items-center justify-center bg-gradient-to-br from-red-50 to-red-100">
+              <div className="flex flex-col items-center gap-3 p-6 bg-white rounded-2xl shadow-xl max-w-sm mx-4">
+                <p className="text-slate-600 text-center">{error}</p>
+                <button
+                  onClick={() => window.location.reload()}
+                  className="px-6 py-2 bg-sgp text-white rounded-lg font-medium hover:bg-blue-700 transition-colors"
+                >
+                  Retry
+                </button>
+              </div>
+            </div>
+          ) : (
+            <MapView stations={filteredStations} />
+          )}
 
           {/* Mobile Brand Quick Filter */}
           <div className="lg:hidden absolute top-4 left-4 right-4 z-10">
@@ -166,7 +212,7 @@ export default function Home() {
           <div className="lg:hidden absolute bottom-4 left-4 right-4 z-10">
             <div className="bg-white/95 backdrop-blur-sm rounded-xl shadow-lg p-3 flex items-center justify-between">
               <div>
-                <div className="text-2xl font-bold text-sgp">{filteredStations.length}</div>
+                <div className="text-2xl font-bold text-sgp">{visibleCount}</div>
                 <div className="text-xs text-slate-500">stations visible</div>
               </div>
               <button
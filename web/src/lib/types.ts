@@ -57,3 +57,19 @@ export interface CoverageGap {
   brands: Brand[];
   priority: 'high' | 'medium' | 'low';
 }
+
+export interface Insights {
+  marketShare: BrandStats[];
+  cityStats: CityStats[];
+  sgpInsights: SGPInsights;
+  coverageGaps: CoverageGap[];
+  tbilisiStats: CityStats | null;
+}
+
+// Written by scripts/generate_charts.py (scripts/analytics.py)
+export interface Analytics {
+  version: number;
+  stations: number;
+  charts: Record<string, Record<string, unknown>>;
+  insights: Insights;
+}